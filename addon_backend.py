@@ -1,13 +1,27 @@
 import asyncio
 import json
+import multiprocessing
+import os
+import re
 import sys
+import threading
 import time
 import gzip
+import zlib
 # 引入 mitmproxy 核心组件，不再使用命令行的 mitmdump
 from mitmproxy import options
 from mitmproxy.tools.dump import DumpMaster
 from mitmproxy.http import HTTPFlow
-import dy_pb2 as dy
+import decoder
+import rooms
+from dedup import DedupTable
+from capture import CaptureWriter
+from event_store import EventStore
+from keywords import KeywordAlerts
+from analytics import RoomAnalytics
+import transport
+import backpressure
+import metrics
 from urllib.parse import parse_qs, urlparse
 
 # 尝试导入 brotli
@@ -16,38 +30,226 @@ try:
 except ImportError:
     brotli = None
 
-sys.stdout.reconfigure(encoding='utf-8')
+# 同进程模式下 (GUI 打包成无控制台程序) 可能没有 stdout
+if sys.stdout is not None:
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+# === 0. 运行参数 (GUI 启动子进程时可通过环境变量覆盖) ===
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# 每条 WebSocket 流在内存里保留多少帧：
+#   -1 = 全部保留 (mitmproxy 默认行为，长时间直播会无限增长)
+#    0 = 解码后立即丢弃
+#    N = 只保留最近 N 帧
+WS_KEEP_FRAMES = _env_int("DY_WS_KEEP_FRAMES", 0)
+
+# 事件攒批：最多攒 FLUSH_MS 毫秒或 MAX_BATCH 条再写一次 (FLUSH_MS=0 表示每帧写一次)
+FLUSH_MS = _env_int("DY_FLUSH_MS", 20)
+MAX_BATCH = _env_int("DY_MAX_BATCH", 500)
+
+# 背压：事件先进有界队列，由后台线程写给界面，界面跟不上时按 SHED_POLICY 丢弃 (见 backpressure.py)
+#   sample (默认) / drop_oldest / block (旧行为，直接在事件循环里写)
+SHED_POLICY = os.environ.get("DY_SHED_POLICY", "sample")
+QUEUE_EVENTS = _env_int("DY_QUEUE_EVENTS", 20000)
+# sample 策略下队列过半后，每个房间每秒最多保留的弹幕数
+SHED_CHAT_RATE = _env_int("DY_SHED_CHAT_RATE", 20)
+# stats 事件 (丢弃计数、分阶段统计) 的上报间隔，0 表示不上报
+STATS_MS = _env_int("DY_STATS_MS", 5000)
+
+# 分阶段耗时/错误/吞吐统计 (见 metrics.py)，默认关闭；METRICS_PORT 非 0 时开本机 HTTP 端口 (/metrics)
+METRICS = os.environ.get("DY_METRICS", "0") == "1"
+METRICS_PORT = _env_int("DY_METRICS_PORT", 0)
+
+# 解码池：gzip 解压和 protobuf 解析放到按房间分片的线程/进程里，0 表示在事件循环里直接解码
+DECODE_WORKERS = _env_int("DY_DECODE_WORKERS", 2)
+DECODE_POOL = os.environ.get("DY_DECODE_POOL", "thread")  # thread / process
+
+# 启动时打开的抓取开关 (对应 GUI 的"抓取条件")，运行中可以通过控制通道修改
+FILTERS = os.environ.get("DY_FILTERS", ",".join(decoder.DEFAULT_SWITCHES)).split(",")
+# stdin = 从标准输入读取 GUI 发来的 DY_CTRL:: 控制指令
+CONTROL = os.environ.get(transport.ENV_CONTROL, "")
+
+# 直播间表：超过 ROOM_TTL 秒没有新帧的房间被淘汰，最多同时记录 ROOM_CAPACITY 个
+ROOM_TTL = _env_int("DY_ROOM_TTL", 600)
+ROOM_CAPACITY = _env_int("DY_ROOM_CAPACITY", 1000)
+
+# 按 msgId 去重 (断线重连/同一房间开多个标签页时会收到重复消息)：
+#   exact = 每个房间记最近 DEDUP_WINDOW 条 msgId 的精确集合
+#   bloom = 改用 Bloom filter，更省内存，有 DEDUP_FPR 的概率误丢一条新消息
+#   off   = 不去重
+DEDUP = os.environ.get("DY_DEDUP", "exact")
+DEDUP_WINDOW = _env_int("DY_DEDUP_WINDOW", 1024)
+try:
+    DEDUP_FPR = float(os.environ.get("DY_DEDUP_FPR", "0.0001"))
+except ValueError:
+    DEDUP_FPR = 0.0001
+
+# 原始帧抓包：CAPTURE_DIR 非空时把每个服务端 PushFrame 原样追加到该目录下的 .dycap 文件，
+# 用 replay.py 离线回放。单个文件写满 CAPTURE_MAX_MB 后换新文件，最多保留 CAPTURE_KEEP 个 (0 = 不删)
+CAPTURE_DIR = os.environ.get("DY_CAPTURE", "")
+CAPTURE_COMPRESS = os.environ.get("DY_CAPTURE_COMPRESS", "0") == "1"
+CAPTURE_MAX_MB = _env_int("DY_CAPTURE_MAX_MB", 256)
+CAPTURE_KEEP = _env_int("DY_CAPTURE_KEEP", 0)
+
+# 事件库：STORE_DIR 非空时把解出的事件 (背压丢弃之前) 批量写进该目录下按天分文件的 SQLite 库 (见 event_store.py)
+STORE_DIR = os.environ.get("DY_STORE", "")
+
+# 关键词告警：KEYWORDS 非空时按该词表文件 (每行一个词，见 keywords.py) 扫描每条弹幕，命中时多发一条 alert 事件；
+# 每 KEYWORDS_RELOAD_S 秒检查一次文件有没有改过，改了就重新加载 (0 = 只在收到 keywords 控制指令时加载)
+KEYWORDS = os.environ.get("DY_KEYWORDS", "")
+KEYWORDS_RELOAD_S = _env_int("DY_KEYWORDS_RELOAD_S", 5)
+
+# 房间统计：每 ROOM_STATS_MS 毫秒给每个活跃房间发一条 room_stats (最近 1/5/60 分钟的弹幕/礼物速率、发言人数、送礼榜，
+# 见 analytics.py)，0 表示关闭；ROOM_STATS_USERS 是每个房间去重发言人数时最多记住的人数
+ROOM_STATS_MS = _env_int("DY_ROOM_STATS_MS", 2000)
+ROOM_STATS_USERS = _env_int("DY_ROOM_STATS_USERS", 5000)
+
+# 代理监听地址；IGNORE_HOSTS 里的主机直接透传不解密 (默认只处理 webcast 相关的域名)
+LISTEN_HOST = os.environ.get("DY_LISTEN_HOST", "127.0.0.1")
+LISTEN_PORT = _env_int("DY_LISTEN_PORT", 8081)
+IGNORE_HOSTS = os.environ.get("DY_IGNORE_HOSTS", '^(?!.*webcast).*')
+
+# 需要缓冲完整响应体再解析的接口 (路由名, URL 正则)，其余响应全部 stream 直通
+ROUTES = [
+    ("enter_room", r"webcast/room/enter_room"),
+]
+
+
+class Router:
+    """按顺序匹配预编译的 URL 正则，返回路由名；都不匹配返回 None"""
+
+    def __init__(self, routes):
+        self.routes = [(name, re.compile(pattern)) for name, pattern in routes]
+
+    def match(self, url):
+        for name, pattern in self.routes:
+            if pattern.search(url):
+                return name
+        return None
+
+
+class FlowMeta:
+    """一条 WebSocket 流的缓存信息：URL 在整条流的生命周期里不变，只在建立时解析一次"""
+    __slots__ = ("relevant", "room_id", "frames", "bytes")
+
+    def __init__(self, relevant, room_id):
+        self.relevant = relevant
+        self.room_id = room_id
+        self.frames = 0
+        self.bytes = 0
 
 
 class DouyinBackend:
-    def __init__(self):
-        self.discovered_rooms = set()
-        self.last_clean_time = time.time()
+    def __init__(self, ws_keep_frames=WS_KEEP_FRAMES, writer=None,
+                 flush_ms=FLUSH_MS, max_batch=MAX_BATCH,
+                 decode_workers=DECODE_WORKERS, decode_pool=DECODE_POOL,
+                 filters=FILTERS, control=CONTROL,
+                 room_ttl=ROOM_TTL, room_capacity=ROOM_CAPACITY,
+                 dedup=DEDUP, dedup_window=DEDUP_WINDOW, dedup_fpr=DEDUP_FPR,
+                 shed_policy=SHED_POLICY, queue_events=QUEUE_EVENTS,
+                 shed_chat_rate=SHED_CHAT_RATE, stats_ms=STATS_MS, capture_dir=CAPTURE_DIR,
+                 metrics_on=METRICS, metrics_port=METRICS_PORT, store_dir=STORE_DIR,
+                 keywords=KEYWORDS, keywords_reload_s=KEYWORDS_RELOAD_S,
+                 room_stats_ms=ROOM_STATS_MS, room_stats_users=ROOM_STATS_USERS):
+        self.ws_keep_frames = ws_keep_frames
+        self.metrics = metrics.Metrics() if metrics_on or metrics_port else None
+        if metrics_port:
+            try:
+                port = self.metrics.serve(metrics_port)
+                print(f">>> 统计接口: http://127.0.0.1:{port}/metrics")
+            except OSError as e:
+                print(f">>> 统计接口启动失败: {e}")
+        # 事件通道：text (DY_DATA:: 行) 或 binary (长度前缀 msgpack 帧)，前面再套一层攒批
+        writer = writer or transport.open_writer()
+        if self.metrics:
+            writer.metrics = self.metrics
+        self.shed = None
+        if shed_policy != "block":
+            # 写出挪到后台线程，事件循环里只入队，界面读得慢也不会卡住代理
+            writer = self.shed = backpressure.ShedWriter(writer, capacity=queue_events, policy=shed_policy,
+                                                         chat_rate=shed_chat_rate, metrics=self.metrics)
+        self.store = None
+        if store_dir:
+            # 入库放在背压队列前面：界面跟不上时丢的只是显示，库里的数据是完整的
+            self.store = EventStore(store_dir)
+            writer = transport.MultiWriter(self.store, writer)
+            print(f">>> 事件入库已开启: {store_dir}")
+        self.keywords = None
+        self.keywords_reload_s = keywords_reload_s
+        if keywords:
+            self.keywords = KeywordAlerts(keywords, reload_s=keywords_reload_s)
+        # 计数在背压丢弃之前做，界面丢掉的弹幕照样算进速率
+        self.analytics = None
+        if room_stats_ms > 0:
+            self.analytics = RoomAnalytics(capacity=room_capacity, max_users=room_stats_users)
+        self.room_stats_interval = room_stats_ms / 1000
+        self.room_stats_timer = None
+        self.emitter = transport.Emitter(writer, flush_interval=flush_ms / 1000, max_batch=max_batch,
+                                         metrics=self.metrics, stage="enqueue" if self.shed else "write")
+        self.stats_interval = stats_ms / 1000
+        self.stats_timer = None
+        # 解码池回调不在事件循环线程里，需要切回 loop 再交给 emitter
+        self.loop = None
+        self.emit_lock = threading.Lock()
+        # 只解析这些 method 的 payload，其余在解码时直接跳过
+        self.methods = decoder.methods_for(filters)
+        self.control_mode = control
+        # 去重表的房间上限和直播间表一致
+        self.dedup = DedupTable(dedup, dedup_window, dedup_fpr, room_capacity)
+        self.decode_pool = None
+        if decode_workers > 0:
+            self.decode_pool = decoder.DecodePool(decode_workers, self.deliver, kind=decode_pool,
+                                                  dedup=self.dedup, metrics=self.metrics)
+        self.router = Router(ROUTES)
+        # flow.id -> FlowMeta，websocket_end 时移除
+        self.flows = {}
+        # 新房间 (首次出现或过期后再出现) 才上报 discovery；淘汰的房间连同去重窗口一起丢掉
+        self.rooms = rooms.RoomRegistry(ttl=room_ttl, capacity=room_capacity, on_remove=self.dedup.drop)
+        self.capture = None
+        if capture_dir:
+            self.capture = CaptureWriter(capture_dir, compress=CAPTURE_COMPRESS,
+                                         max_bytes=CAPTURE_MAX_MB * 1024 * 1024, keep=CAPTURE_KEEP)
+            print(f">>> 原始帧抓包已开启: {capture_dir}")
         print(">>> DouyinBackend 插件已加载")
 
     # === 1. HTTP 响应 ===
+    def responseheaders(self, flow: HTTPFlow):
+        # 收到响应头时就做决定：到 response 钩子时响应体已经被 mitmproxy 缓冲完了
+        route = self.router.match(flow.request.url)
+        flow.metadata["dy_route"] = route
+        flow.response.stream = route is None
+
     def response(self, flow: HTTPFlow):
-        # 只要不是 enter_room，其他全部 stream 直通
-        if "webcast/room/enter_room" not in flow.request.url:
-            flow.response.stream = True
+        if "dy_route" in flow.metadata:
+            route = flow.metadata["dy_route"]
+        else:
+            route = self.router.match(flow.request.url)
+        if route != "enter_room":
             return
 
-        # 拦截进场信息
-        flow.response.stream = False
-        try:
-            content = flow.response.content
-            encoding = flow.response.headers.get("content-encoding", "")
-            if encoding == "br" and brotli:
-                try:
-                    content = brotli.decompress(content)
-                except:
-                    pass
-            elif encoding == "gzip":
-                try:
-                    content = gzip.decompress(content)
-                except:
-                    pass
+        # 拦截进场信息；response.content 已经被 mitmproxy 按 content-encoding 解过一次，这里用原始字节自己解
+        content = flow.response.raw_content or b""
+        encoding = flow.response.headers.get("content-encoding", "")
+        if encoding == "br" and brotli:
+            try:
+                content = brotli.decompress(content)
+            except (OSError, ValueError, brotli.error) as e:
+                return self.enter_room_error(e)
+        elif encoding == "gzip":
+            try:
+                content = gzip.decompress(content)
+            except (OSError, EOFError, zlib.error) as e:
+                return self.enter_room_error(e)
+        elif encoding and encoding != "identity":
+            content = flow.response.get_content(strict=False) or b""
 
+        try:
             json_str = content.decode('utf-8', errors='ignore')
             data = json.loads(json_str)
 
@@ -64,91 +266,218 @@ class DouyinBackend:
                 display_id = owner.get('display_id', '')
                 short_id = owner.get('short_id', '')
                 real_id = display_id if display_id else str(short_id)
+                # web_rid 是直播间链接 live.douyin.com/<web_rid> 里的号，GUI 用它把房间对应到打开它的浏览器
+                web_rid = self.web_rid_of(flow, data)
 
                 info_pack = {
                     "type": "anchor_info",
                     "room_id": room_id,
                     "user": nickname,
                     "douyin_id": real_id,
+                    "web_rid": web_rid,
                     "content": "主播信息更新"
                 }
-                print(f"DY_DATA::{json.dumps(info_pack, ensure_ascii=False)}")
-                sys.stdout.flush()  # 强制刷新缓冲区
-        except:
-            pass
+                if room_id != 'UNKNOWN':
+                    self.rooms.set_anchor(room_id, {"user": nickname, "douyin_id": real_id, "web_rid": web_rid})
+                self.emitter.emit([info_pack])
+        except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+            # 接口返回的不是预期的 JSON 结构 (字段缺失/类型不对)
+            self.enter_room_error(e)
 
-    # === 2. WebSocket 监听 ===
-    def websocket_message(self, flow: HTTPFlow):
-        if "webcast" not in flow.request.url: return
-        msg = flow.websocket.messages[-1]
-        if msg.from_client: return
+    def enter_room_error(self, e):
+        """进场信息解不出来：开了统计时计入 enter_room 错误，出现在 stats 事件里"""
+        if self.metrics:
+            self.metrics.error("enter_room", e)
 
+    def web_rid_of(self, flow, data):
+        """enter_room 请求的 web_rid 参数；没有的话从 Referer (直播间页面地址) 里取"""
         try:
             query = parse_qs(urlparse(flow.request.url).query)
+            web_rid = query.get('web_rid', [''])[0]
+            if not web_rid:
+                web_rid = str(data.get('data', {}).get('web_rid', '') or '')
+            if not web_rid:
+                path = urlparse(flow.request.headers.get('referer', '')).path
+                web_rid = path.strip('/').split('/')[0]
+            return web_rid if web_rid.isdigit() else ''
+        except (KeyError, ValueError, AttributeError) as e:
+            self.enter_room_error(e)
+            return ''
+
+    # === 2. WebSocket 监听 ===
+    def websocket_start(self, flow: HTTPFlow):
+        self.flows[flow.id] = self.flow_meta(flow)
+
+    def websocket_end(self, flow: HTTPFlow):
+        self.flows.pop(flow.id, None)
+
+    def flow_meta(self, flow):
+        url = flow.request.url
+        if "webcast" not in url:
+            return FlowMeta(False, "UNKNOWN")
+        try:
+            query = parse_qs(urlparse(url).query)
             room_id = query.get('room_id', ['UNKNOWN'])[0]
         except:
             room_id = "UNKNOWN"
+        return FlowMeta(True, room_id)
 
-        if room_id != "UNKNOWN" and room_id not in self.discovered_rooms:
-            print(
-                f"DY_DATA::{json.dumps({'type': 'discovery', 'room_id': room_id, 'user': '获取中...'}, ensure_ascii=False)}")
-            sys.stdout.flush()
-            self.discovered_rooms.add(room_id)
+    def websocket_message(self, flow: HTTPFlow):
+        messages = flow.websocket.messages
+        msg = messages[-1]
+        # mitmproxy 转发时用的是自己持有的 message 引用，这里裁剪列表不影响转发
+        self.trim_messages(messages)
 
-        if time.time() - self.last_clean_time > 600:
-            self.discovered_rooms.clear();
-            self.last_clean_time = time.time()
+        meta = self.flows.get(flow.id)
+        if meta is None:
+            # 插件加载前就已建立的连接没有经过 websocket_start
+            meta = self.flows[flow.id] = self.flow_meta(flow)
+        if not meta.relevant or msg.from_client: return
+        size = len(msg.content)
+        meta.frames += 1
+        meta.bytes += size
+        room_id = meta.room_id
+        if self.capture:
+            self.capture.write(room_id, msg.content)
+        if self.metrics:
+            self.metrics.frame(room_id)
 
-        try:
-            push = dy.PushFrame()
-            push.ParseFromString(msg.content)
-            payload = push.payload
-            try:
-                payload = gzip.decompress(payload)
-            except:
-                pass
-
-            resp = dy.Response()
-            resp.ParseFromString(payload)
-
-            for m in resp.messagesList:
-                pack = {}
-                if m.method == 'WebcastChatMessage':
-                    try:
-                        c = dy.ChatMessage();
-                        c.ParseFromString(m.payload)
-                        pack = {"type": "chat", "room_id": room_id, "user": c.user.nickName, "content": c.content,
-                                "time": str(c.common.createTime)}
-                    except:
-                        pass
-                elif m.method == 'WebcastGiftMessage':
-                    try:
-                        g = dy.GiftMessage();
-                        g.ParseFromString(m.payload)
-                        name = g.gift.name if hasattr(g, 'gift') else "未知礼物"
-                        count = g.comboCount if hasattr(g, 'comboCount') else 1
-                        pack = {"type": "gift", "room_id": room_id, "user": g.user.nickName, "gift_name": name,
-                                "count": count, "time": str(g.common.createTime)}
-                    except:
-                        pass
-
-                if pack:
-                    try:
-                        print(f"DY_DATA::{json.dumps(pack, ensure_ascii=False)}")
-                        sys.stdout.flush()
-                    except:
-                        pass
-        except:
-            pass
+        # 一帧里解出的所有事件先收集起来，整帧交给 emitter
+        packs = []
+        if room_id != "UNKNOWN":
+            state, is_new = self.rooms.touch(room_id, size)
+            if is_new:
+                anchor = state.anchor or {}
+                packs.append({'type': 'discovery', 'room_id': room_id, 'user': anchor.get("user", '获取中...'),
+                              'web_rid': anchor.get("web_rid", '')})
+
+        # 事件循环里只交出原始帧，解压和解析在解码池里做
+        if self.decode_pool:
+            if packs: self.deliver(packs)
+            self.decode_pool.submit(msg.content, room_id, self.methods)
+        else:
+            packs.extend(decoder.decode_frame(msg.content, room_id, self.methods, self.dedup, self.metrics))
+            self.emitter.emit(self.observe(packs))
+
+    def running(self):
+        self.loop = asyncio.get_running_loop()
+        if self.control_mode == "stdin":
+            threading.Thread(target=self.read_control, daemon=True).start()
+        if self.stats_interval > 0 and (self.shed or self.metrics or self.store):
+            self.stats_timer = self.loop.call_later(self.stats_interval, self.emit_stats)
+        if self.analytics:
+            self.room_stats_timer = self.loop.call_later(self.room_stats_interval, self.emit_room_stats)
+
+    def emit_room_stats(self):
+        """定时把各房间的滑动窗口统计汇总成 room_stats 事件"""
+        packs = self.analytics.snapshot()
+        if packs:
+            self.emitter.emit(packs)
+        if self.loop is not None:
+            self.room_stats_timer = self.loop.call_later(self.room_stats_interval, self.emit_room_stats)
+
+    def emit_stats(self):
+        """定时上报一条 stats 事件：背压队列的丢弃计数 + 入库计数 + 累计去重数 + 开启统计时的分阶段摘要"""
+        stats = self.shed.queue.take_stats() if self.shed else {"type": "stats"}
+        if self.dedup.enabled:
+            stats["dedup_dropped"] = self.dedup.dropped
+        if self.store:
+            stats["store"] = self.store.take_stats()
+        if self.metrics:
+            self.metrics.retain_rooms(self.rooms.rooms)
+            stats["metrics"] = self.metrics.stats_summary()
+        self.emitter.emit([stats])
+        if self.loop is not None:
+            self.stats_timer = self.loop.call_later(self.stats_interval, self.emit_stats)
+
+    # === 3. 控制通道 ===
+    def read_control(self):
+        """读取 GUI 通过 stdin 发来的 DY_CTRL:: 指令，切回事件循环执行"""
+        stdin = sys.stdin
+        if stdin is None:
+            return
+        stdin.reconfigure(encoding='utf-8')
+        for line in stdin:
+            msg = transport.parse_control_line(line.strip())
+            if msg is not None and self.loop:
+                self.loop.call_soon_threadsafe(self.control, msg)
+
+    def control(self, msg):
+        cmd = msg.get("cmd")
+        if cmd == "filters":
+            self.methods = decoder.methods_for(msg.get("enabled", ()))
+            print(f">>> 抓取条件已更新: {', '.join(sorted(self.methods)) or '无'}")
+        elif cmd == "keywords":
+            # 立即重新加载词表 (可以带 path 换一个文件)；原来没开启关键词告警时从这里开启
+            path = msg.get("path")
+            if self.keywords:
+                self.keywords.reload(path)
+            elif path:
+                self.keywords = KeywordAlerts(path, reload_s=self.keywords_reload_s)
+
+    def observe(self, packs):
+        """解出的事件交给 emitter 之前：房间统计计数，关键词告警 (命中的弹幕后面跟一条 alert 事件，和原事件同一批发出)"""
+        metrics = self.metrics
+        if self.analytics is not None:
+            t = time.perf_counter() if metrics is not None else 0
+            self.analytics.add(packs)
+            if metrics is not None:
+                metrics.stage("analytics", time.perf_counter() - t)
+        keywords = self.keywords
+        if keywords is None:
+            return packs
+        t = time.perf_counter() if metrics is not None else 0
+        alerts = keywords.scan(packs)
+        if metrics is not None:
+            metrics.stage("keywords", time.perf_counter() - t)
+        return packs + alerts if alerts else packs
+
+    def deliver(self, packs):
+        """解码池的结果回到 emitter：有事件循环就切回 loop，否则 (压测/退出阶段) 加锁直接写"""
+        # 统计和关键词匹配在解码池的回调线程里做，不占事件循环
+        packs = self.observe(packs)
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self.emitter.emit, packs)
+        else:
+            with self.emit_lock:
+                self.emitter.emit(packs)
+
+    def done(self):
+        # 先等解码池把在途的帧处理完，再把还没到时间窗口的事件写出去
+        self.loop = None
+        if self.stats_timer is not None:
+            self.stats_timer.cancel()
+            self.stats_timer = None
+        if self.room_stats_timer is not None:
+            self.room_stats_timer.cancel()
+            self.room_stats_timer = None
+        if self.decode_pool:
+            self.decode_pool.close()
+        self.emitter.close()
+        if self.capture:
+            self.capture.close()
+        if self.metrics:
+            self.metrics.close()
+
+    def trim_messages(self, messages):
+        """按保留窗口裁掉已经处理过的旧帧"""
+        keep = self.ws_keep_frames
+        if keep < 0:
+            return
+        if keep == 0:
+            messages.clear()
+        elif len(messages) > keep:
+            del messages[:-keep]
 
 
 # === 核心修改：使用 asyncio 直接启动 DumpMaster ===
 # === 核心修改：修正参数拼写错误 ===
-async def start_proxy():
-    print(">>> 正在启动内置代理服务 (Port: 8081)...")
-
+def create_master(backend=None, listen_host='127.0.0.1', listen_port=8081,
+                  ignore_hosts=('^(?!.*webcast).*',)):
+    """按 start_proxy 的配置创建 DumpMaster (必须在事件循环里调用)"""
     # 1. 创建配置
-    opts = options.Options(listen_host='127.0.0.1', listen_port=8081)
+    opts = options.Options(listen_host=listen_host, listen_port=listen_port)
 
     # 2. 创建 Master
     # 注意：参数名是 with_dumper，不是 with_dump
@@ -157,10 +486,19 @@ async def start_proxy():
     # 3. 设置选项 (必须在创建 master 之后)
     master.options.ssl_insecure = True
     master.options.stream_large_bodies = '1m'
-    master.options.ignore_hosts = ['^(?!.*webcast).*']
+    master.options.ignore_hosts = list(ignore_hosts)
 
     # 4. 加载插件
-    master.addons.add(DouyinBackend())
+    master.addons.add(backend or DouyinBackend())
+    return master
+
+
+async def start_proxy(backend=None, on_master=None):
+    print(f">>> 正在启动内置代理服务 (Port: {LISTEN_PORT})...")
+    master = create_master(backend, listen_host=LISTEN_HOST, listen_port=LISTEN_PORT,
+                           ignore_hosts=(IGNORE_HOSTS,) if IGNORE_HOSTS else ())
+    if on_master:
+        on_master(master)
 
     try:
         await master.run()
@@ -168,7 +506,59 @@ async def start_proxy():
         pass
 
 
+class _ReadyHook:
+    def __init__(self, event):
+        self.event = event
+
+    def running(self):
+        self.event.set()
+
+
+class ProxyThread(threading.Thread):
+    """
+    同进程模式：在当前进程的一个线程里用独立的事件循环运行 start_proxy()。
+    事件交给 backend 的 writer (通常是 transport.QueueWriter)，不经过子进程和序列化。
+    """
+
+    def __init__(self, backend):
+        super().__init__(name="dy-proxy", daemon=True)
+        self.backend = backend
+        self.master = None
+        self.ready = threading.Event()
+        self.error = None
+
+    def run(self):
+        # Windows 下和独立进程一样用 Selector 事件循环
+        loop = asyncio.SelectorEventLoop() if sys.platform == 'win32' else asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(start_proxy(self.backend, self._on_master))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+            loop.close()
+
+    def _on_master(self, master):
+        self.master = master
+        # running 钩子在监听端口建好之后才触发
+        master.addons.add(_ReadyHook(self.ready))
+
+    def control(self, msg):
+        """GUI 线程调用：控制指令切到代理的事件循环里执行"""
+        loop = self.backend.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.backend.control, msg)
+
+    def stop(self, timeout=10):
+        if self.master is not None:
+            self.master.shutdown()
+        self.join(timeout)
+
+
 if __name__ == "__main__":
+    # 打包成 backend.exe 后进程池需要这一行
+    multiprocessing.freeze_support()
     # Windows下 asyncio 策略调整
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -0,0 +1,283 @@
+"""
+按房间的滑动窗口统计：最近 1 / 5 / 60 分钟的弹幕数/分、礼物数/分、发言人数和送礼榜，定时汇总成 room_stats 事件
+
+大房间的原始事件流对看盘没什么用，需要的是这几个数；界面原来靠数表格行数，既不准 (背压会丢弹幕) 也没有时间窗口。
+
+  桶     : 每个房间一个 60 分钟的环形数组，bucket_s (默认 10 秒) 一个桶，每个桶记弹幕/礼物/点赞/进场数和发言人数。
+           每个窗口另有一份累计值，事件进来时桶和各窗口的累计同时加，时间走到下一个桶时把滑出窗口的那个桶减掉，
+           所以每条事件和每次换桶都是 O(1)，不用每次汇总时把几百个桶加一遍。
+  发言人 : user -> 最近一次发言所在的桶 (按发言先后排序的 OrderedDict)。同一个人再发言时从旧桶挪到新桶，
+           窗口里的发言人数就是窗口内各桶的计数之和，精确去重；超过 60 分钟的人从头部删掉，
+           人数超过 max_users 时也从最久没发言的删 (只影响 60 分钟窗口的人数，事件里 users_capped 为真)。
+  送礼榜 : 每个桶按 Space-Saving 只记送礼最多的 SLOT_GIFTERS 个人 (满了以后新来的人顶替最少的那个并继承他的数)，
+           各窗口的榜是窗口内各桶的和，同样随桶滑出减掉；顶替带来的误差不超过被顶替者的数。
+
+每个房间的内存只和桶数、SLOT_GIFTERS、max_users 有关，和流量无关；房间数超过 capacity 时淘汰最久没有事件的房间。
+add() 在解码池的回调线程里调用 (同一个房间总在同一个线程)，snapshot() 在事件循环里定时调用，每个房间一把锁。
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from operator import itemgetter
+
+# 窗口名 -> 秒数
+WINDOWS = (("1m", 60), ("5m", 300), ("60m", 3600))
+# 每个桶记的数 (下标)；CHATTERS 是最近一次发言落在这个桶里的人数
+CHAT, GIFT, LIKE, MEMBER, CHATTERS = range(5)
+FIELDS = 5
+# 每个桶最多记几个送礼的人；每个窗口的送礼榜给出前几名
+SLOT_GIFTERS = 8
+TOP_N = 5
+
+
+class RoomWindow:
+    """一个房间的环形桶和各窗口的累计值"""
+    __slots__ = ("lock", "n", "lengths", "step", "first_step", "slots", "current", "sums", "gifters", "tops",
+                 "users", "max_users", "capped", "dirty", "last_event")
+
+    def __init__(self, step, n, lengths, max_users):
+        self.lock = threading.Lock()
+        self.n = n
+        self.lengths = lengths
+        self.step = step
+        self.first_step = step
+        self.slots = [[0] * FIELDS for _ in range(n)]
+        # 当前桶 (= slots[step % n])
+        self.current = self.slots[step % n]
+        self.sums = [[0] * FIELDS for _ in lengths]
+        # 每个桶的 {送礼人: 礼物数} (没人送礼的桶是 None)，每个窗口的 {送礼人: 礼物数}
+        self.gifters = [None] * n
+        self.tops = [{} for _ in lengths]
+        self.users = OrderedDict()
+        self.max_users = max_users
+        self.capped = False
+        self.dirty = False
+        self.last_event = 0.0
+
+    def advance(self, step):
+        """时间走到第 step 个桶：滑出各窗口的桶从累计里减掉，复用的桶清零"""
+        cur = self.step
+        if step <= cur:
+            return
+        n, sums, tops = self.n, self.sums, self.tops
+        if step - cur >= n:
+            # 整整一个小时没有事件：全部清零
+            self.slots = [[0] * FIELDS for _ in range(n)]
+            self.sums = [[0] * FIELDS for _ in self.lengths]
+            self.gifters = [None] * n
+            self.tops = [{} for _ in self.lengths]
+            self.users.clear()
+            self.capped = False
+            self.step = step
+            self.current = self.slots[step % n]
+            return
+        slots, gifters = self.slots, self.gifters
+        for s in range(cur + 1, step + 1):
+            for w, length in enumerate(self.lengths):
+                # 第 s - length 个桶滑出窗口 w
+                old = (s - length) % n
+                total = sums[w]
+                for i, v in enumerate(slots[old]):
+                    if v:
+                        total[i] -= v
+                given = gifters[old]
+                if given:
+                    top = tops[w]
+                    for user, v in given.items():
+                        left = top.get(user, 0) - v
+                        if left > 0:
+                            top[user] = left
+                        else:
+                            top.pop(user, None)
+            slot = s % n
+            slots[slot] = [0] * FIELDS
+            gifters[slot] = None
+        self.step = step
+        self.current = slots[step % n]
+        # 最近一次发言已经滑出 60 分钟的人
+        users = self.users
+        horizon = step - n
+        while users:
+            user, last = next(iter(users.items()))
+            if last > horizon:
+                break
+            del users[user]
+        if len(users) < self.max_users:
+            self.capped = False
+
+    def add(self, packs, i, room_id):
+        """从第 i 条开始计入属于这个房间的连续事件，返回第一条别的房间的事件的下标"""
+        current, sums, users, step = self.current, self.sums, self.users, self.step
+        end = len(packs)
+        while i < end:
+            p = packs[i]
+            if p.get("room_id") != room_id:
+                break
+            i += 1
+            kind = p.get("type")
+            if kind == "chat":
+                current[CHAT] += 1
+                for total in sums:
+                    total[CHAT] += 1
+                user = p.get("user")
+                # 同一个桶里已经发过言的人不用再挪
+                if user and users.get(user) != step:
+                    self.chatter(user)
+            elif kind == "gift":
+                self.gift(p.get("user"), _int(p.get("count")))
+            elif kind == "like":
+                self.count(LIKE, _int(p.get("count")))
+            elif kind == "member":
+                self.count(MEMBER)
+            else:
+                continue
+            self.dirty = True
+        return i
+
+    def count(self, field, value=1):
+        self.current[field] += value
+        for total in self.sums:
+            total[field] += value
+
+    def chatter(self, user):
+        """user 在当前桶发言 (之前不在当前桶)：挪到当前桶，各窗口的发言人数跟着调整"""
+        users = self.users
+        last = users.get(user)
+        if last is not None:
+            self._forget(last)
+            users.move_to_end(user)
+        elif len(users) >= self.max_users:
+            _, oldest = users.popitem(last=False)
+            self._forget(oldest)
+            self.capped = True
+        users[user] = self.step
+        self.count(CHATTERS)
+
+    def _forget(self, last):
+        """某人最近一次发言在第 last 个桶：从那个桶和还包含它的窗口里减掉"""
+        age = self.step - last
+        if age >= self.n:
+            return
+        self.slots[last % self.n][CHATTERS] -= 1
+        for total, length in zip(self.sums, self.lengths):
+            if age < length:
+                total[CHATTERS] -= 1
+
+    def gift(self, user, value):
+        self.count(GIFT, value)
+        if not user:
+            return
+        slot = self.step % self.n
+        given = self.gifters[slot]
+        if given is None:
+            given = self.gifters[slot] = {}
+        tops = self.tops
+        if user not in given and len(given) >= SLOT_GIFTERS:
+            # Space-Saving：顶替这个桶里送得最少的人，各窗口里把他的数转给新来的人
+            victim, inherited = min(given.items(), key=itemgetter(1))
+            del given[victim]
+            for top in tops:
+                left = top.get(victim, 0) - inherited
+                if left > 0:
+                    top[victim] = left
+                else:
+                    top.pop(victim, None)
+                top[user] = top.get(user, 0) + inherited
+            given[user] = inherited
+        given[user] = given.get(user, 0) + value
+        for top in tops:
+            top[user] = top.get(user, 0) + value
+
+    def summary(self, bucket_s):
+        elapsed = (self.step - self.first_step + 1) * bucket_s
+        windows = {}
+        for (name, seconds), total, top in zip(WINDOWS, self.sums, self.tops):
+            # 房间刚出现时按实际经过的时间算每分钟的量
+            minutes = min(seconds, elapsed) / 60
+            windows[name] = {
+                "chat": total[CHAT], "chat_pm": round(total[CHAT] / minutes, 1),
+                "gift": total[GIFT], "gift_pm": round(total[GIFT] / minutes, 1),
+                "like": total[LIKE], "member": total[MEMBER], "chatters": total[CHATTERS],
+                "top": [[user, v] for user, v in heapq.nlargest(TOP_N, top.items(), key=itemgetter(1))],
+            }
+        return windows
+
+    def idle(self):
+        return not any(self.sums[-1]) and not self.users
+
+
+class RoomAnalytics:
+    """
+    所有房间的滑动窗口统计。add(packs) 吃解出的事件，snapshot() 给每个窗口里还有数的房间一条 room_stats 事件：
+    {"type": "room_stats", "room_id": ..., "windows": {"1m": {...}, "5m": {...}, "60m": {...}}, "users_capped": bool}
+    """
+
+    def __init__(self, bucket_s=10, capacity=1000, max_users=5000):
+        self.bucket_s = bucket_s
+        self.n = WINDOWS[-1][1] // bucket_s
+        self.lengths = tuple(max(1, seconds // bucket_s) for _, seconds in WINDOWS)
+        self.capacity = capacity
+        self.max_users = max_users
+        self.rooms = {}
+        self.lock = threading.Lock()
+
+    def locked_room(self, room_id, step):
+        """取出 (或新建) 房间并加锁；拿到锁之前刚好被 snapshot() 移除的话重新取"""
+        while True:
+            room = self.rooms.get(room_id)
+            if room is None:
+                with self.lock:
+                    room = self.rooms.get(room_id)
+                    if room is None:
+                        room = self.rooms[room_id] = RoomWindow(step, self.n, self.lengths, self.max_users)
+            room.lock.acquire()
+            if self.rooms.get(room_id) is room:
+                return room
+            room.lock.release()
+
+    def add(self, packs, now=None):
+        now = time.time() if now is None else now
+        step = int(now // self.bucket_s)
+        i, end = 0, len(packs)
+        while i < end:
+            # 一帧里的事件都是同一个房间的，通常只取一次房间
+            room_id = packs[i].get("room_id")
+            if room_id is None or room_id == "UNKNOWN":
+                i += 1
+                continue
+            room = self.locked_room(room_id, step)
+            try:
+                room.advance(step)
+                room.last_event = now
+                i = room.add(packs, i, room_id)
+            finally:
+                room.lock.release()
+
+    def snapshot(self, now=None):
+        """有新事件或窗口里还有数的房间各一条 room_stats；窗口全空的房间发一条全零的之后移除"""
+        now = time.time() if now is None else now
+        step = int(now // self.bucket_s)
+        out = []
+        for room_id, room in list(self.rooms.items()):
+            with room.lock:
+                room.advance(step)
+                if not room.dirty and room.idle():
+                    del self.rooms[room_id]
+                out.append({"type": "room_stats", "room_id": room_id, "windows": room.summary(self.bucket_s),
+                            "users_capped": room.capped})
+                room.dirty = False
+        if len(self.rooms) > self.capacity:
+            with self.lock:
+                stale = sorted(self.rooms.items(), key=lambda kv: kv[1].last_event)
+                for room_id, _ in stale[:len(self.rooms) - self.capacity]:
+                    del self.rooms[room_id]
+        return out
+
+
+def _int(value):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
@@ -0,0 +1,216 @@
+"""
+后端事件的背压与降载
+
+原来 Emitter 在 mitmproxy 的事件循环里直接写 stdout/socket：界面读得慢时管道写满，
+print/sendall 就卡在钩子里，浏览器的代理连接跟着停住，直播间的 WebSocket 可能因此断开。
+
+现在 Emitter 只把事件放进有界的 ShedQueue (从不阻塞)，由 ShedWriter 的后台线程
+取出来写给真正的 writer；写不动时积压留在队列里，超出容量按策略丢弃：
+  drop_oldest : 队列满时丢最旧的事件，先丢弹幕，再丢进场/点赞/关注等
+  sample      : 在 drop_oldest 的基础上，队列过半后每个房间的弹幕限速 (令牌桶)，
+                大房间的弹幕先被抽样丢掉，小房间基本不受影响
+  block       : 不用队列，Emitter 直接写 (旧行为)
+礼物、主播信息、新房间、关键词告警、房间统计 (KEEP_TYPES) 任何策略下都不丢。
+丢弃计数由 DouyinBackend 定时取走 (take_stats)，放在 {"type": "stats"} 事件里发给界面。
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, deque
+
+POLICIES = ("sample", "drop_oldest", "block")
+
+# 任何时候都不丢的事件
+KEEP_TYPES = frozenset(("gift", "anchor_info", "discovery", "alert", "room_stats", "stats"))
+
+_CHAT, _OTHER, _KEEP = 0, 1, 2
+
+
+class ShedQueue:
+    """
+    有界事件队列，put() 永不阻塞。
+
+    事件按 弹幕 / 其他可丢 / 不可丢 分三条 deque 存放，每条带全局序号，
+    丢弃时直接从弹幕队头 popleft，take() 时按序号合并回原来的顺序。
+    capacity 只约束可丢的事件；不可丢的事件量很小，不计入容量。
+    """
+
+    def __init__(self, capacity=20000, policy="sample", chat_rate=20.0, watermark=0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的降载策略: {policy}")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.chat_rate = chat_rate
+        self.soft_limit = int(self.capacity * watermark)
+        self.lanes = (deque(), deque(), deque())
+        self.seq = 0
+        # 可丢事件 (弹幕 + 其他) 的条数
+        self.size = 0
+        self.peak = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        # room_id -> [令牌数, 上次补充时间]
+        self.buckets = {}
+        # 本周期的计数，take_stats() 取走后清零
+        self.dropped = Counter()
+        self.dropped_rooms = Counter()
+        self.sampled = 0
+        self.dropped_total = 0
+
+    def put(self, packs):
+        if not packs:
+            return
+        with self.cond:
+            lanes = self.lanes
+            seq = self.seq
+            sample = self.policy == "sample" and self.size >= self.soft_limit
+            now = time.monotonic() if sample else 0.0
+            for pack in packs:
+                kind = pack.get("type")
+                if kind in KEEP_TYPES:
+                    lane = _KEEP
+                elif kind == "chat":
+                    if sample and not self._admit_chat(pack.get("room_id"), now):
+                        self.sampled += 1
+                        self._count_drop(pack)
+                        continue
+                    lane = _CHAT
+                else:
+                    lane = _OTHER
+                seq += 1
+                lanes[lane].append((seq, pack))
+                if lane != _KEEP:
+                    self.size += 1
+            self.seq = seq
+
+            # 超出容量：先丢最旧的弹幕，弹幕丢完了再丢其他可丢事件
+            chat, other = lanes[_CHAT], lanes[_OTHER]
+            while self.size > self.capacity:
+                _, pack = chat.popleft() if chat else other.popleft()
+                self.size -= 1
+                self._count_drop(pack)
+            if self.size > self.peak:
+                self.peak = self.size
+            self.cond.notify()
+
+    def _admit_chat(self, room_id, now):
+        """每个房间一个令牌桶：每秒补 chat_rate 个，最多攒 1 秒的量"""
+        bucket = self.buckets.get(room_id)
+        if bucket is None:
+            if len(self.buckets) > 4096:
+                self.buckets.clear()
+            bucket = self.buckets[room_id] = [self.chat_rate, now]
+        else:
+            bucket[0] = min(self.chat_rate, bucket[0] + (now - bucket[1]) * self.chat_rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def _count_drop(self, pack):
+        self.dropped[pack.get("type")] += 1
+        self.dropped_rooms[pack.get("room_id")] += 1
+        self.dropped_total += 1
+
+    def take(self, timeout=None, limit=1000):
+        """
+        按到达顺序取走最早的 limit 条事件；队列为空时最多等 timeout 秒，返回列表可能为空。
+        每次只取一批，没写出去的积压留在队列里，降载策略才看得到。
+        """
+        with self.cond:
+            lanes = self.lanes
+            if not self.closed and not any(lanes):
+                self.cond.wait(timeout)
+            if self.size + len(lanes[_KEEP]) <= limit:
+                items = []
+                for lane in lanes:
+                    if lane:
+                        items.extend(lane)
+                        lane.clear()
+                self.size = 0
+                # 三段各自有序，timsort 合并只需线性时间
+                items.sort(key=lambda item: item[0])
+            else:
+                items = list(itertools.islice(heapq.merge(*lanes), limit))
+                last = items[-1][0]
+                for i, lane in enumerate(lanes):
+                    n = 0
+                    while lane and lane[0][0] <= last:
+                        lane.popleft()
+                        n += 1
+                    if i != _KEEP:
+                        self.size -= n
+        return [pack for _, pack in items]
+
+    def take_stats(self):
+        """本周期的丢弃计数，取走后清零"""
+        with self.cond:
+            stats = {"type": "stats", "policy": self.policy, "queue": self.size, "queue_peak": self.peak,
+                     "capacity": self.capacity, "dropped": dict(self.dropped), "sampled": self.sampled,
+                     "dropped_rooms": dict(self.dropped_rooms.most_common(5)),
+                     "dropped_total": self.dropped_total}
+            self.dropped.clear()
+            self.dropped_rooms.clear()
+            self.sampled = 0
+            self.peak = self.size
+        return stats
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def empty(self):
+        with self.cond:
+            return not any(self.lanes)
+
+    def __len__(self):
+        return self.size
+
+
+class ShedWriter:
+    """
+    套在 TextWriter/BinaryWriter/QueueWriter 外面：write_batch() 只入队，
+    后台线程负责真正的写出；退出时还有丢弃没报告的话补一条 stats 事件。
+    """
+
+    def __init__(self, writer, capacity=20000, policy="sample", chat_rate=20.0, max_batch=1000, metrics=None):
+        self.writer = writer
+        self.max_batch = max_batch
+        self.kind = writer.kind
+        self.queue = ShedQueue(capacity, policy, chat_rate)
+        self.metrics = metrics
+        self.thread = threading.Thread(target=self._run, name="dy-shed-writer", daemon=True)
+        self.thread.start()
+
+    def write_batch(self, packs):
+        self.queue.put(packs)
+
+    def _run(self):
+        queue, writer, metrics = self.queue, self.writer, self.metrics
+        while True:
+            # 先看标志再取：看到 closed 之后不会再有新事件，取空就可以退出
+            closing = queue.closed
+            packs = queue.take(None, self.max_batch)
+            if closing:
+                # 退出前把最后一个周期的丢弃计数也报上去
+                stats = queue.take_stats()
+                if stats["dropped"]:
+                    packs.append(stats)
+            if packs:
+                t = time.perf_counter()
+                try:
+                    writer.write_batch(packs)
+                except Exception as e:
+                    if metrics is not None: metrics.error("write", e)
+                if metrics is not None:
+                    metrics.stage("write", time.perf_counter() - t)
+            if closing and queue.empty():
+                return
+
+    def close(self, timeout=5):
+        self.queue.close()
+        self.thread.join(timeout)
+        self.writer.close()
@@ -0,0 +1,93 @@
+"""
+房间滑动窗口统计 (analytics.py) 的开销和内存
+
+1. 吞吐：--rooms 个房间、每帧 --batch 条事件，用模拟时钟按 --rate 条/秒推 --events 条事件，
+   报告 add() 每条事件的微秒数，以及每 2 秒一次的 snapshot() 每个房间的微秒数
+2. 内存：单个房间按 10 / 100 / 1000 条/秒推满 60 分钟 (用户从 100 万人里随机取)，
+   报告 RoomAnalytics 占用的内存；对照组是把 60 分钟内的事件原样留在 deque 里、汇总时再数 (只跑到 100 条/秒)
+
+    python benchmarks/bench_analytics.py --rooms 200 --events 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import deque
+
+import synthetic
+
+import analytics
+
+
+def feed(engine, rnd, room_ids, events, batch, rate, snapshot_s=2.0):
+    """返回 (add 总耗时, snapshot 耗时列表, 每次 snapshot 的房间数)"""
+    now = 1_000_000.0
+    step = batch / rate
+    added, snaps, rooms = 0.0, [], 0
+    next_snapshot = now + snapshot_s
+    for i in range(events // batch):
+        packs = synthetic.decoded_events(rnd, room_ids[i % len(room_ids)], batch)
+        t = time.perf_counter()
+        engine.add(packs, now=now)
+        added += time.perf_counter() - t
+        now += step
+        if now >= next_snapshot:
+            t = time.perf_counter()
+            out = engine.snapshot(now=now)
+            snaps.append(time.perf_counter() - t)
+            rooms = len(out)
+            next_snapshot += snapshot_s
+    return added, snaps, rooms
+
+
+def room_memory(rate, users, naive=False):
+    """单个房间按 rate 条/秒推 60 分钟后的内存 (字节)"""
+    rnd = random.Random(rate)
+    tracemalloc.start()
+    engine = analytics.RoomAnalytics() if not naive else None
+    kept = deque()
+    now = 1_000_000.0
+    batch = max(1, rate // 10)
+    for _ in range(3600 * 10):
+        packs = synthetic.decoded_events(rnd, "1", batch, users=users)
+        if naive:
+            kept.extend((now, p["type"], p.get("user"), p.get("count")) for p in packs)
+            while kept and kept[0][0] < now - 3600:
+                kept.popleft()
+        else:
+            engine.add(packs, now=now)
+        now += 0.1
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=20, help="每帧事件数")
+    parser.add_argument("--rate", type=int, default=5000, help="所有房间合计的事件/秒 (模拟时钟)")
+    parser.add_argument("--users", type=int, default=1_000_000, help="内存测试的用户池大小")
+    parser.add_argument("--skip-memory", action="store_true")
+    args = parser.parse_args()
+
+    engine = analytics.RoomAnalytics(capacity=args.rooms * 2)
+    added, snaps, rooms = feed(engine, random.Random(1), synthetic.room_ids(args.rooms), args.events,
+                               args.batch, args.rate)
+    snaps.sort()
+    print(f"rooms={args.rooms} events={args.events:,} batch={args.batch} rate={args.rate}/s")
+    print(f"add: {added / args.events * 1e6:.2f} us/event ({args.events / added:,.0f} events/s)")
+    print(f"snapshot: p50 {snaps[len(snaps) // 2] * 1e3:.1f} ms, p99 {snaps[int(len(snaps) * 0.99)] * 1e3:.1f} ms "
+          f"for {rooms} rooms ({snaps[len(snaps) // 2] / max(1, rooms) * 1e6:.0f} us/room)")
+
+    if not args.skip_memory:
+        print(f"{'events/s':>9} {'analytics_KB':>13} {'deque_KB':>9}")
+        for rate in (10, 100, 1000):
+            kb = room_memory(rate, args.users) / 1024
+            naive = f"{room_memory(rate, args.users, naive=True) / 1024:>9.0f}" if rate <= 100 else f"{'-':>9}"
+            print(f"{rate:>9} {kb:>13.0f} {naive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+背压/降载策略对比：界面消费速度跟不上时，代理事件循环会不会被卡住、丢的是哪些事件
+
+一个大房间 (弹幕很多) 加若干小房间在真实的 asyncio 事件循环里推帧，writer 按 --consume
+条/秒的速度"消费"事件 (sleep 模拟界面读得慢、管道写满)。对每种 DY_SHED_POLICY 报告：
+  offered/s    : 实际推进来的消息速率，block 时事件循环被写出卡住，推不进去
+  loop p99/max : 事件循环的调度延迟，block 时写出直接卡在循环里
+  gift%        : 礼物送达比例 (应为 100%)
+  big/small chat% : 大房间 / 小房间弹幕的保留比例 (sample 应主要丢大房间的)
+  dropped      : stats 事件里上报的丢弃总数
+
+    python benchmarks/bench_backpressure.py --seconds 10 --consume 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+
+import synthetic
+
+import addon_backend
+import decoder
+
+MIX = {"WebcastChatMessage": 0.8, "WebcastGiftMessage": 0.05,
+       "WebcastMemberMessage": 0.1, "WebcastLikeMessage": 0.05}
+SWITCHES = ("chat", "gift", "enter", "like")
+
+
+class SlowWriter:
+    """每条事件耗时 1/rate 秒的 writer；fast=True 之后不再等待 (收尾时快速排空)"""
+    kind = "slow"
+
+    def __init__(self, rate):
+        self.delay = 1 / rate
+        self.fast = False
+        self.types = Counter()
+        self.chat_rooms = Counter()
+        self.dropped = 0
+
+    def write_batch(self, packs):
+        for p in packs:
+            kind = p.get("type")
+            self.types[kind] += 1
+            if kind == "chat":
+                self.chat_rooms[p["room_id"]] += 1
+            elif kind == "stats":
+                self.dropped += sum(p["dropped"].values())
+        if not self.fast:
+            time.sleep(len(packs) * self.delay)
+
+    def close(self):
+        pass
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def run_case(policy, args, pools, offered):
+    writer = SlowWriter(args.consume)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend = addon_backend.DouyinBackend(writer=writer, decode_workers=0, dedup="off", filters=SWITCHES,
+                                              shed_policy=policy, queue_events=args.queue, stats_ms=500)
+    backend.running()
+    room_ids = list(pools)
+    flows = {room_id: synthetic.fake_ws_flow(room_id) for room_id in room_ids}
+    big, small = room_ids[0], room_ids[1:]
+
+    lags = []
+    feeding = True
+
+    async def probe():
+        while feeding:
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t - 0.001)
+
+    def push(room_id, i):
+        flow = flows[room_id]
+        pool = pools[room_id]
+        flow.websocket.messages.append(synthetic.server_message(pool[i % len(pool)][1]))
+        backend.websocket_message(flow)
+        offered[room_id].update(pool[i % len(pool)][0])
+
+    probe_task = asyncio.create_task(probe())
+    tick = 0.01
+    big_per_tick = args.big_rate * tick
+    small_every = max(1, round(1 / (args.small_rate * tick)))
+    t0 = time.perf_counter()
+    i = ticks = 0
+    owed = 0.0
+    while time.perf_counter() - t0 < args.seconds:
+        owed += big_per_tick
+        while owed >= 1:
+            push(big, i)
+            owed -= 1
+            i += 1
+        if ticks % small_every == 0:
+            for room_id in small:
+                push(room_id, ticks)
+        ticks += 1
+        await asyncio.sleep(tick)
+    feeding = False
+    elapsed = time.perf_counter() - t0
+    await probe_task
+    writer.fast = True
+    backend.done()
+    return writer, lags, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--consume", type=int, default=2000, help="界面每秒能消费的事件数")
+    parser.add_argument("--big-rate", type=float, default=250, help="大房间每秒帧数 (每帧 20 条消息)")
+    parser.add_argument("--small-rooms", type=int, default=9)
+    parser.add_argument("--small-rate", type=float, default=1, help="小房间每秒帧数")
+    parser.add_argument("--queue", type=int, default=20000, help="DY_QUEUE_EVENTS")
+    args = parser.parse_args()
+
+    room_ids = synthetic.room_ids(1 + args.small_rooms)
+    methods = decoder.methods_for(SWITCHES)
+    pools = {}
+    for room_id in room_ids:
+        frames = [synthetic.push_frame(room_id, seed=i, mix=MIX) for i in range(32)]
+        pools[room_id] = [(Counter(p["type"] for p in decoder.decode_frame(raw, room_id, methods)), raw)
+                          for raw in frames]
+
+    print(f"big room {args.big_rate * 20:.0f} msg/s, {args.small_rooms} small rooms {args.small_rate * 20:.0f} msg/s each, "
+          f"consumer {args.consume}/s, queue {args.queue}")
+    print(f"{'policy':>12} {'offered/s':>10} {'loop_p99_ms':>12} {'loop_max_ms':>12} {'gift%':>7} {'big_chat%':>10} "
+          f"{'small_chat%':>12} {'dropped':>8}")
+    for policy in ("block", "drop_oldest", "sample"):
+        offered = {room_id: Counter() for room_id in room_ids}
+        writer, lags, elapsed = asyncio.run(run_case(policy, args, pools, offered))
+        total = Counter()
+        for c in offered.values():
+            total.update(c)
+        big = room_ids[0]
+        small_offered = sum(offered[r]["chat"] for r in room_ids[1:])
+        small_kept = sum(writer.chat_rooms[r] for r in room_ids[1:])
+        print(f"{policy:>12} {sum(total.values()) / elapsed:>10.0f} {_pct(lags, 0.99) * 1e3:>12.1f} {max(lags, default=0) * 1e3:>12.1f} "
+              f"{100 * writer.types['gift'] / max(1, total['gift']):>7.1f} "
+              f"{100 * writer.chat_rooms[big] / max(1, offered[big]['chat']):>10.1f} "
+              f"{100 * small_kept / max(1, small_offered):>12.1f} {writer.dropped:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+每个直播间的内存：每个房间一个浏览器进程 (旧做法) vs 浏览器池里的标签页
+
+需要本机装有 Chrome/Edge/Chromium (或用 --browser / DY_BROWSER 指定)。依次用两种方式打开
+--rooms 个直播间，等 --settle 秒让页面加载完，统计浏览器进程树的常驻内存和平均每个房间的占用。
+默认直连 (不经过 8081 代理)；GUI 的代理已经在运行时可以加 --proxy 走代理。
+
+    python benchmarks/bench_browser_pool.py --rooms 6 --url https://live.douyin.com/123456
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import synthetic  # noqa: F401  (把仓库根目录加入 sys.path)
+
+import browser_pool
+
+
+def measure_processes(args, browser, extra, root):
+    procs = []
+    try:
+        for i in range(args.rooms):
+            # 每个进程单独的数据目录：共用一个目录时后启动的进程会把页面交给第一个进程然后退出
+            procs.append(browser_pool.launch_browser(args.url, os.path.join(root, f"proc_{i}"), browser, extra))
+        time.sleep(args.settle)
+        return sum(browser_pool.process_tree_rss(p.pid) for p in procs), len(procs)
+    finally:
+        for p in procs:
+            browser_pool.kill_process_tree(p)
+
+
+def measure_pool(args, browser, extra, root):
+    pool = browser_pool.BrowserPool(os.path.join(root, "pool"), max_processes=args.processes,
+                                    rooms_per_process=args.per_process, browser_path=browser, extra_args=extra)
+    try:
+        for _ in range(args.rooms):
+            pool.open(args.url)
+        time.sleep(args.settle)
+        return sum(p.rss() for p in pool.processes), len(pool.processes)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=6)
+    parser.add_argument("--url", default="https://live.douyin.com/")
+    parser.add_argument("--settle", type=float, default=20, help="打开后等待的秒数")
+    parser.add_argument("--processes", type=int, default=2, help="浏览器池的进程数上限")
+    parser.add_argument("--per-process", type=int, default=8, help="每个进程最多的房间数")
+    parser.add_argument("--browser", default=None)
+    parser.add_argument("--proxy", action="store_true", help="经过 127.0.0.1:8081 代理")
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    browser = args.browser or browser_pool.find_browser()
+    if not browser:
+        print("未找到浏览器，用 --browser 或 DY_BROWSER 指定 Chrome/Edge/Chromium 的路径")
+        sys.exit(1)
+    extra = [] if args.proxy else ["--proxy-server=direct://"]
+    if args.headless:
+        extra.append("--headless=new")
+
+    root = tempfile.mkdtemp(prefix="dy_browser_bench_")
+    print(f"browser={browser} rooms={args.rooms} url={args.url} settle={args.settle}s")
+    print(f"{'mode':>8} {'processes':>10} {'total_mb':>9} {'mb/room':>8}")
+    try:
+        for name, measure in (("process", measure_processes), ("pool", measure_pool)):
+            rss, processes = measure(args, browser, extra, root)
+            print(f"{name:>8} {processes:>10} {rss / 1e6:>9.0f} {rss / 1e6 / args.rooms:>8.0f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+抓包文件的开销和回放速度
+
+1. 写入：websocket_message 里每帧多一次 CaptureWriter.write，分别测不压缩/zlib 的单帧耗时和文件大小
+2. 读取：mmap 顺序读出全部记录的速度
+3. 回放：replay.py 的尽快模式，整条解码路径的吞吐
+
+    python benchmarks/bench_capture.py --rooms 20 --frames 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+import synthetic
+
+import addon_backend
+import capture
+import replay
+
+
+def write_capture(directory, pool, frames, compress):
+    writer = capture.CaptureWriter(directory, compress=compress)
+    t0 = time.perf_counter()
+    for i in range(frames):
+        room_id, raw = pool[i % len(pool)]
+        writer.write(room_id, raw)
+    writer.close()
+    return (time.perf_counter() - t0) / frames, writer.bytes_written, writer.raw_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    room_ids = synthetic.room_ids(args.rooms)
+    pool = synthetic.frame_pool(room_ids, n_frames=256, n_messages=args.messages)
+    root = tempfile.mkdtemp(prefix="dy_capture_bench_")
+    try:
+        print(f"rooms={args.rooms} frames={args.frames} messages/frame={args.messages}")
+        print(f"{'compress':>9} {'us/frame':>9} {'file_mb':>8} {'ratio':>6} {'read_frames/s':>14}")
+        for compress in (False, True):
+            directory = f"{root}/{'zlib' if compress else 'raw'}"
+            per_frame, written, raw = write_capture(directory, pool, args.frames, compress)
+            t0 = time.perf_counter()
+            n = sum(1 for _ in capture.iter_capture(directory))
+            read = n / (time.perf_counter() - t0)
+            print(f"{'zlib' if compress else 'off':>9} {per_frame * 1e6:>9.2f} {written / 1e6:>8.1f} "
+                  f"{written / raw:>6.2f} {read:>14,.0f}")
+
+        # 帧池循环复用，msgId 会重复，回放时关掉去重
+        writer = replay.CountingWriter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend = addon_backend.DouyinBackend(writer=writer, decode_workers=args.workers, dedup="off",
+                                                  control="", capture_dir="")
+        t0 = time.perf_counter()
+        try:
+            frames, _, _ = asyncio.run(replay.replay(backend, f"{root}/raw", speed=0))
+        finally:
+            backend.done()
+        elapsed = time.perf_counter() - t0
+        events = sum(n for kind, n in writer.types.items() if kind != "stats")
+        print(f"replay (max speed, {args.workers} thread shards): {frames / elapsed:,.0f} frames/s "
+              f"{events / elapsed:,.0f} events/s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+弹幕全文索引 (event_store.chat_fts) 的写入开销和查询延迟
+
+1. 写入开销：同样 --cost-rows 条弹幕分别写进不带/带全文索引的 EventStore，
+   按写入线程的耗时算每条事件多花的微秒数和库文件变大的字节数
+2. 查询：--rows 条弹幕 (默认 1000 万，同一天) 写进一个库，StoreReader.search_chat 跑各类查询各 --queries 次，
+   报告 p50/p99 延迟和平均返回条数 (最多 --limit 条)；rare 是随机 4 个字、几乎没有命中的词，
+   对照组是同样的查询在 events 表上用 LIKE 逐行扫描
+
+    python benchmarks/bench_chat_search.py --rows 10000000
+    python benchmarks/bench_chat_search.py --keep /tmp/chatdb            # 保留生成的库
+    python benchmarks/bench_chat_search.py --keep /tmp/chatdb --reuse    # 直接用上次生成的库测查询
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import synthetic
+
+import event_store
+
+_CJK_CHARS = [c for c in synthetic._CHARS if not c.isascii()]
+_DAY = time.mktime(time.strptime("2026-10-01 12:00", "%Y-%m-%d %H:%M"))
+
+
+def fill(directory, rows, rooms, fts, batch=500):
+    """写 rows 条弹幕，返回 (写入线程耗时, 库文件字节数)"""
+    store = event_store.EventStore(directory, fts=fts)
+    rnd = random.Random(1)
+    room_ids = synthetic.room_ids(rooms)
+    for i in range(rows // batch):
+        packs = synthetic.decoded_events(rnd, room_ids[i % rooms], batch, gift_ratio=0, member_ratio=0,
+                                         content_len=rnd.randint(6, 24))
+        store.write_batch(packs, ts=_DAY + i * 0.01)
+        # 生成比写入快，积压太多时等一等，不然几百万条事件都堆在内存里
+        while store.pending_events > 200_000:
+            time.sleep(0.01)
+        if i and i % 2000 == 0:
+            print(f"  {i * batch:,} rows...", flush=True)
+    store.close()
+    size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    return store.busy, size
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1e3
+
+
+def run_queries(reader, cases, n):
+    results = {}
+    for name, query in cases.items():
+        latencies, rows = [], 0
+        for i in range(n):
+            t = time.perf_counter()
+            rows += len(query(i))
+            latencies.append(time.perf_counter() - t)
+        results[name] = (_pct(latencies, 0.5), _pct(latencies, 0.99), rows / n)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--cost-rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--scan-queries", type=int, default=5, help="LIKE 对照组每类的查询次数 (很慢)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--keep", default=None)
+    parser.add_argument("--reuse", action="store_true")
+    args = parser.parse_args()
+
+    # 1. 写入开销
+    if args.cost_rows:
+        costs = {}
+        for fts in (False, True):
+            directory = tempfile.mkdtemp(prefix="dy_fts_cost_")
+            try:
+                costs[fts] = fill(directory, args.cost_rows, args.rooms, fts)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        (busy0, size0), (busy1, size1) = costs[False], costs[True]
+        print(f"write cost ({args.cost_rows:,} chats): without index {busy0 / args.cost_rows * 1e6:.1f} us/event, "
+              f"with index {busy1 / args.cost_rows * 1e6:.1f} us/event "
+              f"(+{(busy1 - busy0) / args.cost_rows * 1e6:.1f} us, +{(size1 - size0) / args.cost_rows:.0f} B/event)")
+
+    # 2. 查询延迟
+    directory = args.keep or tempfile.mkdtemp(prefix="dy_fts_bench_")
+    try:
+        if not (args.reuse and os.listdir(directory)):
+            t0 = time.perf_counter()
+            busy, size = fill(directory, args.rows, args.rooms, fts=True)
+            print(f"built {args.rows:,} chats in {time.perf_counter() - t0:.0f}s "
+                  f"(writer {busy:.0f}s, {args.rows / busy:,.0f} events/s), {size / 1e6:,.0f} MB")
+        reader = event_store.StoreReader(directory)
+        rnd = random.Random(7)
+        room_ids = synthetic.room_ids(args.rooms)
+        words = {k: ["".join(rnd.choice(_CJK_CHARS) for _ in range(k)) for _ in range(args.queries)]
+                 for k in (1, 2, 3, 4)}
+        limit = args.limit
+        cases = {
+            "1 char": lambda i: reader.search_chat(words[1][i], limit=limit),
+            "2 chars": lambda i: reader.search_chat(words[2][i], limit=limit),
+            "3 chars": lambda i: reader.search_chat(words[3][i], limit=limit),
+            "rare (4)": lambda i: reader.search_chat(words[4][i], limit=limit),
+            "2 chars+room": lambda i: reader.search_chat(words[2][i], room_id=rnd.choice(room_ids), limit=limit),
+            "nickname": lambda i: reader.search_chat(user=f"用户{rnd.randrange(50_000)}", limit=limit),
+        }
+        print(f"{'query':>14} {'p50_ms':>8} {'p99_ms':>8} {'rows':>6}")
+        for name, (p50, p99, rows) in run_queries(reader, cases, args.queries).items():
+            print(f"{name:>14} {p50:>8.2f} {p99:>8.2f} {rows:>6.0f}")
+
+        if args.scan_queries:
+            day = reader.days()[0]
+            scans = {
+                "scan 2 chars": lambda i: reader._scan_chat(day, words[2][i], None, None, None, None, limit),
+                "scan rare (4)": lambda i: reader._scan_chat(day, words[4][i], None, None, None, None, limit),
+            }
+            for name, (p50, p99, rows) in run_queries(reader, scans, args.scan_queries).items():
+                print(f"{name:>14} {p50:>8.2f} {p99:>8.2f} {rows:>6.0f}")
+        reader.close()
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
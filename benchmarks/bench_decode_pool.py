@@ -0,0 +1,101 @@
+"""
+解码池基准：事件循环内同步解码 vs 线程池 vs 进程池
+
+在真实的 asyncio 事件循环里模拟多个并发直播间持续推帧，同时用一个探测任务
+测量事件循环的调度延迟 (也就是代理转发其他连接时要额外等待的时间)。
+输出总吞吐 (messages/s，以全部结果写出为准) 和循环延迟 p50/p99。
+
+    python benchmarks/bench_decode_pool.py --rooms 50 --frames 5000 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import synthetic
+
+import addon_backend
+
+
+class CountingWriter:
+    kind = "count"
+
+    def __init__(self):
+        self.events = 0
+
+    def write_batch(self, packs):
+        self.events += len(packs)
+
+    def close(self):
+        pass
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run_case(workers, kind, rooms, frames, messages):
+    room_ids = synthetic.room_ids(rooms)
+    pool = synthetic.frame_pool(room_ids, n_frames=min(frames, 256), n_messages=messages)
+    writer = CountingWriter()
+    # 帧池是循环复用的，msgId 会重复出现，压测时关掉去重；直接写出，不经过背压队列和 stats 事件
+    backend = addon_backend.DouyinBackend(writer=writer, decode_workers=workers, decode_pool=kind, dedup="off",
+                                          shed_policy="block")
+    backend.running()
+    flows = {room_id: synthetic.fake_ws_flow(room_id) for room_id in room_ids}
+
+    lags = []
+    feeding = True
+
+    async def probe():
+        while feeding or writer.events < expected:
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t - 0.001)
+
+    expected = frames * messages + rooms  # 每个房间还有一条 discovery
+    probe_task = asyncio.create_task(probe())
+    t0 = time.perf_counter()
+    for i in range(frames):
+        _, raw = pool[i % len(pool)]
+        room_id = room_ids[i % rooms]
+        flow = flows[room_id]
+        flow.websocket.messages.append(synthetic.server_message(raw))
+        backend.websocket_message(flow)
+        # 每轮所有房间各来一帧后让出一次事件循环，模拟多条连接交替到达
+        if (i + 1) % rooms == 0:
+            await asyncio.sleep(0)
+    feeding = False
+
+    deadline = time.perf_counter() + 120
+    while writer.events < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - t0
+    await probe_task
+    backend.done()
+    return writer.events, elapsed, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    cases = [(0, "inline"), (args.workers, "thread"), (args.workers, "process")]
+    print(f"rooms={args.rooms} frames={args.frames} messages/frame={args.messages}")
+    print(f"{'mode':>8} {'workers':>8} {'msgs/s':>12} {'lag_p50_ms':>11} {'lag_p99_ms':>11} {'lag_max_ms':>11}")
+    for workers, kind in cases:
+        events, elapsed, lags = asyncio.run(run_case(workers, kind, args.rooms, args.frames, args.messages))
+        print(f"{kind:>8} {workers:>8} {events / elapsed:>12,.0f} "
+              f"{statistics.median(lags) * 1e3 if lags else 0:>11.2f} "
+              f"{_pct(lags, 0.99) * 1e3:>11.2f} {max(lags, default=0) * 1e3:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
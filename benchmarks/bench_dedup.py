@@ -0,0 +1,83 @@
+"""
+msgId 去重的开销和效果
+
+1. 每帧开销：同一批帧 (没有重复消息) 分别在 off / exact / bloom 下 decode_frame，对比每帧耗时
+2. 重复流量：模拟同一房间开了两个标签页 (每帧到两次)，统计输出事件数和耗时
+3. 每个房间的内存占用，以及 Bloom filter 实测的误判率
+
+    python benchmarks/bench_dedup.py --frames 2000 --window 1024 --fpr 0.0001
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import synthetic
+
+import decoder
+from dedup import BloomWindow, DedupTable, RecentIds
+
+
+def run(frames, table, copies=1):
+    events = 0
+    t0 = time.perf_counter()
+    for room_id, raw in frames:
+        for _ in range(copies):
+            events += len(decoder.decode_frame(raw, room_id, decoder.DEFAULT_METHODS, table))
+    return time.perf_counter() - t0, events
+
+
+def window_bytes(factory, ids):
+    tracemalloc.start()
+    recent = factory()
+    for msg_id in ids:
+        recent.seen(msg_id)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def false_positive_rate(window, fpr, samples):
+    rnd = random.Random(5)
+    bloom = BloomWindow(window, fpr)
+    for _ in range(window):
+        bloom.seen(rnd.getrandbits(63))
+    hits = sum(bloom.seen(rnd.getrandbits(63)) for _ in range(samples))
+    return hits / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20, help="每帧消息数")
+    parser.add_argument("--window", type=int, default=1024, help="每个房间记住的 msgId 数")
+    parser.add_argument("--fpr", type=float, default=0.0001)
+    args = parser.parse_args()
+
+    frames = synthetic.frame_pool(synthetic.room_ids(args.rooms), n_frames=args.frames, n_messages=args.messages)
+    modes = ("off", "exact", "bloom")
+
+    print(f"frames={args.frames} rooms={args.rooms} messages/frame={args.messages} window={args.window} fpr={args.fpr}")
+    print(f"{'mode':>6} {'us/frame':>9} {'overhead':>9} {'dup_us/frame':>13} {'events':>8} {'dup_events':>11} {'dropped':>8}")
+    base = None
+    for mode in modes:
+        run(frames[:50], DedupTable(mode, args.window, args.fpr))  # 预热
+        elapsed, events = run(frames, DedupTable(mode, args.window, args.fpr))
+        table = DedupTable(mode, args.window, args.fpr)
+        dup_elapsed, dup_events = run(frames, table, copies=2)
+        per_frame = elapsed / len(frames) * 1e6
+        base = base or per_frame
+        print(f"{mode:>6} {per_frame:>9.1f} {per_frame / base - 1:>+9.1%} "
+              f"{dup_elapsed / len(frames) / 2 * 1e6:>13.1f} {events:>8} {dup_events:>11} {table.dropped:>8}")
+
+    ids = [random.getrandbits(63) for _ in range(args.window * 2)]
+    exact = window_bytes(lambda: RecentIds(args.window), ids)
+    bloom = window_bytes(lambda: BloomWindow(args.window, args.fpr), ids)
+    fp = false_positive_rate(args.window, args.fpr, 200_000)
+    print(f"每个房间内存: exact {exact / 1024:.1f} KB, bloom {bloom / 1024:.1f} KB; "
+          f"bloom 实测误判率 {fp:.5%} (目标 {args.fpr:.5%})")
+
+
+if __name__ == "__main__":
+    main()
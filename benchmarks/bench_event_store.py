@@ -0,0 +1,129 @@
+"""
+事件库 (event_store.py) 的写入吞吐和查询延迟
+
+1. 写入：几百万条合成事件按 --batch 条一批交给 EventStore.write_batch (接收时间均匀分布在 --days 天里)，
+   报告事件/秒、提交次数和库文件大小；对照组是每条事件一个事务 (默认的 rollback 日志 + FULL 同步)
+2. 查询：StoreReader 的三种查询各跑 --queries 次，报告 p50/p99 延迟
+   events  : 随机房间、随机 10 分钟窗口，最多 1000 条
+   gifts   : 单个房间全部时间的送礼排行 / 全部房间的送礼排行
+   search  : 随机 2 个字的关键词，全部房间 / 单个房间，最多 100 条
+
+    python benchmarks/bench_event_store.py --events 3000000 --rooms 100
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import synthetic
+
+import event_store
+
+
+def ingest(directory, args):
+    room_ids = synthetic.room_ids(args.rooms)
+    store = event_store.EventStore(directory, max_pending=args.events)
+    rnd = random.Random(1)
+    batches = args.events // args.batch
+    start = time.mktime(time.strptime("2026-10-01", "%Y-%m-%d"))
+    span = args.days * 86400
+    t0 = time.perf_counter()
+    for i in range(batches):
+        packs = synthetic.decoded_events(rnd, room_ids[i % args.rooms], args.batch)
+        store.write_batch(packs, ts=start + span * i / batches)
+    produced = time.perf_counter() - t0
+    store.close()
+    elapsed = time.perf_counter() - t0
+    size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    return store, produced, elapsed, size, start, span
+
+
+def per_event_commits(directory, n):
+    """对照组：不攒批，每条事件一个事务"""
+    conn = sqlite3.connect(os.path.join(directory, "naive.db"), isolation_level=None)
+    conn.executescript(event_store.SCHEMA)
+    rnd = random.Random(2)
+    packs = synthetic.decoded_events(rnd, "1", n)
+    t0 = time.perf_counter()
+    for i, p in enumerate(packs):
+        conn.execute("BEGIN")
+        conn.execute(event_store._INSERT, ("1", i, i, p["type"], p.get("user"), p.get("content"),
+                                           p.get("gift_name"), p.get("count"), None, None))
+        conn.execute("COMMIT")
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return n / elapsed
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1e3
+
+
+def queries(directory, args, start, span):
+    reader = event_store.StoreReader(directory)
+    room_ids = synthetic.room_ids(args.rooms)
+    rnd = random.Random(3)
+    words = ["".join(rnd.choice(synthetic._CHARS) for _ in range(2)) for _ in range(args.queries)]
+    cases = {
+        "events 10min": lambda i: reader.events(rnd.choice(room_ids), *_window(rnd, start, span, 600)),
+        "gifts room": lambda i: reader.gift_totals(rnd.choice(room_ids)),
+        "gifts all": lambda i: reader.gift_totals(),
+        "search all": lambda i: reader.search_chat(words[i]),
+        "search room": lambda i: reader.search_chat(words[i], room_id=rnd.choice(room_ids)),
+    }
+    results = {}
+    for name, query in cases.items():
+        latencies, rows = [], 0
+        for i in range(args.queries):
+            t = time.perf_counter()
+            rows += len(query(i))
+            latencies.append(time.perf_counter() - t)
+        results[name] = (_pct(latencies, 0.5), _pct(latencies, 0.99), rows / args.queries)
+    reader.close()
+    return results
+
+
+def _window(rnd, start, span, seconds):
+    lo = start + rnd.random() * (span - seconds)
+    return lo, lo + seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=3_000_000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=500, help="每次 write_batch 的事件数 (相当于后端攒批的一批)")
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--naive", type=int, default=5000, help="对照组的事件数，0 表示不跑")
+    parser.add_argument("--keep", default=None, help="把生成的库留在这个目录 (默认用临时目录，跑完删除)")
+    args = parser.parse_args()
+
+    directory = args.keep or tempfile.mkdtemp(prefix="dy_store_bench_")
+    try:
+        store, produced, elapsed, size, start, span = ingest(directory, args)
+        print(f"events={args.events:,} rooms={args.rooms} batch={args.batch} days={args.days}")
+        print(f"ingest: {args.events / elapsed:,.0f} events/s (生成+入队 {produced:.1f}s, 写完 {elapsed:.1f}s, "
+              f"写入线程忙 {store.busy:.1f}s) commits={store.commits} dropped={store.dropped} "
+              f"size={size / 1e6:.0f} MB ({size / args.events:.0f} B/event)")
+        if args.naive:
+            naive_dir = tempfile.mkdtemp(prefix="dy_store_naive_")
+            try:
+                print(f"对照 (每条一个事务): {per_event_commits(naive_dir, args.naive):,.0f} events/s")
+            finally:
+                shutil.rmtree(naive_dir, ignore_errors=True)
+
+        print(f"{'query':>14} {'p50_ms':>8} {'p99_ms':>8} {'rows':>7}")
+        for name, (p50, p99, rows) in queries(directory, args, start, span).items():
+            print(f"{name:>14} {p50:>8.2f} {p99:>8.2f} {rows:>7.0f}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
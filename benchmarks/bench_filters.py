@@ -0,0 +1,52 @@
+"""
+抓取条件下推的收益：同一批帧在不同开关组合下的解码耗时
+
+模拟大房间的消息构成 (弹幕和进场占大头)，对比全部打开、只关弹幕、只留礼物时
+decode_frame 的 frames/s。关掉的 method 在解析 payload 之前就被跳过。
+
+    python benchmarks/bench_filters.py
+"""
+import argparse
+import time
+
+import synthetic
+
+import decoder
+
+BIG_ROOM_MIX = {
+    "WebcastChatMessage": 0.45,
+    "WebcastMemberMessage": 0.30,
+    "WebcastLikeMessage": 0.20,
+    "WebcastGiftMessage": 0.05,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    room_id = synthetic.room_ids(1)[0]
+    frames = [raw for _, raw in synthetic.frame_pool([room_id], n_frames=128, n_messages=args.messages,
+                                                     mix=BIG_ROOM_MIX)]
+    cases = [
+        ("全部", ("chat", "gift", "enter", "like")),
+        ("关弹幕", ("gift", "enter", "like")),
+        ("礼物+弹幕", ("chat", "gift")),
+        ("只留礼物", ("gift",)),
+    ]
+    print(f"messages/frame={args.messages} mix={BIG_ROOM_MIX}")
+    print(f"{'switches':>10} {'frames/s':>10} {'events/frame':>13}")
+    for label, switches in cases:
+        methods = decoder.methods_for(switches)
+        events = 0
+        t0 = time.perf_counter()
+        for i in range(args.frames):
+            events += len(decoder.decode_frame(frames[i % len(frames)], room_id, methods))
+        elapsed = time.perf_counter() - t0
+        print(f"{label:>10} {args.frames / elapsed:>10,.0f} {events / args.frames:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
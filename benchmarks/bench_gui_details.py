@@ -0,0 +1,134 @@
+"""
+"实时抓取数据" 表的界面压测：旧的 QTableWidget 逐条插行 vs EventRingModel 每个 tick 批量插入
+
+不需要显示器，用 Qt 的 offscreen 平台运行。GUI 线程上的定时器每 10ms 按目标速率
+投递一批事件 (相当于 CaptureWorker 的信号排队到达)，同时记录这个定时器实际的触发间隔：
+界面跟不上时间隔会被拉长。逐级提高速率，报告每级的实际吞吐和 p95 延迟，
+以及 p95 延迟不超过 --max-lag 时能持续的最高速率。
+
+    python benchmarks/bench_gui_details.py --rates 500,1000,2000,5000,10000,20000
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import synthetic  # noqa: F401  (把仓库根目录加入 sys.path)
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QHeaderView, QTableView, QTableWidget, QTableWidgetItem
+
+from gui_models import EventRingModel
+
+TICK_MS = 10
+
+
+class LegacyDetails:
+    """旧版 handle_data 的写法：每条事件 insertRow + 5 个 item，超过 200 行 removeRow(0)"""
+
+    def __init__(self, capacity):
+        self.view = QTableWidget(0, 5)
+        self.view.setHorizontalHeaderLabels(["房间ID", "用户", "类型", "内容", "时间"])
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.view.setAlternatingRowColors(True)
+
+    def add(self, room_id, user, label, content):
+        d_row = self.view.rowCount()
+        self.view.insertRow(d_row)
+        self.view.setItem(d_row, 0, QTableWidgetItem(room_id))
+        self.view.setItem(d_row, 1, QTableWidgetItem(user))
+        self.view.setItem(d_row, 2, QTableWidgetItem(label))
+        self.view.setItem(d_row, 3, QTableWidgetItem(content))
+        self.view.setItem(d_row, 4, QTableWidgetItem(time.strftime('%H:%M:%S')))
+        if d_row > 200: self.view.removeRow(0)
+        self.view.scrollToBottom()
+
+    def tick(self):
+        pass
+
+
+class RingDetails:
+    """MainWindow 现在的写法：事件进模型，UI_TICK_MS 定时器里统一 flush"""
+
+    def __init__(self, capacity, tick_ms=50):
+        self.model = EventRingModel(capacity)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.view.setAlternatingRowColors(True)
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(tick_ms)
+
+    def add(self, room_id, user, label, content):
+        self.model.append(room_id, user, label, content)
+
+    def tick(self):
+        scroll = self.view.verticalScrollBar()
+        at_bottom = scroll.value() >= scroll.maximum()
+        if self.model.flush() and at_bottom:
+            self.view.scrollToBottom()
+
+
+def run_rate(app, impl, rate, seconds):
+    per_tick = max(1, rate * TICK_MS // 1000)
+    intervals = []
+    sent = 0
+    last = time.perf_counter()
+    t0 = last
+
+    def produce():
+        nonlocal sent, last
+        now = time.perf_counter()
+        intervals.append(now - last)
+        last = now
+        for i in range(per_tick):
+            impl.add("7300000000000000001", f"用户{(sent + i) % 9973}", "弹幕", f"第 {sent + i} 条弹幕 主播好厉害")
+        sent += per_tick
+
+    timer = QTimer()
+    timer.timeout.connect(produce)
+    timer.start(TICK_MS)
+    while time.perf_counter() - t0 < seconds:
+        app.processEvents()
+    timer.stop()
+    impl.tick()
+    app.processEvents()
+    elapsed = time.perf_counter() - t0
+    intervals.sort()
+    lag = intervals[int(len(intervals) * 0.95)] - TICK_MS / 1000 if intervals else 0.0
+    return sent / elapsed, max(0.0, lag)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="500,1000,2000,5000,10000,20000", help="目标事件速率 (条/秒)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每级持续时间")
+    parser.add_argument("--capacity", type=int, default=5000, help="环形缓冲区容量")
+    parser.add_argument("--max-lag", type=float, default=50, help="可接受的 p95 延迟 (ms)")
+    args = parser.parse_args()
+    rates = [int(r) for r in args.rates.split(",")]
+
+    app = QApplication(sys.argv)
+    print(f"platform={app.platformName()} capacity={args.capacity}")
+    print(f"{'impl':>8} {'target/s':>9} {'actual/s':>9} {'p95_lag_ms':>11}")
+    for name, cls in (("legacy", LegacyDetails), ("ring", RingDetails)):
+        impl = cls(args.capacity)
+        impl.view.resize(900, 400)
+        impl.view.show()
+        sustained = 0
+        for rate in rates:
+            actual, lag = run_rate(app, impl, rate, args.seconds)
+            print(f"{name:>8} {rate:>9} {actual:>9.0f} {lag * 1e3:>11.1f}")
+            if lag * 1e3 > args.max_lag or actual < rate * 0.9:
+                break
+            sustained = rate
+        print(f"{name:>8} 可持续速率 (p95 延迟 <= {args.max_lag:.0f}ms): {sustained} 条/秒")
+        impl.view.close()
+
+
+if __name__ == "__main__":
+    main()
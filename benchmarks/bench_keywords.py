@@ -0,0 +1,100 @@
+"""
+关键词告警 (keywords.py) 每条弹幕的匹配开销：10 / 1k / 10k 个关键词
+
+每种词表规模分别测：
+  loop          : 逐个关键词 `kw in content` (不用自动机的写法)
+  matcher       : keywords.KeywordMatcher (Aho-Corasick；词数不超过 LOOP_MAX 时就是逐词匹配)
+  pyahocorasick : 同样的词表用 pyahocorasick (C 实现) 对照 (装了才测)
+报告编译耗时、每条弹幕的微秒数和命中率。关键词是随机 2~5 个汉字 / 4~8 个字母的词，
+弹幕是合成内容，其中 --hit-ratio 的弹幕插进一个随机关键词。
+
+    python benchmarks/bench_keywords.py --messages 20000 --sizes 10,1000,10000
+"""
+import argparse
+import random
+import time
+
+import synthetic
+
+import keywords
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def make_keywords(rnd, n):
+    words = set()
+    while len(words) < n:
+        if rnd.random() < 0.8:
+            words.add("".join(chr(rnd.randint(0x4e00, 0x9fa5)) for _ in range(rnd.randint(2, 5))))
+        else:
+            words.add("".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(4, 8))))
+    return sorted(words)
+
+
+def make_messages(rnd, n, words, hit_ratio):
+    packs = synthetic.decoded_events(rnd, "1", n, gift_ratio=0, member_ratio=0, content_len=rnd.randint(8, 24))
+    texts = []
+    for p in packs:
+        text = p["content"]
+        if rnd.random() < hit_ratio:
+            at = rnd.randrange(len(text) + 1)
+            text = text[:at] + rnd.choice(words) + text[at:]
+        texts.append(text)
+    return texts
+
+
+def per_message(match, texts):
+    hits = 0
+    t0 = time.perf_counter()
+    for text in texts:
+        if match(text):
+            hits += 1
+    return (time.perf_counter() - t0) / len(texts) * 1e6, hits / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--sizes", default="10,1000,10000", help="词表规模，逗号分隔")
+    parser.add_argument("--hit-ratio", type=float, default=0.01, help="插入关键词的弹幕比例")
+    parser.add_argument("--loop-messages", type=int, default=2000, help="逐词匹配太慢，只测这么多条")
+    args = parser.parse_args()
+
+    print(f"messages={args.messages} hit_ratio={args.hit_ratio} pyahocorasick={'yes' if ahocorasick else 'no'}")
+    print(f"{'patterns':>9} {'matcher':>14} {'compile_ms':>11} {'us/msg':>8} {'hit_rate':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rnd = random.Random(size)
+        words = make_keywords(rnd, size)
+        texts = make_messages(rnd, args.messages, words, args.hit_ratio)
+
+        folded = [w.casefold() for w in words]
+
+        def loop(text):
+            text = text.casefold()
+            return [w for w in folded if w in text]
+
+        us, rate = per_message(loop, texts[:args.loop_messages])
+        print(f"{size:>9} {'loop':>14} {0:>11.1f} {us:>8.2f} {rate:>9.2%}")
+
+        t0 = time.perf_counter()
+        matcher = keywords.KeywordMatcher(words)
+        compile_ms = (time.perf_counter() - t0) * 1e3
+        us, rate = per_message(matcher.match, texts)
+        print(f"{size:>9} {'matcher':>14} {compile_ms:>11.1f} {us:>8.2f} {rate:>9.2%}")
+
+        if ahocorasick is not None:
+            t0 = time.perf_counter()
+            native = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+            for i, w in enumerate(folded):
+                native.add_word(w, i)
+            native.make_automaton()
+            compile_ms = (time.perf_counter() - t0) * 1e3
+            us, rate = per_message(lambda text: list(native.iter(text.casefold())), texts)
+            print(f"{size:>9} {'pyahocorasick':>14} {compile_ms:>11.1f} {us:>8.2f} {rate:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+代理运行方式对比：独立后端进程 (subprocess + binary 事件通道) vs 同进程线程 (inprocess + 队列)
+
+每种方式在一个新的 Python 进程里测 (把 mitmproxy 的导入时间也算进去)：
+  启动时间 : 从进程开始到代理端口可以连接
+  事件延迟 : 本机的模拟推送服务器经过代理推一帧弹幕，到界面侧拿到解码后的事件
+  内存     : 测量进程及其子进程 (后端进程) 的常驻内存之和
+界面侧在两种方式下都要再等一个 UI_TICK_MS 才显示，这部分不计入。
+
+    python benchmarks/bench_proxy_modes.py --frames 500 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+T0 = time.perf_counter()
+
+import synthetic
+
+ROOT = synthetic.ROOT
+ROOM_ID = "7300000000000000042"
+
+
+def start_subprocess(events):
+    import transport
+    listener = transport.BinaryListener()
+    env = dict(os.environ, **listener.child_env())
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "addon_backend.py")], env=env,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not listener.accept(timeout=30):
+        raise RuntimeError("后端没有连上 binary 事件通道")
+
+    def read():
+        for batch in listener.iter_batches():
+            events.put((time.perf_counter(), batch))
+    threading.Thread(target=read, daemon=True).start()
+
+    def stop():
+        proc.terminate()
+        proc.wait(10)
+        listener.close()
+    return stop
+
+
+def start_inprocess(events):
+    import addon_backend
+    import transport
+    batches = queue.SimpleQueue()
+    backend = addon_backend.DouyinBackend(writer=transport.QueueWriter(batches), control="")
+    proxy = addon_backend.ProxyThread(backend)
+    proxy.start()
+    if not proxy.ready.wait(30) or proxy.error:
+        raise RuntimeError(f"代理线程启动失败: {proxy.error}")
+
+    def read():
+        while True:
+            batch = batches.get()
+            events.put((time.perf_counter(), batch))
+    threading.Thread(target=read, daemon=True).start()
+    return proxy.stop
+
+
+async def drive(port, frames, rate, events):
+    server = await synthetic.PushServer().start()
+    _, writer, task = await synthetic.ws_client_via_proxy(port, server.port, ROOM_ID)
+    await asyncio.wait_for(server.connected.wait(), 10)
+    payloads = [synthetic.chat_frame(ROOM_ID, f"seq:{i}", seed=i) for i in range(frames)]
+    sent = {}
+    for i, frame in enumerate(payloads):
+        sent[f"seq:{i}"] = time.perf_counter()
+        await server.send(frame)
+        await asyncio.sleep(1 / rate)
+
+    latencies = []
+    deadline = time.perf_counter() + 10
+    while len(latencies) < frames and time.perf_counter() < deadline:
+        try:
+            t, batch = events.get_nowait()
+        except queue.Empty:
+            await asyncio.sleep(0.005)
+            continue
+        for data in batch:
+            if data.get("type") == "chat" and data.get("content") in sent:
+                latencies.append(t - sent[data["content"]])
+    writer.close()
+    task.cancel()
+    server.close()
+    return latencies
+
+
+def child(mode, args):
+    import browser_pool
+    events = queue.SimpleQueue()
+    stop = (start_subprocess if mode == "subprocess" else start_inprocess)(events)
+    startup = time.perf_counter() - T0
+    synthetic.wait_port(args.port)
+    startup_port = time.perf_counter() - T0
+    try:
+        latencies = asyncio.run(drive(args.port, args.frames, args.rate, events))
+        rss = browser_pool.process_tree_rss(os.getpid()) / 1e6
+    finally:
+        stop()
+    latencies.sort()
+    pct = (lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e3) if latencies else (lambda p: 0.0)
+    print(json.dumps({"mode": mode, "startup": max(startup, startup_port), "received": len(latencies),
+                      "p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "rss": rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="每秒推送的帧数")
+    parser.add_argument("--port", type=int, default=18181)
+    parser.add_argument("--child", choices=("subprocess", "inprocess"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 模拟服务器在 127.0.0.1 上，清空 ignore_hosts 让代理解析这些流量
+    os.environ.update(DY_LISTEN_PORT=str(args.port), DY_IGNORE_HOSTS="", DY_FILTERS="chat")
+    if args.child:
+        child(args.child, args)
+        return
+
+    print(f"frames={args.frames} rate={args.rate}/s flush={os.environ.get('DY_FLUSH_MS', '20')}ms")
+    print(f"{'mode':>10} {'startup_ms':>11} {'received':>9} {'p50_ms':>7} {'p95_ms':>7} {'p99_ms':>7} {'rss_mb':>7}")
+    for mode in ("subprocess", "inprocess"):
+        out = subprocess.run([sys.executable, __file__, "--child", mode, "--frames", str(args.frames),
+                              "--rate", str(args.rate), "--port", str(args.port)],
+                             capture_output=True, text=True, encoding="utf-8")
+        line = next((l for l in reversed(out.stdout.splitlines()) if l.startswith("{")), None)
+        if line is None:
+            print(f"{mode:>10} 失败:\n{out.stdout[-1000:]}{out.stderr[-2000:]}")
+            continue
+        r = json.loads(line)
+        print(f"{mode:>10} {r['startup'] * 1e3:>11.0f} {r['received']:>9} {r['p50']:>7.1f} "
+              f"{r['p95']:>7.1f} {r['p99']:>7.1f} {r['rss']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+长时间会话下的直播间表：旧的 set + 每 600 秒 clear() vs RoomRegistry (TTL + LRU)
+
+用模拟时钟跑几个小时的会话：几百个房间持续推帧，并且不断有房间下播、新房间开播。
+统计每 10 分钟窗口里上报的 discovery 事件数和表的大小。旧做法每次 clear 后所有活跃房间
+都会重新上报一遍；RoomRegistry 只在房间真正新出现时上报，表的大小随活跃房间数保持稳定。
+
+    python benchmarks/bench_room_registry.py --rooms 300 --hours 6
+"""
+import argparse
+import random
+import tracemalloc
+
+import synthetic  # noqa: F401  (把仓库根目录加入 sys.path)
+
+import rooms
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(kind, args):
+    rnd = random.Random(7)
+    clock = Clock()
+    if kind == "registry":
+        registry = rooms.RoomRegistry(ttl=args.ttl, capacity=args.capacity, clock=clock)
+    else:
+        seen, last_clean = set(), 0.0
+
+    active = [str(7_300_000_000_000_000_000 + i) for i in range(args.rooms)]
+    next_id = args.rooms
+    windows = []
+    discoveries = 0
+    max_size = 0
+    tracemalloc.start()
+    for tick in range(int(args.hours * 3600 / args.interval)):
+        clock.now = tick * args.interval
+        # 每分钟有一部分房间下播，换成新开播的房间
+        if tick and tick % int(60 / args.interval) == 0:
+            for _ in range(int(len(active) * args.churn)):
+                active[rnd.randrange(len(active))] = str(7_300_000_000_000_000_000 + next_id)
+                next_id += 1
+        for room_id in active:
+            if kind == "registry":
+                _, is_new = registry.touch(room_id, 512)
+                size = len(registry)
+            else:
+                is_new = room_id not in seen
+                seen.add(room_id)
+                if clock.now - last_clean > 600:
+                    seen.clear()
+                    last_clean = clock.now
+                size = len(seen)
+            discoveries += is_new
+            max_size = max(max_size, size)
+        if clock.now and clock.now % 600 == 0:
+            windows.append(discoveries)
+            discoveries = 0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return windows, max_size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=300, help="同时活跃的房间数")
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--interval", type=float, default=10, help="每个房间的推帧间隔 (模拟秒)")
+    parser.add_argument("--churn", type=float, default=0.02, help="每分钟换掉的房间比例")
+    parser.add_argument("--ttl", type=float, default=600)
+    parser.add_argument("--capacity", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"rooms={args.rooms} hours={args.hours} churn={args.churn:.0%}/min ttl={args.ttl}s capacity={args.capacity}")
+    print(f"{'table':>10} {'disc/10min avg':>15} {'disc/10min max':>15} {'max_size':>9} {'peak_kb':>9}")
+    for kind in ("set+clear", "registry"):
+        windows, max_size, peak = simulate(kind, args)
+        steady = windows[1:] or windows  # 第一个窗口是冷启动
+        print(f"{kind:>10} {sum(steady) / len(steady):>15.0f} {max(steady):>15} {max_size:>9} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
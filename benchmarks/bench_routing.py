@@ -0,0 +1,134 @@
+"""
+路由时机基准：response 钩子里设置 stream (旧行为，实际已缓冲) vs responseheaders 钩子里决定
+
+用 create_master() 按 start_proxy 的配置在本机起一个代理，后面接一个慢速源站：
+响应体分块发送、块间有间隔。并发请求若干非 enter_room 的资源，统计客户端的
+首字节时间 (TTFB)、总耗时，以及代理进程常驻内存的峰值增长。
+本机回环地址不含 webcast，所以压测时把 ignore_hosts 清空让流量经过插件。
+
+    python benchmarks/bench_routing.py --size 900000 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import synthetic
+
+import addon_backend
+
+
+class LegacyRouting(addon_backend.DouyinBackend):
+    """旧版的路由方式：到 response 钩子才设置 stream，此时响应体早已缓冲完"""
+
+    def responseheaders(self, flow):
+        pass
+
+    def response(self, flow):
+        if "webcast/room/enter_room" not in flow.request.url:
+            flow.response.stream = True
+            return
+        super().response(flow)
+
+
+class NullWriter:
+    kind = "null"
+
+    def write_batch(self, packs):
+        pass
+
+    def close(self):
+        pass
+
+
+async def origin_server(size, chunks, delay):
+    chunk = b"x" * (size // chunks)
+    body_len = len(chunk) * chunks
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n"
+                             b"Content-Length: %d\r\n\r\n" % body_len)
+                for _ in range(chunks):
+                    writer.write(chunk)
+                    await writer.drain()
+                    await asyncio.sleep(delay)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], body_len
+
+
+async def fetch(proxy_port, origin_port, path):
+    t0 = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", proxy_port)
+    writer.write(f"GET http://127.0.0.1:{origin_port}{path} HTTP/1.1\r\n"
+                 f"Host: 127.0.0.1:{origin_port}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    first = await reader.read(1)
+    ttfb = time.perf_counter() - t0
+    head = first + await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+    total = time.perf_counter() - t0
+    writer.close()
+    return ttfb, total
+
+
+async def run_case(addon_cls, args, port):
+    server, origin_port, _ = await origin_server(args.size, args.chunks, args.delay)
+    backend = addon_cls(writer=NullWriter(), decode_workers=0)
+    master = addon_backend.create_master(backend, listen_port=port, ignore_hosts=())
+    proxy_task = asyncio.create_task(master.run())
+    await asyncio.sleep(1.0)
+
+    baseline = synthetic.rss_mb()
+    peak = baseline
+    done = False
+
+    async def sample():
+        nonlocal peak
+        while not done:
+            peak = max(peak, synthetic.rss_mb())
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample())
+    results = await asyncio.gather(*(fetch(port, origin_port, f"/webcast/assets/{i}.bin")
+                                     for i in range(args.concurrency)))
+    done = True
+    await sampler
+
+    master.shutdown()
+    await proxy_task
+    server.close()
+    return results, peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=900_000, help="响应体大小 (小于 stream_large_bodies=1m)")
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.01, help="源站分块间隔 (秒)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=18081)
+    args = parser.parse_args()
+
+    print(f"body={args.size}B chunks={args.chunks} delay={args.delay * 1e3:.0f}ms concurrency={args.concurrency}")
+    print(f"{'routing':>16} {'ttfb_p50_ms':>12} {'total_p50_ms':>13} {'rss_peak_mb':>12}")
+    for i, (label, cls) in enumerate([("response(旧)", LegacyRouting),
+                                      ("responseheaders", addon_backend.DouyinBackend)]):
+        results, rss = asyncio.run(run_case(cls, args, args.port + i))
+        ttfb = statistics.median(r[0] for r in results) * 1e3
+        total = statistics.median(r[1] for r in results) * 1e3
+        print(f"{label:>16} {ttfb:>12.1f} {total:>13.1f} {rss:>+12.1f}")
+
+
+if __name__ == "__main__":
+    main()
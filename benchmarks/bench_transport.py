@@ -0,0 +1,100 @@
+"""
+事件通道基准：text (DY_DATA:: 行) vs binary (长度前缀 msgpack 帧)
+
+子进程用 transport 的 writer 产生事件，父进程用 CaptureWorker 同款的解析方式消费，
+统计 events/sec 和两端合计的每事件 CPU 时间。
+
+    python benchmarks/bench_transport.py --events 200000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import synthetic  # noqa: F401  (把仓库根目录加入 sys.path)
+
+import transport
+
+
+def _cpu_seconds():
+    self_ = resource.getrusage(resource.RUSAGE_SELF)
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return self_.ru_utime + self_.ru_stime + child.ru_utime + child.ru_stime
+
+
+def _sample_packs(n):
+    packs = []
+    for i in range(n):
+        if i % 10 == 0:
+            packs.append({"type": "gift", "room_id": "7300000000000000001", "user": f"用户{i}",
+                          "gift_name": "小心心", "count": i % 30 + 1, "time": str(1_700_000_000_000 + i)})
+        else:
+            packs.append({"type": "chat", "room_id": "7300000000000000001", "user": f"用户{i}",
+                          "content": "主播好厉害哈哈哈来了支持一波666", "time": str(1_700_000_000_000 + i)})
+    return packs
+
+
+def produce(args):
+    """子进程：按批写出事件"""
+    writer = transport.open_writer()
+    packs = _sample_packs(args.batch)
+    sent = 0
+    while sent < args.events:
+        writer.write_batch(packs)
+        sent += len(packs)
+    writer.close()
+
+
+def consume(mode, events, batch):
+    cmd = [sys.executable, os.path.abspath(__file__), "--produce", "--events", str(events), "--batch", str(batch)]
+    env = dict(os.environ)
+    listener = None
+    if mode == "binary":
+        listener = transport.BinaryListener()
+        env.update(listener.child_env())
+    else:
+        env[transport.ENV_TRANSPORT] = "text"
+
+    cpu0, t0 = _cpu_seconds(), time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1, env=env)
+    received = 0
+    if listener:
+        if not listener.accept(timeout=10):
+            raise RuntimeError("producer did not connect")
+        for batch_packs in listener.iter_batches():
+            received += len(batch_packs)
+        listener.close()
+    else:
+        for line in proc.stdout:
+            if transport.parse_text_line(line.strip()) is not None:
+                received += 1
+    proc.wait()
+    elapsed = time.perf_counter() - t0
+    cpu = _cpu_seconds() - cpu0
+    return received, elapsed, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=50, help="每批事件数 (一帧 PushFrame 的典型消息数)")
+    parser.add_argument("--produce", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.produce:
+        produce(args)
+        return
+
+    cases = [("text", 1), ("text", args.batch)]
+    if transport.msgpack is not None:
+        cases.append(("binary", args.batch))
+    print(f"{'transport':>10} {'batch':>6} {'events/s':>12} {'cpu_us/event':>13}")
+    for mode, batch in cases:
+        received, elapsed, cpu = consume(mode, args.events, batch)
+        print(f"{mode:>10} {batch:>6} {received / elapsed:>12,.0f} {cpu / received * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+快速解码路径 (wire_decode) 的微基准：dy_pb2 完整解析、FieldExtractor (纯 Python 扫描)
+和 decoder 实际使用的路径 (当前 protobuf 后端下) 分别测 messages/sec。
+和完整解析的一致性由 tests/test_wire_decode.py 校验。纯 Python 版 protobuf 下的对比可以这样跑：
+
+    python benchmarks/bench_wire_decode.py
+    PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=python python benchmarks/bench_wire_decode.py --count 500
+"""
+import argparse
+import random
+import time
+
+import synthetic
+
+import decoder
+import wire_decode
+from google.protobuf.internal import api_implementation
+
+
+def bench(fn, samples, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for buf in samples:
+            fn(buf)
+    return rounds * len(samples) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000, help="每种消息的合成样本数")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(2024)
+    room_id = synthetic.room_ids(1)[0]
+    chats = [synthetic.chat_message(rnd, room_id, content_len=rnd.randint(1, 60))[1] for _ in range(args.count)]
+    gifts = [synthetic.gift_message(rnd, room_id)[1] for _ in range(args.count)]
+
+    print(f"protobuf backend: {api_implementation.Type()}  "
+          f"(快速路径: {type(decoder.DECODERS['WebcastChatMessage'].fast).__name__})")
+    print(f"{'message':>8} {'decoder':>8} {'msgs/s':>12}")
+    for kind, method, samples in (("chat", "WebcastChatMessage", chats), ("gift", "WebcastGiftMessage", gifts)):
+        d = decoder.DECODERS[method]
+        wire = wire_decode.FieldExtractor(d.full.message_class, d.paths)
+        for name, fn in (("dy_pb2", d.full.extract), ("wire", wire.extract),
+                         ("decoder", lambda buf: d.decode(buf, room_id))):
+            print(f"{kind:>8} {name:>8} {bench(fn, samples, args.rounds):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
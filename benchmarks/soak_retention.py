@@ -0,0 +1,73 @@
+"""
+WebSocket 帧保留窗口的内存浸泡测试。
+
+用合成的 PushFrame 持续喂给同一条长连接的 DouyinBackend.websocket_message，
+定期采样常驻内存。开启保留窗口时 RSS 应该在预热后保持平稳；
+--keep -1 复现 mitmproxy 默认的"全部保留"行为作为对照。
+
+    python benchmarks/soak_retention.py --frames 200000 --keep 0
+    python benchmarks/soak_retention.py --frames 200000 --keep -1
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+import synthetic
+
+import addon_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200_000, help="总共喂入的帧数")
+    parser.add_argument("--keep", type=int, default=0, help="保留窗口 (-1 全部保留, 0 解码后丢弃, N 保留最近 N 帧)")
+    parser.add_argument("--messages", type=int, default=20, help="每帧消息数")
+    parser.add_argument("--samples", type=int, default=10, help="RSS 采样次数")
+    parser.add_argument("--max-growth", type=float, default=20.0, help="预热后允许的 RSS 增长 (MB)")
+    args = parser.parse_args()
+
+    room_id = synthetic.room_ids(1)[0]
+    pool = [raw for _, raw in synthetic.frame_pool([room_id], n_frames=256, n_messages=args.messages)]
+    # 同步解码，避免解码池的排队积压混进内存曲线；帧池循环复用，关掉 msgId 去重
+    backend = addon_backend.DouyinBackend(ws_keep_frames=args.keep, decode_workers=0, dedup="off")
+    flow = synthetic.fake_ws_flow(room_id)
+
+    # 事件输出不是这里的测量对象，直接丢掉
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+
+    step = max(1, args.frames // args.samples)
+    samples = []
+    t0 = time.perf_counter()
+    try:
+        for i in range(args.frames):
+            # 每帧都是新对象，和 mitmproxy 每次收到数据后新建 WebSocketMessage 一致
+            flow.websocket.messages.append(synthetic.server_message(bytes(bytearray(pool[i % len(pool)]))))
+            backend.websocket_message(flow)
+            if (i + 1) % step == 0:
+                gc.collect()
+                samples.append((i + 1, len(flow.websocket.messages), synthetic.rss_mb()))
+    finally:
+        backend.done()
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    elapsed = time.perf_counter() - t0
+
+    print(f"keep={args.keep} frames={args.frames} messages/frame={args.messages} "
+          f"({args.frames / elapsed:,.0f} frames/s)")
+    print(f"{'frames':>10} {'retained':>10} {'rss_mb':>10}")
+    for frames, retained, rss in samples:
+        print(f"{frames:>10} {retained:>10} {rss:>10.1f}")
+
+    # 第一个采样点视为预热结束
+    growth = samples[-1][2] - samples[0][2]
+    print(f"RSS 预热后增长: {growth:+.1f} MB")
+    if args.keep >= 0 and growth > args.max_growth:
+        print("❌ 内存没有保持平稳")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+解码链路的基准套件：一次跑完三个标准场景，结果存成 JSON，和之前的结果对比找回退
+
+  backend   : 合成 PushFrame 直接喂给 DouyinBackend.websocket_message (伪造的 flow)，
+              线程解码池 / 事件循环内解码。吞吐按尽快提交测；延迟 = 帧交给后端 -> 该帧的事件写出，
+              按 --backend-rate 匀速提交测 (尽快提交时延迟只反映排队长度)
+  transport : CaptureWorker 同款的接收端，text (DY_DATA:: 行解析) 和 binary (msgpack 帧)
+  e2e       : 本机 WebSocket 推送服务器 -> mitmproxy (独立后端进程) -> binary 通道，
+              延迟 = 服务器发出 -> 界面侧收到事件
+
+每项报告 frames_per_s / msgs_per_s (或 events_per_s)、p50/p99 延迟和 RSS。
+
+    python benchmarks/suite.py                          # 跑全部，存到 benchmarks/results/<时间>.json
+    python benchmarks/suite.py --save baseline          # 存成 benchmarks/results/baseline.json
+    python benchmarks/suite.py --compare baseline       # 和 baseline 对比，有回退时返回码为 1
+    python benchmarks/suite.py --only backend --rooms 100 --messages 50 --content-len 64
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+
+import synthetic
+
+import addon_backend
+import bench_transport
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+# === 1. DouyinBackend.websocket_message ===
+class LatencyWriter:
+    """按帧的 tag 弹幕认出是哪一帧，记录从提交到写出的延迟"""
+    kind = "latency"
+
+    def __init__(self, submitted):
+        self.submitted = submitted
+        self.events = 0
+        self.latencies = []
+
+    def write_batch(self, packs):
+        now = time.perf_counter()
+        for p in packs:
+            kind = p.get("type")
+            if kind == "stats":
+                continue
+            self.events += 1
+            if kind == "chat":
+                content = p.get("content", "")
+                if content.startswith("#"):
+                    times = self.submitted.get(content)
+                    if times:
+                        self.latencies.append(now - times.popleft())
+
+    def close(self):
+        pass
+
+
+async def _drive_backend(args, workers, pool, rate=0.0):
+    """rate <= 0 时尽快提交 (测吞吐)，否则按每秒 rate 帧匀速提交 (测延迟，不让解码池排队)"""
+    room_ids = synthetic.room_ids(args.rooms)
+    submitted = defaultdict(deque)
+    writer = LatencyWriter(submitted)
+    # 帧池循环复用，msgId 会重复，关掉去重
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend = addon_backend.DouyinBackend(writer=writer, decode_workers=workers, dedup="off",
+                                              control="", capture_dir="")
+    backend.running()
+    flows = {room_id: synthetic.fake_ws_flow(room_id) for room_id in room_ids}
+    frames = args.frames if rate <= 0 else max(1, int(rate * args.paced_seconds))
+    expected = frames * args.messages + args.rooms
+    t0 = time.perf_counter()
+    for i in range(frames):
+        tag, room_id, raw = pool[i % len(pool)]
+        flow = flows[room_id]
+        if rate > 0:
+            delay = i / rate - (time.perf_counter() - t0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        submitted[tag].append(time.perf_counter())
+        flow.websocket.messages.append(synthetic.server_message(raw))
+        backend.websocket_message(flow)
+        if rate <= 0 and (i + 1) % args.rooms == 0:
+            await asyncio.sleep(0)
+    deadline = time.perf_counter() + 120
+    while writer.events < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.002)
+    elapsed = time.perf_counter() - t0
+    backend.done()
+    return writer, frames, elapsed
+
+
+def run_backend(args):
+    room_ids = synthetic.room_ids(args.rooms)
+    pool = []
+    for k in range(min(args.frames, 256)):
+        room_id = room_ids[k % args.rooms]
+        tag = f"#{k}"
+        pool.append((tag, room_id, synthetic.push_frame(room_id, n_messages=args.messages, seed=k,
+                                                         content_len=args.content_len, tag=tag)))
+    results = {}
+    for name, workers in (("inline", 0), ("thread", args.workers)):
+        writer, frames, elapsed = asyncio.run(_drive_backend(args, workers, pool))
+        paced, _, _ = asyncio.run(_drive_backend(args, workers, pool, rate=args.backend_rate))
+        results[f"backend.{name}"] = {
+            "frames_per_s": frames / elapsed,
+            "msgs_per_s": writer.events / elapsed,
+            "p50_ms": _pct(paced.latencies, 0.5) * 1e3,
+            "p99_ms": _pct(paced.latencies, 0.99) * 1e3,
+            "rss_mb": synthetic.rss_mb(),
+        }
+    return results
+
+
+# === 2. CaptureWorker 的接收端 ===
+def run_transport(args):
+    results = {}
+    cases = [("text", 1), ("text", args.messages)]
+    if bench_transport.transport.msgpack is not None:
+        cases.append(("binary", args.messages))
+    for mode, batch in cases:
+        received, elapsed, cpu = bench_transport.consume(mode, args.events, batch)
+        results[f"transport.{mode}.batch{batch}"] = {
+            "events_per_s": received / elapsed,
+            "cpu_us": cpu / max(1, received) * 1e6,
+        }
+    return results
+
+
+# === 3. 经过 mitmproxy 的端到端 ===
+def run_e2e(args):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_proxy_modes.py")
+    out = subprocess.run([sys.executable, script, "--child", "subprocess", "--frames", str(args.e2e_frames),
+                          "--rate", str(args.e2e_rate)],
+                         capture_output=True, text=True, encoding="utf-8",
+                         env=dict(os.environ, DY_LISTEN_PORT="18181", DY_IGNORE_HOSTS="", DY_FILTERS="chat"))
+    line = next((l for l in reversed(out.stdout.splitlines()) if l.startswith("{")), None)
+    if line is None:
+        raise RuntimeError(f"端到端测试失败:\n{out.stdout[-1000:]}{out.stderr[-2000:]}")
+    r = json.loads(line)
+    return {"e2e.subprocess": {
+        "startup_ms": r["startup"] * 1e3,
+        "received": r["received"],
+        "p50_ms": r["p50"],
+        "p99_ms": r["p99"],
+        "rss_mb": r["rss"],
+    }}
+
+
+SCENARIOS = {"backend": run_backend, "transport": run_transport, "e2e": run_e2e}
+
+
+# === 保存与对比 ===
+def _meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=synthetic.ROOT).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "args": vars(args)}
+
+
+def _results_path(name):
+    if os.sep in name or name.endswith(".json"):
+        return name
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+
+def _worse(metric, old, new, tolerance):
+    """吞吐类指标变小、延迟/内存/CPU 类指标变大超过 tolerance 算回退"""
+    if old <= 0:
+        return False
+    if metric.endswith("_per_s") or metric == "received":
+        return new < old * (1 - tolerance)
+    return new > old * (1 + tolerance)
+
+
+def compare(baseline, current, tolerance):
+    regressions = 0
+    print(f"\n对比 {baseline['meta'].get('commit') or '?'} ({baseline['meta'].get('time')}), 容差 {tolerance:.0%}")
+    print(f"{'case':>26} {'metric':>13} {'baseline':>12} {'current':>12} {'change':>8}")
+    for case, metrics in current["results"].items():
+        old_metrics = baseline["results"].get(case)
+        if not old_metrics:
+            continue
+        for metric, new in metrics.items():
+            old = old_metrics.get(metric)
+            if old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if _worse(metric, old, new, tolerance):
+                flag = "  <-- 回退"
+                regressions += 1
+            print(f"{case:>26} {metric:>13} {old:>12.2f} {new:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="要跑的场景，逗号分隔")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20, help="每帧消息数")
+    parser.add_argument("--content-len", type=int, default=16, help="弹幕内容长度 (字符)")
+    parser.add_argument("--workers", type=int, default=2, help="线程解码池分片数")
+    parser.add_argument("--backend-rate", type=float, default=1000, help="backend 场景测延迟时每秒提交的帧数")
+    parser.add_argument("--paced-seconds", type=float, default=2.0, help="backend 场景测延迟的时长")
+    parser.add_argument("--events", type=int, default=100_000, help="transport 场景的事件数")
+    parser.add_argument("--e2e-frames", type=int, default=500)
+    parser.add_argument("--e2e-rate", type=float, default=200, help="端到端场景每秒推送帧数")
+    parser.add_argument("--save", default=None, help="结果文件名 (默认按时间命名)")
+    parser.add_argument("--compare", default=None, help="和这个结果文件对比")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="判定回退的相对变化")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only.split(","):
+        t0 = time.perf_counter()
+        part = SCENARIOS[name](args)
+        results.update(part)
+        for case, metrics in part.items():
+            print(f"{case:>26}  " + "  ".join(f"{k}={v:,.2f}" for k, v in metrics.items()))
+        print(f"{'':>26}  ({name}: {time.perf_counter() - t0:.1f}s)")
+
+    current = {"meta": _meta(args), "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = _results_path(args.save or time.strftime("%Y%m%d-%H%M%S"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {path}")
+
+    if args.compare:
+        with open(_results_path(args.compare), encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
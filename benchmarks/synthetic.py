@@ -0,0 +1,313 @@
+"""
+合成抖音直播推送流量 (PushFrame -> gzip Response -> ChatMessage/GiftMessage)
+供 benchmarks/ 下的脚本复用，不依赖真实直播间和网络。
+"""
+import gzip
+import itertools
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import dy_pb2 as dy  # noqa: E402
+
+_msg_ids = itertools.count(7_000_000_000_000_000_000)
+_CHARS = "主播好厉害哈哈哈来了支持一波666加油冲鸭礼物刷起来abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def _text(rnd, length):
+    return "".join(rnd.choice(_CHARS) for _ in range(length))
+
+
+def _fill_user(user, rnd, uid):
+    user.id = uid
+    user.shortId = uid % 1_000_000
+    user.nickName = f"用户{uid % 100000}"
+    user.level = rnd.randint(1, 60)
+    # 真实流量里每个用户都带三组头像 url，解析开销主要就在这些嵌套结构上
+    for img in (user.avatarThumb, user.avatarMedium, user.avatarLarge):
+        img.urlList.extend(f"https://p3.douyinpic.com/aweme/100x100/{uid}_{i}.jpeg" for i in range(3))
+        img.uri = f"aweme/{uid}"
+
+
+def chat_message(rnd, room_id, content_len=16):
+    msg_id = next(_msg_ids)
+    c = dy.ChatMessage()
+    c.common.method = "WebcastChatMessage"
+    c.common.msgId = msg_id
+    c.common.roomId = int(room_id)
+    c.common.createTime = 1_700_000_000_000 + msg_id % 1_000_000
+    _fill_user(c.user, rnd, rnd.randint(1, 10_000_000))
+    c.content = _text(rnd, content_len)
+    c.publicAreaCommon.userConsumeInRoom = rnd.randint(0, 1000)
+    return msg_id, c.SerializeToString()
+
+
+def gift_message(rnd, room_id):
+    msg_id = next(_msg_ids)
+    g = dy.GiftMessage()
+    g.common.method = "WebcastGiftMessage"
+    g.common.msgId = msg_id
+    g.common.roomId = int(room_id)
+    g.common.createTime = 1_700_000_000_000 + msg_id % 1_000_000
+    g.giftId = rnd.randint(1, 500)
+    g.comboCount = rnd.randint(1, 99)
+    _fill_user(g.user, rnd, rnd.randint(1, 10_000_000))
+    _fill_user(g.toUser, rnd, int(room_id) % 10_000_000)
+    g.gift.name = rnd.choice(["小心心", "玫瑰", "抖音", "人气票", "嘉年华"])
+    g.gift.id = g.giftId
+    g.gift.image.urlList.append(f"https://p3.douyinpic.com/gift/{g.giftId}.png")
+    return msg_id, g.SerializeToString()
+
+
+def member_message(rnd, room_id):
+    msg_id = next(_msg_ids)
+    m = dy.MemberMessage()
+    m.common.method = "WebcastMemberMessage"
+    m.common.msgId = msg_id
+    m.common.roomId = int(room_id)
+    m.common.createTime = 1_700_000_000_000 + msg_id % 1_000_000
+    _fill_user(m.user, rnd, rnd.randint(1, 10_000_000))
+    m.memberCount = rnd.randint(100, 100_000)
+    m.action = 1
+    return msg_id, m.SerializeToString()
+
+
+def like_message(rnd, room_id):
+    msg_id = next(_msg_ids)
+    m = dy.LikeMessage()
+    m.common.method = "WebcastLikeMessage"
+    m.common.msgId = msg_id
+    m.common.roomId = int(room_id)
+    m.common.createTime = 1_700_000_000_000 + msg_id % 1_000_000
+    _fill_user(m.user, rnd, rnd.randint(1, 10_000_000))
+    m.count = rnd.randint(1, 15)
+    m.total = rnd.randint(1000, 10_000_000)
+    return msg_id, m.SerializeToString()
+
+
+_BUILDERS = {
+    "WebcastChatMessage": lambda rnd, room_id, content_len: chat_message(rnd, room_id, content_len),
+    "WebcastGiftMessage": lambda rnd, room_id, content_len: gift_message(rnd, room_id),
+    "WebcastMemberMessage": lambda rnd, room_id, content_len: member_message(rnd, room_id),
+    "WebcastLikeMessage": lambda rnd, room_id, content_len: like_message(rnd, room_id),
+}
+
+
+def push_frame(room_id, n_messages=20, gift_ratio=0.1, content_len=16, seed=None, mix=None, tag=None):
+    """
+    构造一帧完整的服务端 PushFrame，返回序列化后的 bytes。
+    mix 为 {method: 权重} 时按权重混合各类消息，否则只有弹幕和 gift_ratio 比例的礼物。
+    tag 不为空时第一条消息固定是内容为 tag 的弹幕，接收端靠它认出是哪一帧 (测延迟用)。
+    """
+    rnd = random.Random(seed)
+    if mix is None:
+        mix = {"WebcastChatMessage": 1 - gift_ratio, "WebcastGiftMessage": gift_ratio}
+    methods, weights = list(mix), list(mix.values())
+    resp = dy.Response()
+    for i in range(n_messages):
+        m = resp.messagesList.add()
+        m.method = "WebcastChatMessage" if tag and i == 0 else rnd.choices(methods, weights)[0]
+        m.msgId, m.payload = _BUILDERS[m.method](rnd, room_id, content_len)
+        if tag and i == 0:
+            c = dy.ChatMessage()
+            c.ParseFromString(m.payload)
+            c.content = tag
+            m.payload = c.SerializeToString()
+    resp.cursor = str(rnd.getrandbits(48))
+    push = dy.PushFrame()
+    push.seqId = rnd.getrandbits(32)
+    push.payloadEncoding = "gzip"
+    push.payloadType = "msg"
+    push.payload = gzip.compress(resp.SerializeToString())
+    return push.SerializeToString()
+
+
+def frame_pool(room_ids, n_frames=64, **kwargs):
+    """预先生成一批帧循环使用，避免把造数据的开销算进被测代码"""
+    return [(room_id, push_frame(room_id, seed=i, **kwargs))
+            for i, room_id in enumerate(itertools.islice(itertools.cycle(room_ids), n_frames))]
+
+
+def room_ids(n, base=7_300_000_000_000_000_000):
+    return [str(base + i) for i in range(n)]
+
+
+def decoded_events(rnd, room_id, n, gift_ratio=0.1, member_ratio=0.05, users=50_000, content_len=16):
+    """
+    直接构造 n 条解码后的事件 (和 decoder 产出的 dict 同样的字段)，给事件库/统计这类
+    只处理事件流、不涉及解码的代码造数据用。用户从 users 个里随机取，礼物名从 8 种里取。
+    """
+    out = []
+    for _ in range(n):
+        uid = rnd.randrange(users)
+        r = rnd.random()
+        t = str(1_700_000_000_000 + rnd.getrandbits(30))
+        if r < gift_ratio:
+            out.append({"type": "gift", "room_id": room_id, "user": f"用户{uid}",
+                        "gift_name": _GIFT_NAMES[uid % len(_GIFT_NAMES)], "count": rnd.randint(1, 10), "time": t})
+        elif r < gift_ratio + member_ratio:
+            out.append({"type": "member", "room_id": room_id, "user": f"用户{uid}", "content": "进入直播间",
+                        "member_count": rnd.randint(100, 100_000), "time": t})
+        else:
+            out.append({"type": "chat", "room_id": room_id, "user": f"用户{uid}",
+                        "content": _text(rnd, content_len), "time": t})
+    return out
+
+
+_GIFT_NAMES = ("小心心", "玫瑰", "抖音", "棒棒糖", "人气票", "加油鸭", "啤酒", "嘉年华")
+
+
+# === 伪造的 mitmproxy flow，只实现 DouyinBackend 会访问到的属性 ===
+_flow_ids = itertools.count(1)
+
+
+def fake_ws_flow(room_id):
+    url = f"wss://webcast5-ws-web-lq.douyin.com/webcast/im/push/v2/?room_id={room_id}&compress=gzip"
+    return SimpleNamespace(
+        id=f"fake-{next(_flow_ids)}",
+        request=SimpleNamespace(url=url),
+        websocket=SimpleNamespace(messages=[]),
+    )
+
+
+def server_message(content):
+    return SimpleNamespace(from_client=False, content=content, dropped=False)
+
+
+def rss_mb():
+    """当前进程常驻内存 (MB)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# === 经过代理的真实 WebSocket (wsproto 是 mitmproxy 的依赖) ===
+def chat_frame(room_id, content, seed=0):
+    """只含一条弹幕的 PushFrame，content 用来在接收端认出是哪一帧"""
+    rnd = random.Random(seed)
+    msg_id, payload = chat_message(rnd, room_id)
+    c = dy.ChatMessage()
+    c.ParseFromString(payload)
+    c.content = content
+    resp = dy.Response()
+    m = resp.messagesList.add()
+    m.method = "WebcastChatMessage"
+    m.msgId = msg_id
+    m.payload = c.SerializeToString()
+    push = dy.PushFrame()
+    push.payloadEncoding = "gzip"
+    push.payloadType = "msg"
+    push.payload = gzip.compress(resp.SerializeToString())
+    return push.SerializeToString()
+
+
+class PushServer:
+    """
+    模拟抖音的推送服务器：接受 WebSocket 连接，把 send() 的帧推给所有已连接的客户端。
+    地址是本机回环，代理需要清空 ignore_hosts (DY_IGNORE_HOSTS="") 才会解析这些流量。
+    """
+
+    def __init__(self):
+        self.clients = []
+        self.connected = None
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        import asyncio
+        self.connected = asyncio.Event()
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handle(self, reader, writer):
+        from wsproto import ConnectionType, WSConnection
+        from wsproto.events import AcceptConnection, CloseConnection, Request
+        ws = WSConnection(ConnectionType.SERVER)
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                ws.receive_data(data)
+                for event in ws.events():
+                    if isinstance(event, Request):
+                        writer.write(ws.send(AcceptConnection()))
+                        self.clients.append((ws, writer))
+                        self.connected.set()
+                    elif isinstance(event, CloseConnection):
+                        return
+        except ConnectionError:
+            pass
+        finally:
+            if (ws, writer) in self.clients:
+                self.clients.remove((ws, writer))
+            writer.close()
+
+    async def send(self, frame):
+        from wsproto.events import BytesMessage
+        for ws, writer in self.clients:
+            writer.write(ws.send(BytesMessage(data=frame)))
+            await writer.drain()
+
+    def close(self):
+        self.server.close()
+
+
+async def ws_client_via_proxy(proxy_port, target_port, room_id):
+    """
+    通过 HTTP 代理连到 PushServer，URL 和抖音的推送地址一样带 webcast 和 room_id。
+    返回 (reader, writer, task)：task 在后台读掉推过来的帧 (不读的话代理会被背压)。
+    """
+    import asyncio
+    from wsproto import ConnectionType, WSConnection
+    from wsproto.events import Request
+    reader, writer = await asyncio.open_connection("127.0.0.1", proxy_port)
+    ws = WSConnection(ConnectionType.CLIENT)
+    host = f"127.0.0.1:{target_port}"
+    target = f"/webcast/im/push/v2/?room_id={room_id}&compress=gzip"
+    handshake = ws.send(Request(host=host, target=target))
+    # 显式代理要求请求行用绝对地址
+    handshake = handshake.replace(f"GET {target} ".encode(), f"GET http://{host}{target} ".encode(), 1)
+    writer.write(handshake)
+    await writer.drain()
+
+    async def drain():
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                ws.receive_data(data)
+                for _ in ws.events():
+                    pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    return reader, writer, asyncio.create_task(drain())
+
+
+def wait_port(port, timeout=30.0, host="127.0.0.1"):
+    """等到端口可以连接，返回等待的秒数；超时抛 TimeoutError"""
+    import socket
+    import time
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return time.perf_counter() - t0
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(f"port {port} not listening after {timeout}s")
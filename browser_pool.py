@@ -0,0 +1,354 @@
+"""
+浏览器池：少量浏览器进程，每个直播间只是其中的一个标签页
+
+原来每个直播间都启动一个完整的 Chrome/Edge 进程 (每个几百 MB)，而且都挤在同一个
+browser_profile_live 目录上，互相抢 profile 锁。这里只启动最多 max_processes 个浏览器，
+每个进程有自己的数据目录，直播间通过 DevTools 协议的 HTTP 接口 (/json/new、/json/close)
+作为标签页打开；每个进程最多放 rooms_per_process 个房间，放满了再开新进程。
+
+长时间挂着的直播页会慢慢涨内存，recycle() 把超过 tab_max_age 的标签页、
+以及所在进程平均每个房间超过 max_mb_per_room 的最老标签页关掉重开。
+
+不依赖 Qt，GUI 和 benchmarks/bench_browser_pool.py 共用。启动浏览器 (最多等 start_timeout 秒) 和
+DevTools 的 HTTP 请求都是阻塞的，调用方应放在工作线程里，同一个池只在一个线程里用。
+"""
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+BROWSER_ARGS = [
+    "--proxy-server=http://127.0.0.1:8081",
+    f"--user-agent={USER_AGENT}",
+    "--disable-blink-features=AutomationControlled",
+    "--exclude-switches=enable-automation",
+    "--autoplay-policy=no-user-gesture-required",
+    "--disable-quic",
+    "--ignore-certificate-errors",
+    "--no-first-run",
+    "--no-sandbox",
+    "--enable-gpu-rasterization",
+    "--ignore-gpu-blocklist",
+    "--start-maximized",
+]
+
+_WINDOWS_CANDIDATES = [
+    r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+    r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+]
+_MAC_CANDIDATES = [
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+    "/Applications/Chromium.app/Contents/MacOS/Chromium",
+]
+_LINUX_NAMES = ["chromium", "chromium-browser", "google-chrome", "google-chrome-stable",
+                "microsoft-edge", "microsoft-edge-stable"]
+_LINUX_CANDIDATES = ["/snap/bin/chromium", "/usr/lib/chromium/chromium", "/usr/lib/chromium-browser/chromium-browser",
+                     "/opt/google/chrome/chrome", "/opt/microsoft/msedge/msedge"]
+
+
+# 调试接口在本机，不能走系统代理 (GUI 运行时系统代理指向 mitmproxy)
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class BrowserError(RuntimeError):
+    pass
+
+
+def find_browser():
+    """按 DY_BROWSER 环境变量、各平台常见安装位置、PATH 的顺序找 Chrome/Edge/Chromium"""
+    override = os.environ.get("DY_BROWSER")
+    if override and os.path.exists(override):
+        return override
+    if sys.platform == "win32":
+        candidates = _WINDOWS_CANDIDATES
+    elif sys.platform == "darwin":
+        candidates = _MAC_CANDIDATES
+    else:
+        candidates = [shutil.which(name) for name in _LINUX_NAMES] + _LINUX_CANDIDATES
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def launch_browser(url, user_data_dir, browser_path=None, extra_args=()):
+    """旧的做法：每个直播间一个独立的浏览器进程"""
+    browser_path = browser_path or find_browser()
+    if not browser_path:
+        raise BrowserError("未找到浏览器")
+    os.makedirs(user_data_dir, exist_ok=True)
+    cmd = [browser_path, *BROWSER_ARGS, f"--user-data-dir={user_data_dir}", *extra_args, url]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.PIPE)
+
+
+def kill_process_tree(proc):
+    try:
+        proc.terminate()
+        if sys.platform == "win32":
+            subprocess.call(['taskkill', '/F', '/T', '/PID', str(proc.pid)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            proc.wait(timeout=5)
+    except:
+        try:
+            proc.kill()
+        except:
+            pass
+
+
+def process_tree_rss(pid):
+    """pid 及其所有子进程 (渲染进程、GPU 进程等) 的常驻内存之和，单位字节"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0
+        total = 0
+        for p in procs:
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    if not os.path.isdir("/proc"):
+        return 0
+    # 没有 psutil 时在 Linux 上直接读 /proc
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    page = os.sysconf("SC_PAGE_SIZE")
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, ValueError, IndexError):
+            pass
+        stack.extend(children.get(current, ()))
+    return total
+
+
+_tab_ids = itertools.count(1)
+
+
+class Tab:
+    """池里的一个直播间标签页。和 subprocess.Popen 一样提供 pid / terminate()，GUI 可以不区分两种模式"""
+
+    def __init__(self, pool, process, target_id, url):
+        self.handle = next(_tab_ids)
+        self.pool = pool
+        self.process = process
+        self.target_id = target_id
+        self.url = url
+        self.opened_at = time.monotonic()
+
+    @property
+    def pid(self):
+        # 标签页没有自己的进程；target id 在回收重开后会变，这里用池内不变的编号
+        return f"tab:{self.handle}"
+
+    def terminate(self):
+        self.pool.close(self)
+
+
+class BrowserProcess:
+    """池里的一个浏览器进程，开启了远程调试端口"""
+
+    def __init__(self, browser_path, user_data_dir, extra_args=(), start_timeout=15):
+        os.makedirs(user_data_dir, exist_ok=True)
+        port_file = os.path.join(user_data_dir, "DevToolsActivePort")
+        try:
+            os.remove(port_file)
+        except OSError:
+            pass
+        # 端口 0：浏览器自己选空闲端口，写到数据目录的 DevToolsActivePort 里
+        cmd = [browser_path, *BROWSER_ARGS, f"--user-data-dir={user_data_dir}",
+               "--remote-debugging-port=0", "--remote-allow-origins=*", *extra_args, "about:blank"]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     stdin=subprocess.PIPE)
+        self.user_data_dir = user_data_dir
+        self.port = self._wait_port(port_file, start_timeout)
+        self.tabs = {}
+
+    def _wait_port(self, port_file, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise BrowserError(f"浏览器进程已退出 (code {self.proc.returncode})")
+            try:
+                with open(port_file) as f:
+                    port = int(f.readline().strip())
+                if port:
+                    return port
+            except (OSError, ValueError):
+                pass
+            time.sleep(0.1)
+        kill_process_tree(self.proc)
+        raise BrowserError("等待浏览器调试端口超时")
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def request(self, path, method="GET", timeout=5):
+        req = urllib.request.Request(f"http://127.0.0.1:{self.port}{path}", method=method)
+        with _opener.open(req, timeout=timeout) as resp:
+            body = resp.read()
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body.decode("utf-8", errors="ignore")
+
+    def new_target(self, url):
+        path = "/json/new?" + urllib.parse.quote(url, safe=":/?&=%")
+        try:
+            # 新版 Chrome 要求 PUT，老版本只接受 GET
+            info = self.request(path, method="PUT")
+        except urllib.error.HTTPError:
+            info = self.request(path)
+        return info["id"]
+
+    def close_target(self, target_id):
+        try:
+            self.request(f"/json/close/{target_id}")
+        except (OSError, ValueError):
+            pass
+
+    def rss(self):
+        return process_tree_rss(self.pid)
+
+    def shutdown(self):
+        kill_process_tree(self.proc)
+
+
+class BrowserPool:
+    def __init__(self, profile_root, max_processes=2, rooms_per_process=8,
+                 tab_max_age=4 * 3600, max_mb_per_room=800, browser_path=None, extra_args=()):
+        self.profile_root = profile_root
+        self.max_processes = max(1, max_processes)
+        self.rooms_per_process = max(1, rooms_per_process)
+        self.tab_max_age = tab_max_age
+        self.max_mb_per_room = max_mb_per_room
+        self.browser_path = browser_path
+        self.extra_args = list(extra_args)
+        self.processes = []
+        self.recycled = 0
+
+    def _profile_dir(self, index):
+        # 第一个进程沿用原来的数据目录 (保留登录状态)，其余进程各用各的，避免抢 profile 锁
+        return self.profile_root if index == 0 else f"{self.profile_root}_{index}"
+
+    def _used_dirs(self):
+        return {p.user_data_dir for p in self.processes}
+
+    def _pick_process(self):
+        self.processes = [p for p in self.processes if p.alive() or p.tabs]
+        alive = [p for p in self.processes if p.alive()]
+        free = [p for p in alive if len(p.tabs) < self.rooms_per_process]
+        if free:
+            return min(free, key=lambda p: len(p.tabs))
+        if len(alive) < self.max_processes:
+            browser_path = self.browser_path or find_browser()
+            if not browser_path:
+                raise BrowserError("未找到浏览器")
+            used = self._used_dirs()
+            index = next(i for i in range(len(used) + 1) if self._profile_dir(i) not in used)
+            process = BrowserProcess(browser_path, self._profile_dir(index), self.extra_args)
+            self.processes.append(process)
+            return process
+        if not alive:
+            raise BrowserError("没有可用的浏览器进程")
+        # 都满了：放到最空的进程上，超出上限总比打不开好
+        return min(alive, key=lambda p: len(p.tabs))
+
+    def open(self, url):
+        process = self._pick_process()
+        tab = Tab(self, process, process.new_target(url), url)
+        process.tabs[tab.target_id] = tab
+        return tab
+
+    def close(self, tab):
+        process = tab.process
+        if process.tabs.pop(tab.target_id, None) is None:
+            return
+        if process.alive():
+            process.close_target(tab.target_id)
+        if not process.tabs and process not in self.processes[:1]:
+            # 多开出来的进程空了就退出，第一个进程留着复用
+            process.shutdown()
+            self.processes.remove(process)
+
+    def recycle(self):
+        """
+        在原进程里重开泄漏内存的标签页，返回 (重开的 Tab 列表, [(Tab, 错误)])；重开后 target id 会变。
+        先开新标签页再关旧的：新的打不开时旧的照常留着 (也还在 tabs 里)，下次检查再试。
+        """
+        now = time.monotonic()
+        reopened, failed = [], []
+        for process in list(self.processes):
+            if not process.alive() or not process.tabs:
+                continue
+            stale = [t for t in process.tabs.values() if now - t.opened_at > self.tab_max_age]
+            if not stale and self.max_mb_per_room:
+                per_room = process.rss() / len(process.tabs) / 1e6
+                if per_room > self.max_mb_per_room:
+                    stale = [min(process.tabs.values(), key=lambda t: t.opened_at)]
+            for tab in stale:
+                try:
+                    target_id = process.new_target(tab.url)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    failed.append((tab, e))
+                    continue
+                del process.tabs[tab.target_id]
+                process.close_target(tab.target_id)
+                tab.target_id = target_id
+                tab.opened_at = time.monotonic()
+                process.tabs[target_id] = tab
+                self.recycled += 1
+                reopened.append(tab)
+        return reopened, failed
+
+    def stats(self):
+        """[(pid, 房间数, 内存 MB, 每个房间 MB)]"""
+        rows = []
+        for process in self.processes:
+            if not process.alive():
+                continue
+            rss = process.rss() / 1e6
+            rooms = len(process.tabs)
+            rows.append((process.pid, rooms, rss, rss / rooms if rooms else 0.0))
+        return rows
+
+    def shutdown(self):
+        for process in self.processes:
+            process.shutdown()
+        self.processes = []
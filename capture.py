@@ -0,0 +1,140 @@
+"""
+原始帧抓包文件 (.dycap)：把服务端推来的 PushFrame 原样存下来，离线用 replay.py 回放
+
+文件格式 (小端)：
+  文件头 8 字节 : b"DYCAP" + 版本号 1 字节 + 2 字节保留
+  每条记录      : 记录头 <I d H B> = 帧长度, 接收时间 (time.time()), room_id 长度, 标志位
+                  后面依次是 room_id (utf-8) 和帧内容
+标志位 FLAG_ZLIB 表示帧内容经过 zlib 压缩。抖音的 PushFrame 通常 payload 已经是 gzip，
+再压缩几乎没有收益 (实测 1%，每帧却要多花近 100us)，所以开启压缩后也只压不含 gzip 数据的帧。
+写满 max_bytes 后换一个新文件，最多保留 keep 个 (0 表示不删旧文件)。
+"""
+import mmap
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b"DYCAP"
+VERSION = 1
+_FILE_HEADER = MAGIC + bytes((VERSION, 0, 0))
+_RECORD = struct.Struct("<IdHB")
+FLAG_ZLIB = 0x01
+SUFFIX = ".dycap"
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+
+
+class CaptureWriter:
+    """
+    在 directory 下按 frames-<启动时间>-<序号>.dycap 顺序写抓包文件。
+    只在 mitmproxy 的事件循环线程里调用；写入走 1MB 的文件缓冲，不会每帧一次系统调用，
+    每隔 flush_interval 秒落一次盘 (GUI 用 taskkill /F 结束后端时来不及 close)。
+    """
+
+    def __init__(self, directory, compress=False, max_bytes=256 * 1024 * 1024, keep=0, flush_interval=1.0):
+        self.directory = directory
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+        self.prefix = time.strftime("frames-%Y%m%d-%H%M%S")
+        self.index = 0
+        self.files = []
+        self.file = None
+        self.size = 0
+        self.frames = 0
+        self.raw_bytes = 0
+        self.bytes_written = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.index += 1
+        path = os.path.join(self.directory, f"{self.prefix}-{self.index:03d}{SUFFIX}")
+        self.file = open(path, "wb", buffering=1024 * 1024)
+        self.file.write(_FILE_HEADER)
+        self.size = len(_FILE_HEADER)
+        self.files.append(path)
+        # 超出保留数量时删除最旧的文件
+        while self.keep > 0 and len(self.files) > self.keep:
+            try:
+                os.remove(self.files.pop(0))
+            except OSError:
+                pass
+
+    def write(self, room_id, frame, ts=None):
+        if ts is None:
+            ts = time.time()
+        flags = 0
+        data = frame
+        if self.compress and _GZIP_MAGIC not in frame:
+            packed = zlib.compress(frame, 1)
+            if len(packed) < len(frame):
+                data, flags = packed, FLAG_ZLIB
+        room = room_id.encode("utf-8")
+        if self.size > len(_FILE_HEADER) and self.size + _RECORD.size + len(room) + len(data) > self.max_bytes:
+            self.file.close()
+            self._open()
+        f = self.file
+        f.write(_RECORD.pack(len(data), ts, len(room), flags))
+        f.write(room)
+        f.write(data)
+        n = _RECORD.size + len(room) + len(data)
+        self.size += n
+        self.bytes_written += n
+        self.raw_bytes += len(frame)
+        self.frames += 1
+        if ts - self.last_flush >= self.flush_interval:
+            self.last_flush = ts
+            f.flush()
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def capture_files(path):
+    """path 是单个 .dycap 文件或目录 (按文件名排序，即按写入顺序)"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(SUFFIX))
+    return [path]
+
+
+def iter_records(path):
+    """
+    用 mmap 顺序读取一个抓包文件，逐条产出 (接收时间, room_id, 帧内容 bytes)。
+    文件尾部不完整的记录 (抓包进程被强杀时) 直接忽略。
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(_FILE_HEADER):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC or mm[len(MAGIC)] != VERSION:
+                raise ValueError(f"不是抓包文件或版本不支持: {path}")
+            end = len(mm)
+            pos = len(_FILE_HEADER)
+            unpack_from, header_size = _RECORD.unpack_from, _RECORD.size
+            while pos + header_size <= end:
+                size, ts, room_len, flags = unpack_from(mm, pos)
+                pos += header_size
+                if pos + room_len + size > end:
+                    return
+                room_id = mm[pos:pos + room_len].decode("utf-8")
+                pos += room_len
+                data = mm[pos:pos + size]
+                pos += size
+                if flags & FLAG_ZLIB:
+                    data = zlib.decompress(data)
+                yield ts, room_id, data
+
+
+def iter_capture(path):
+    """目录或文件里的全部记录，按写入顺序"""
+    for file in capture_files(path):
+        yield from iter_records(file)
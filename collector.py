@@ -0,0 +1,191 @@
+"""
+无界面采集入口：只运行代理和 DouyinBackend，事件写到一个或多个 sink (见 sinks.py)
+
+不依赖 Qt，不改系统代理 (不碰注册表)，Linux 服务器上可以长期无人值守运行。
+浏览器/手机把 HTTP 代理设成 DY_LISTEN_HOST:DY_LISTEN_PORT (默认 127.0.0.1:8081) 即可；
+也可以用 --rooms 给一个直播间链接列表，由浏览器池 (browser_pool.py) 以无头模式打开。
+
+    python collector.py --sink jsonl:events/
+    python collector.py --sink jsonl:events/ --sink socket:9000 --sink parquet:columns/
+    python collector.py --sink unix:/run/dy/events.sock --rooms rooms.txt --filters chat,gift,enter
+
+每 --report 秒打印一行各 sink 的事件/秒和写入耗时占比；后端的丢弃计数 (DY_SHED_POLICY)
+和开启 DY_METRICS 时的分阶段统计也会打印出来。后端的其余参数和 GUI 模式一样走 DY_* 环境变量。
+SIGINT/SIGTERM 时停止代理，等解码池和队列写完、关闭所有 sink 后退出；
+SIGHUP 时立即重新加载关键词表 (DY_KEYWORDS，不发也会按修改时间自动重新加载)。
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import addon_backend
+import browser_pool
+import sinks
+
+# 浏览器池的标签页回收间隔 (秒)
+BROWSER_CHECK_S = 60
+# 多久检查一次 sink 缓冲里攒了太久的数据 (秒)
+SINK_TICK_S = 1
+
+
+def log(text):
+    print(f"[{time.strftime('%H:%M:%S')}] {text}", flush=True)
+
+
+def log_stats(data):
+    """后端的 stats 事件：分阶段统计摘要 + 背压队列的丢弃计数"""
+    summary = data.get('metrics')
+    if summary:
+        stages = summary.get('stages', {})
+        timing = " ".join(f"{name} {s['p99_us'] / 1000:.2f}" for name, s in stages.items())
+        errors = summary.get('errors', {})
+        log(f"📊 {summary.get('fps', 0):.1f} 帧/s {summary.get('mps', 0):.0f} 条/s"
+            f" | p99(ms) {timing or '-'} | 错误 {sum(errors.values())}")
+    dropped = data.get('dropped') or {}
+    if dropped:
+        detail = " / ".join(f"{k} {v}" for k, v in sorted(dropped.items(), key=lambda kv: -kv[1]))
+        log(f"⚠️ sink 写不过来，已丢弃 {detail} 条 (队列峰值 {data.get('queue_peak', 0)}/{data.get('capacity', 0)})")
+
+
+def read_rooms(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class Collector:
+    """作为一个 mitmproxy 插件挂在 DumpMaster 上：running 时开始定时报告并打开直播间"""
+
+    def __init__(self, backend, sink_set, report_interval, room_urls=(), pool=None):
+        self.backend = backend
+        self.sinks = sink_set
+        self.report_interval = report_interval
+        self.room_urls = list(room_urls)
+        self.pool = pool
+        # 浏览器池不是线程安全的：打开、回收、关闭都排在这一个线程里
+        self.browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dy-browser")
+        self.stopping = False
+        self.master = None
+        self.task = None
+        self.tick_task = None
+
+    def running(self):
+        loop = asyncio.get_running_loop()
+        if sys.platform != 'win32':
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self.stop)
+            loop.add_signal_handler(signal.SIGHUP, self.backend.control, {"cmd": "keywords"})
+        if self.report_interval > 0:
+            self.task = loop.create_task(self.report_loop())
+        self.tick_task = loop.create_task(self.tick_loop())
+        if self.room_urls:
+            # 打开标签页要等浏览器起来，是阻塞的 HTTP 调用，放到浏览器线程里
+            self.browser_executor.submit(self.open_rooms)
+
+    def stop(self):
+        log(">>> 正在停止...")
+        self.stopping = True
+        if self.master is not None:
+            self.master.shutdown()
+
+    def done(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.tick_task is not None:
+            self.tick_task.cancel()
+        self.stopping = True
+        if self.pool is not None:
+            # 等正在打开的那个标签页完成后再关
+            self.browser_executor.submit(self.pool.shutdown).result()
+        self.browser_executor.shutdown()
+
+    def open_rooms(self):
+        opened = 0
+        for url in self.room_urls:
+            if self.stopping:
+                break
+            try:
+                self.pool.open(url)
+                opened += 1
+            except browser_pool.BrowserError as e:
+                log(f"❌ 打开直播间失败 {url}: {e}")
+        log(f">>> 已打开 {opened}/{len(self.room_urls)} 个直播间")
+
+    async def tick_loop(self):
+        """房间没有新事件时 write_batch 不会被调用，由这里定时让 sink 写出缓冲 (写文件放到线程里，不卡事件循环)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(SINK_TICK_S)
+            await loop.run_in_executor(None, self.sinks.tick)
+
+    async def report_loop(self):
+        last_check = time.monotonic()
+        self.sinks.report()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            parts = []
+            for kind, eps, busy, errors, last_error in self.sinks.report():
+                part = f"{kind} {eps:,.0f} 条/s (忙 {busy:.0%})"
+                if errors:
+                    part += f" 错误 {errors} [{last_error}]"
+                parts.append(part)
+            log(f"📤 {' | '.join(parts)} | 房间 {len(self.backend.rooms)}")
+            if self.pool is not None and time.monotonic() - last_check >= BROWSER_CHECK_S:
+                last_check = time.monotonic()
+                reopened, failed = await asyncio.get_running_loop().run_in_executor(self.browser_executor, self.pool.recycle)
+                if reopened:
+                    log(f"♻️ 重开了 {len(reopened)} 个占用内存过多/打开过久的标签页")
+                for tab, e in failed:
+                    log(f"⚠️ 标签页重开失败，保留原页面，下次再试 {tab.url}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sink", action="append", required=True,
+                        help="输出端，可以给多个: jsonl:<目录> / socket:[主机:]<端口> / msgpack:[主机:]<端口> / "
+                             "unix:<路径> / parquet:<目录>")
+    parser.add_argument("--jsonl-max-mb", type=int, default=256, help="jsonl 单个文件大小上限")
+    parser.add_argument("--report", type=float, default=10, help="报告间隔 (秒)，0 表示不报告")
+    parser.add_argument("--filters", default=",".join(addon_backend.FILTERS), help="抓取开关，逗号分隔")
+    parser.add_argument("--rooms", default=None, help="直播间链接列表文件 (每行一个)，用无头浏览器池打开")
+    parser.add_argument("--browser-processes", type=int, default=4)
+    parser.add_argument("--rooms-per-browser", type=int, default=16)
+    parser.add_argument("--profile-dir", default=os.path.abspath("browser_profile_collector"))
+    args = parser.parse_args()
+
+    try:
+        sink_set = sinks.SinkSet([sinks.open_sink(spec, max_mb=args.jsonl_max_mb) for spec in args.sink],
+                                 on_stats=log_stats)
+    except (ValueError, RuntimeError, OSError) as e:
+        parser.error(str(e))
+    for sink in sink_set.sinks:
+        if sink.kind == "socket":
+            log(f">>> socket 输出: {sink.address}")
+
+    pool = None
+    room_urls = read_rooms(args.rooms) if args.rooms else []
+    if room_urls:
+        pool = browser_pool.BrowserPool(args.profile_dir, max_processes=args.browser_processes,
+                                        rooms_per_process=args.rooms_per_browser, extra_args=("--headless=new",))
+
+    # 没有 GUI 下发控制指令，抓取开关在启动时定好
+    backend = addon_backend.DouyinBackend(writer=sink_set, filters=args.filters.split(","), control="")
+    collector = Collector(backend, sink_set, args.report, room_urls, pool)
+
+    def on_master(master):
+        collector.master = master
+        master.addons.add(collector)
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(addon_backend.start_proxy(backend, on_master))
+    log(">>> 已退出")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
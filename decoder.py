@@ -0,0 +1,288 @@
+"""
+直播推送帧解码：PushFrame -> gzip -> Response -> 各业务消息 (按 method 查注册表) -> 事件字典
+
+decode_frame 是不依赖 mitmproxy 的纯函数，既可以在事件循环里直接调用，
+也可以交给 DecodePool 放到线程/进程里跑，避免大房间的解码卡住代理转发。
+"""
+import gzip
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import dy_pb2 as dy
+import wire_decode
+from dedup import DedupTable
+from metrics import Samples
+
+# 纯 Python 版 protobuf 下只提取输出的字段 (wire_decode)，失败时退回 dy_pb2 完整解析；设为 0 则总是完整解析
+FAST_DECODE = os.environ.get("DY_FAST_DECODE", "1") != "0"
+
+
+# === 1. Message.method -> 解码器 注册表 ===
+class MessageDecoder:
+    """
+    一种业务消息的解码器：字段路径 (对应 dy.proto 里的字段) + 事件构造函数。
+    switch 是 GUI "抓取条件" 里对应的开关名，关掉后这种消息连 payload 都不会解析。
+    """
+
+    def __init__(self, method, switch, full_class, paths, build):
+        self.method = method
+        self.switch = switch
+        self.paths = paths
+        self.build = build
+        # upb 下没有快速路径，decode 直接完整解析
+        self.fast = wire_decode.make_extractor(full_class, paths) if FAST_DECODE else None
+        self.full = wire_decode.FullExtractor(full_class, paths)
+        # 去重的备用键：Message.msgId 缺失时用 payload 里的 Common.msgId (只扫描这一个字段)
+        self.common_id = None
+        if "common" in full_class.DESCRIPTOR.fields_by_name:
+            self.common_id = wire_decode.FieldExtractor(full_class, {"msg_id": "common.msgId"})
+
+    def common_msg_id(self, payload):
+        """payload 里的 Common.msgId；没有或解析失败时返回 0 (这条消息不参与去重)"""
+        if self.common_id is None:
+            return 0
+        try:
+            return self.common_id.extract(payload)["msg_id"]
+        except (wire_decode.WireError, IndexError):
+            return 0
+
+    def decode(self, payload, room_id):
+        fields = None
+        if self.fast is not None:
+            try:
+                fields = self.fast.extract(payload)
+            except Exception:
+                pass
+        if fields is None:
+            fields = self.full.extract(payload)
+        return self.build(fields, room_id)
+
+
+DECODERS = {}
+
+
+def register(method, switch, full_class, paths):
+    def wrap(build):
+        DECODERS[method] = MessageDecoder(method, switch, full_class, paths, build)
+        return build
+    return wrap
+
+
+@register("WebcastChatMessage", "chat", dy.ChatMessage, {
+    "user": "user.nickName",
+    "content": "content",
+    "time": "common.createTime",
+})
+def _chat(f, room_id):
+    return {"type": "chat", "room_id": room_id, "user": f["user"], "content": f["content"],
+            "time": str(f["time"])}
+
+
+@register("WebcastGiftMessage", "gift", dy.GiftMessage, {
+    "user": "user.nickName",
+    "gift_name": "gift.name",
+    "count": "comboCount",
+    "time": "common.createTime",
+})
+def _gift(f, room_id):
+    return {"type": "gift", "room_id": room_id, "user": f["user"], "gift_name": f["gift_name"],
+            "count": f["count"], "time": str(f["time"])}
+
+
+@register("WebcastMemberMessage", "enter", dy.MemberMessage, {
+    "user": "user.nickName",
+    "member_count": "memberCount",
+    "time": "common.createTime",
+})
+def _member(f, room_id):
+    return {"type": "member", "room_id": room_id, "user": f["user"], "content": "进入直播间",
+            "member_count": f["member_count"], "time": str(f["time"])}
+
+
+@register("WebcastLikeMessage", "like", dy.LikeMessage, {
+    "user": "user.nickName",
+    "count": "count",
+    "total": "total",
+    "time": "common.createTime",
+})
+def _like(f, room_id):
+    return {"type": "like", "room_id": room_id, "user": f["user"], "content": f"点赞 x{f['count']}",
+            "count": f["count"], "total": f["total"], "time": str(f["time"])}
+
+
+@register("WebcastSocialMessage", "follow", dy.SocialMessage, {
+    "user": "user.nickName",
+    "action": "action",
+    "time": "common.createTime",
+})
+def _social(f, room_id):
+    return {"type": "social", "room_id": room_id, "user": f["user"],
+            "content": "关注了主播" if f["action"] == 1 else "分享了直播间", "time": str(f["time"])}
+
+
+@register("WebcastRoomUserSeqMessage", "seq", dy.RoomUserSeqMessage, {
+    "online": "total",
+    "total_user": "totalUser",
+    "time": "common.createTime",
+})
+def _room_user_seq(f, room_id):
+    return {"type": "room_user_seq", "room_id": room_id, "online": f["online"],
+            "total_user": f["total_user"], "time": str(f["time"])}
+
+
+def methods_for(switches):
+    """GUI 开关名 -> 需要解析的 method 集合；不认识的开关 (如 'sys') 直接忽略"""
+    return frozenset(m for m, d in DECODERS.items() if d.switch in switches)
+
+
+# 默认只抓弹幕和礼物，其余由 GUI 的抓取条件打开
+DEFAULT_SWITCHES = ("chat", "gift")
+DEFAULT_METHODS = methods_for(DEFAULT_SWITCHES)
+
+
+# === 2. 整帧解码 ===
+def decode_frame(raw, room_id, methods=DEFAULT_METHODS, dedup=None, metrics=None):
+    """
+    解码一帧服务端 PushFrame，返回事件列表；未开启的 method 直接跳过，不解析 payload。
+    传入 DedupTable 时按 msgId 丢掉这个房间最近已经出现过的消息 (同样不解析 payload)；
+    Message.msgId 为 0 时改用 payload 里的 Common.msgId。
+    传入 metrics (metrics.Metrics / Samples) 时记录各阶段耗时、每种 method 的条数和出错的阶段。
+    """
+    packs = []
+    clock = time.perf_counter if metrics is not None else None
+    # 一帧里的记录先攒在本地，最后合并一次，解码池的线程不用每条消息都去抢 Metrics 的锁
+    rec = None if metrics is None else metrics if isinstance(metrics, Samples) else Samples()
+    stage = "frame_parse"
+    try:
+        t = clock() if clock else 0.0
+        push = dy.PushFrame()
+        push.ParseFromString(raw)
+        payload = push.payload
+        if clock:
+            now = clock()
+            rec.stage(stage, now - t)
+            t = now
+        try:
+            payload = gzip.decompress(payload)
+        except Exception as e:
+            if clock: rec.error("decompress", e)
+        stage = "response_parse"
+        if clock:
+            now = clock()
+            rec.stage("decompress", now - t)
+            t = now
+
+        resp = dy.Response()
+        resp.ParseFromString(payload)
+        if clock:
+            rec.stage(stage, clock() - t)
+        stage = "message"
+
+        recent = dedup.window(room_id) if dedup is not None else None
+        dropped = 0
+        for m in resp.messagesList:
+            method = m.method
+            if method not in methods:
+                continue
+            if recent is not None:
+                msg_id = m.msgId or DECODERS[method].common_msg_id(m.payload)
+                if msg_id and recent.seen(msg_id):
+                    dropped += 1
+                    continue
+            try:
+                if clock:
+                    t = clock()
+                    packs.append(DECODERS[method].decode(m.payload, room_id))
+                    rec.stage(stage, clock() - t)
+                    rec.method(method)
+                else:
+                    packs.append(DECODERS[method].decode(m.payload, room_id))
+            except Exception as e:
+                if clock: rec.error(method, e)
+        if dropped:
+            dedup.count(dropped)
+    except Exception as e:
+        if clock: rec.error(stage, e)
+    if rec is not None and rec is not metrics:
+        metrics.merge(rec)
+    return packs
+
+
+# 进程池 worker 里的去重表：去重状态不能跨进程共享，每个 worker 进程按参数自己建一份
+# (同一个房间总在同一个 worker 上，效果一样；dropped 计数随结果带回主进程的表)
+_worker_dedup = None
+
+
+def _decode_in_worker(raw, room_id, methods, dedup_spec, timed=False):
+    """进程池 worker：返回 (事件列表, 这一帧去掉的重复数, 开启统计时的 Samples)，由主进程合并"""
+    global _worker_dedup
+    dedup = None
+    if dedup_spec is not None:
+        if _worker_dedup is None or _worker_dedup.spec != dedup_spec:
+            _worker_dedup = DedupTable(*dedup_spec)
+        dedup = _worker_dedup
+    samples = Samples() if timed else None
+    packs = decode_frame(raw, room_id, methods, dedup, samples)
+    return packs, dedup.take_dropped() if dedup is not None else 0, samples
+
+
+# === 3. 按房间分片的解码池 ===
+class DecodePool:
+    """
+    按房间分片的解码池。
+
+    每个分片是只有一个 worker 的执行器，同一个房间永远落在同一个分片上，
+    所以房间内的事件顺序和到达顺序一致；不同房间的帧在各分片间并行解码。
+    解码结果通过 deliver(packs) 回调交出，回调在 worker 线程 (进程池时是
+    执行器的管理线程) 里执行，由调用方负责切回自己的线程。
+    """
+
+    def __init__(self, workers, deliver, kind="thread", dedup=None, metrics=None):
+        executor = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+        self.kind = kind
+        self.deliver = deliver
+        self.dedup = dedup
+        self.metrics = metrics
+        self.shards = [executor(max_workers=1) for _ in range(max(1, workers))]
+
+    def shard_of(self, room_id):
+        return zlib.crc32(room_id.encode()) % len(self.shards)
+
+    def submit(self, raw, room_id, methods=DEFAULT_METHODS):
+        shard = self.shards[self.shard_of(room_id)]
+        metrics = self.metrics
+        if self.kind == "process":
+            spec = self.dedup.spec if self.dedup is not None else None
+            future = shard.submit(_decode_in_worker, raw, room_id, methods, spec, metrics is not None)
+        else:
+            future = shard.submit(decode_frame, raw, room_id, methods, self.dedup, metrics)
+        if metrics is not None:
+            # pool 阶段 = 排队 + 解码 (+ 进程池的序列化往返)
+            future.submitted = time.perf_counter()
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        metrics = self.metrics
+        try:
+            packs = future.result()
+        except Exception as e:
+            if metrics is not None: metrics.error("pool", e)
+            return
+        samples = None
+        if self.kind == "process":
+            packs, dropped, samples = packs
+            if dropped:
+                self.dedup.count(dropped)
+        if metrics is not None:
+            metrics.stage("pool", time.perf_counter() - future.submitted)
+            if samples is not None:
+                metrics.merge(samples)
+        if packs:
+            self.deliver(packs)
+
+    def close(self):
+        """等在途的帧全部解码完再返回"""
+        for shard in self.shards:
+            shard.shutdown(wait=True)
@@ -0,0 +1,147 @@
+"""
+按房间的消息去重 (Message.msgId)
+
+浏览器标签页断线重连、或者同一个直播间开了两个标签页时，同一条消息会从多条 WebSocket
+推过来。在解出 Response 之后、解析业务 payload 之前按 msgId 丢掉重复的消息，
+避免重复解码、重复上报，以及界面"消息数"重复计数。
+
+每个房间只记最近 window 条 msgId，两种实现：
+
+RecentIds   : 环形数组 + 集合，精确去重，每个房间大约 window * 70 字节
+BloomWindow : 两个轮换的 Bloom filter，占用约为精确集合的 1/3，但每条消息多几微秒，
+              而且有 fpr 的概率把新消息误判为重复
+
+DedupTable 按房间管理这些结构，房间数有上限 (LRU 淘汰)。
+"""
+import math
+import threading
+from collections import OrderedDict
+
+_MASK64 = (1 << 64) - 1
+
+
+class RecentIds:
+    """最近 size 个 msgId 的精确集合，写满后覆盖最旧的"""
+    __slots__ = ("ring", "pos", "ids")
+
+    def __init__(self, size):
+        self.ring = [None] * size
+        self.pos = 0
+        self.ids = set()
+
+    def seen(self, msg_id):
+        """已经见过返回 True；否则记下来并返回 False"""
+        ids = self.ids
+        if msg_id in ids:
+            return True
+        ring = self.ring
+        pos = self.pos
+        old = ring[pos]
+        if old is not None:
+            ids.discard(old)
+        ring[pos] = msg_id
+        ids.add(msg_id)
+        pos += 1
+        self.pos = 0 if pos == len(ring) else pos
+        return False
+
+
+class BloomWindow:
+    """
+    两代 Bloom filter：新 msgId 写进当前代，当前代写满 size 个后旧的一代丢掉、当前代变成旧的。
+    查询两代都看，所以至少能记住最近 size 个 msgId。位数和哈希次数按 size 和 fpr 计算。
+    每一位用一个字节存：纯 Python 下按字节取值比移位取位快得多，内存仍只有精确集合的几分之一。
+    """
+    __slots__ = ("nbits", "steps", "size", "count", "current", "previous")
+
+    def __init__(self, size, fpr):
+        # 查询要看两代，单代的误判率取一半
+        nbits = math.ceil(-size * math.log(fpr / 2) / (math.log(2) ** 2))
+        self.nbits = nbits
+        self.steps = range(max(1, round(nbits / size * math.log(2))))
+        self.size = size
+        self.count = 0
+        self.current = bytearray(nbits)
+        self.previous = bytearray(nbits)
+
+    def seen(self, msg_id):
+        # 双重哈希：h1 + i * h2
+        x = msg_id & _MASK64
+        h1 = (x * 0x9E3779B97F4A7C15) & _MASK64
+        h2 = ((x ^ (x >> 31)) * 0xBF58476D1CE4E5B9 & _MASK64) | 1
+        nbits = self.nbits
+        positions = [(h1 + i * h2) % nbits for i in self.steps]
+        current = self.current
+        if 0 not in map(current.__getitem__, positions):
+            return True
+        if 0 not in map(self.previous.__getitem__, positions):
+            return True
+        if self.count >= self.size:
+            self.previous = current
+            current = self.current = bytearray(nbits)
+            self.count = 0
+        for p in positions:
+            current[p] = 1
+        self.count += 1
+        return False
+
+
+class DedupTable:
+    """
+    room_id -> 去重窗口。mode 为 exact / bloom / off。
+
+    同一个房间的帧只会在一个线程里解码 (DecodePool 按房间分片)，所以每个房间的窗口不加锁；
+    房间表本身会被多个分片同时访问，增删时加锁。
+    """
+
+    def __init__(self, mode="exact", window=1024, fpr=0.0001, capacity=1000):
+        self.mode = mode
+        self.window_size = window
+        self.fpr = fpr
+        self.capacity = capacity
+        self.rooms = OrderedDict()
+        self.lock = threading.Lock()
+        # 累计丢掉的重复消息数 (decode_frame 通过 count 更新，各分片线程都会写，加锁)
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.mode != "off" and self.window_size > 0
+
+    @property
+    def spec(self):
+        """进程池的 worker 用这组参数在自己的进程里建表"""
+        return (self.mode, self.window_size, self.fpr, self.capacity)
+
+    def window(self, room_id):
+        """这个房间的去重窗口，一帧里的所有消息共用一次查表；关闭去重时返回 None"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            recent = self.rooms.get(room_id)
+            if recent is None:
+                if self.mode == "bloom":
+                    recent = BloomWindow(self.window_size, self.fpr)
+                else:
+                    recent = RecentIds(self.window_size)
+                self.rooms[room_id] = recent
+                if len(self.rooms) > self.capacity:
+                    self.rooms.popitem(last=False)
+            else:
+                self.rooms.move_to_end(room_id)
+            return recent
+
+    def drop(self, room_id):
+        """直播间表淘汰房间时一起丢掉它的窗口"""
+        with self.lock:
+            self.rooms.pop(room_id, None)
+
+    def count(self, dropped):
+        with self.lock:
+            self.dropped += dropped
+
+    def take_dropped(self):
+        """取出并清零丢弃计数 (进程池 worker 用它把增量带回主进程)"""
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
@@ -0,0 +1,516 @@
+"""
+事件持久化：后端解出的事件追加写进 SQLite，按天分文件、文件内按房间聚簇，提供简单的查询接口
+
+  存储 : directory/events-<YYYYMMDD>.db，每天一个库 (按接收时间的本地日期)，WAL 模式、synchronous=NORMAL。
+         events 表是 WITHOUT ROWID 表，主键 (room_id, ts, seq)，同一房间的事件在 B 树里挨在一起，
+         按房间 + 时间范围查询是一段连续的范围扫描；gift_totals 表在写入时顺带按 (房间, 用户, 礼物) 累加。
+  全文 : 弹幕在同一个事务里写进 FTS5 表 chat_fts (rowid = seq，只存倒排表，原文还在 events 里)。FTS5 自带的分词器不切中文
+         (一整串汉字算一个词)，trigram 分词又搜不了最常见的 1~2 个字的关键词，所以入库前自己切：
+         连续的汉字切成相邻两字一组 (外加末尾的单字)，字母数字按词，见 chat_terms()。
+         查询词按同样的方式切开后拼成短语查询，任意长度的子串都能走索引。跨天的库在关闭时做一次 optimize 合并索引段。
+  写入 : write_batch() 只把整批事件放进内存队列，由后台线程每 flush_interval 秒 (或攒满 batch_events 条)
+         在一个事务里写完，每秒几千条事件也只是每秒一次提交；WAL + NORMAL 下提交不 fsync，
+         只在检查点时落盘。积压超过 max_pending 条时丢弃最旧的批次并计数 (磁盘跟不上时不拖住后端)。
+  查询 : StoreReader 以只读方式打开各天的库 (WAL 下和写入互不阻塞)：
+         events()     某房间某时间段的事件
+         gift_totals() 按用户汇总礼物数 (按天汇总，时间范围按天取整)
+         search_chat() 按关键词 / 昵称搜弹幕 (有 chat_fts 表的库走全文索引，加索引之前的旧库逐行扫描)
+
+    python event_store.py <目录> events <room_id> --since "2026-10-18 20:00" --until "2026-10-18 21:00"
+    python event_store.py <目录> gifts [room_id] --since 2026-10-18
+    python event_store.py <目录> search <关键词> [--room room_id] [--user 昵称]
+"""
+import argparse
+import itertools
+import json
+import operator
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque, defaultdict
+
+# 不入库的事件类型 (运行状态和定时汇总，不是直播间里发生的事)
+SKIP_TYPES = frozenset(("stats", "room_stats"))
+# 单独成列的字段，其余字段合成 JSON 放进 extra 列
+COLUMNS = frozenset(("type", "room_id", "user", "content", "gift_name", "count", "time"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    room_id   TEXT NOT NULL,
+    ts        INTEGER NOT NULL,   -- 接收时间 (毫秒)
+    seq       INTEGER NOT NULL,   -- 同一毫秒内的先后顺序
+    type      TEXT NOT NULL,
+    user      TEXT,
+    content   TEXT,
+    gift_name TEXT,
+    count     INTEGER,
+    server_ts INTEGER,            -- 消息里的 createTime (毫秒)
+    extra     TEXT,
+    PRIMARY KEY (room_id, ts, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS gift_totals (
+    room_id   TEXT NOT NULL,
+    user      TEXT NOT NULL,
+    gift_name TEXT NOT NULL,
+    count     INTEGER NOT NULL,
+    gifts     INTEGER NOT NULL,   -- 礼物消息条数
+    PRIMARY KEY (room_id, user, gift_name)
+) WITHOUT ROWID;
+"""
+# 全文索引只存倒排表 (content='')，命中的 rowid 经 chat_rows 找回 events 里的原始行；
+# prefix='1' 额外建单字前缀索引，只搜一个字时不用合并所有以它开头的两字组
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(
+    terms, user_terms, room,          -- 切好的内容 / 昵称，房间号 (按列过滤)
+    content = '', columnsize = 0, tokenize = 'unicode61 remove_diacritics 0', prefix = '1'
+);
+CREATE TABLE IF NOT EXISTS chat_rows (
+    seq     INTEGER PRIMARY KEY,      -- = chat_fts 的 rowid
+    room_id TEXT NOT NULL,
+    ts      INTEGER NOT NULL
+);
+"""
+
+_INSERT = ("INSERT INTO events (room_id, ts, seq, type, user, content, gift_name, count, server_ts, extra) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+_INSERT_CHAT = "INSERT INTO chat_fts (rowid, terms, user_terms, room) VALUES (?, ?, ?, ?)"
+_INSERT_CHAT_ROW = "INSERT INTO chat_rows (seq, room_id, ts) VALUES (?, ?, ?)"
+_UPSERT_GIFT = ("INSERT INTO gift_totals (room_id, user, gift_name, count, gifts) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (room_id, user, gift_name) DO UPDATE SET "
+                "count = count + excluded.count, gifts = gifts + excluded.gifts")
+
+
+# 汉字 (含扩展 A 区、兼容区)、假名、韩文按字切；其余的字母数字连在一起算一个词
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_RUNS = re.compile(f"([{_CJK}]+)|([^\\W_{_CJK}]+)")
+# unicode61 分词器会当成词的一部分的字符 (字母数字)
+_WORD = re.compile(r"[^\W_]")
+
+
+def chat_terms(text):
+    """
+    切成 FTS5 的词，空格分隔：汉字串 "主播好" -> "主播 播好 好" (相邻两字一组 + 末尾单字)，字母数字按词。
+    这样任意 >= 2 个字的子串都是连续的几个两字组 (短语查询)，单个字是某个词的前缀 (前缀查询)。
+    """
+    if not text:
+        return ""
+    terms = []
+    for cjk, word in _RUNS.findall(text):
+        if cjk:
+            terms += map(operator.add, cjk, cjk[1:])
+            terms.append(cjk[-1])
+        else:
+            terms.append(word)
+    return " ".join(terms)
+
+
+def _symbols_only(text):
+    """有字但切不出全文索引的词 (只有标点、符号)"""
+    return bool(text and text.strip()) and not _RUNS.search(text)
+
+
+def match_query(text):
+    """
+    把搜索词转成 FTS5 查询 (各部分之间是 AND)；没有可搜的字时返回空串。
+    每一部分都是加了引号的字符串 (内部的引号双写)，用户输入里的 " * : ( ) AND 等不会被当成查询语法。
+    """
+    parts = []
+    for cjk, word in _RUNS.findall(text or ""):
+        if cjk and len(cjk) > 1:
+            parts.append(_quote(" ".join(cjk[i:i + 2] for i in range(len(cjk) - 1))))
+        else:
+            parts.append(_quote(cjk or word) + "*")
+    return " ".join(parts)
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def day_of(ts):
+    return time.strftime("%Y%m%d", time.localtime(ts))
+
+
+def _int(value):
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# === 1. 写入 ===
+class EventStore:
+    """
+    和 transport 里的 writer 接口相同 (write_batch / close)，可以直接挂在 DouyinBackend 或 SinkSet 上。
+    write_batch 可以在任意线程调用，只做一次入队；数据库连接只在后台写入线程里使用。
+    """
+    kind = "store"
+
+    def __init__(self, directory, flush_interval=1.0, batch_events=50_000, max_pending=500_000, fts=True):
+        self.directory = directory
+        # 弹幕是否同时写全文索引
+        self.fts = fts
+        self.user_terms = {}
+        self.flush_interval = flush_interval
+        self.batch_events = batch_events
+        self.max_pending = max_pending
+        os.makedirs(directory, exist_ok=True)
+        self.cond = threading.Condition()
+        # [(接收时间, packs)]
+        self.pending = deque()
+        self.pending_events = 0
+        self.closed = False
+        self.conns = {}
+        # 主键的一部分，从启动时的微秒数开始递增，重启后也不会和已有记录撞上
+        self.seq = itertools.count(time.time_ns() // 1000)
+        self.events = 0
+        self.commits = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.thread = threading.Thread(target=self._run, name="dy-event-store", daemon=True)
+        self.thread.start()
+
+    def write_batch(self, packs, ts=None):
+        """ts 为这批事件的接收时间 (默认当前时间，回放/压测时可以指定)"""
+        if not packs:
+            return
+        with self.cond:
+            self.pending.append((time.time() if ts is None else ts, packs))
+            self.pending_events += len(packs)
+            while self.pending_events > self.max_pending and len(self.pending) > 1:
+                _, old = self.pending.popleft()
+                self.pending_events -= len(old)
+                self.dropped += len(old)
+            if self.pending_events >= self.batch_events:
+                self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.closed and self.pending_events < self.batch_events:
+                    self.cond.wait(self.flush_interval)
+                batches, self.pending = self.pending, deque()
+                self.pending_events = 0
+                closed = self.closed
+            if batches:
+                t = time.perf_counter()
+                try:
+                    self._write(batches)
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    # 整理行的时候出错，还没有写进任何一天：整批算丢弃，写入线程继续跑
+                    print(f">>> 事件入库失败: {e}")
+                    with self.cond:
+                        self.dropped += sum(len(packs) for _, packs in batches)
+                self.busy += time.perf_counter() - t
+            elif closed:
+                break
+        for conn in self.conns.values():
+            self._close(conn)
+        self.conns.clear()
+
+    def _close(self, conn, optimize=False):
+        if optimize and self.fts:
+            try:
+                conn.execute("INSERT INTO chat_fts (chat_fts) VALUES ('optimize')")
+            except sqlite3.Error as e:
+                print(f">>> 合并全文索引失败: {e}")
+        conn.close()
+
+    def _conn(self, day):
+        conn = self.conns.get(day)
+        if conn is None:
+            # 跨天后前一天的库不会再写，合并全文索引段后关掉
+            for old in [d for d in self.conns if d < day]:
+                self._close(self.conns.pop(old), optimize=True)
+            conn = sqlite3.connect(os.path.join(self.directory, f"events-{day}.db"), isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA + FTS_SCHEMA if self.fts else SCHEMA)
+            self.conns[day] = conn
+        return conn
+
+    def _write(self, batches):
+        rows = defaultdict(list)
+        chats = defaultdict(list)
+        gifts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        seq = self.seq
+        fts = self.fts
+        user_cache = self.user_terms
+        for ts, packs in batches:
+            day = day_of(ts)
+            ts_ms = int(ts * 1000)
+            day_rows, day_chats, day_gifts = rows[day], chats[day], gifts[day]
+            for p in packs:
+                kind = p.get("type")
+                if kind in SKIP_TYPES:
+                    continue
+                room_id = p.get("room_id") or ""
+                count = p.get("count")
+                if count is not None and type(count) is not int:
+                    count = _int(count)
+                server_ts = p.get("time")
+                if server_ts is not None:
+                    server_ts = _int(server_ts)
+                # 弹幕等大多数事件的字段都在 COLUMNS 里，没有 extra
+                extra = None
+                if not p.keys() <= COLUMNS:
+                    # 不能直接序列化的值 (bytes 等) 存成字符串
+                    extra = json.dumps({k: v for k, v in p.items() if k not in COLUMNS}, ensure_ascii=False, default=str)
+                n = next(seq)
+                user, content = p.get("user"), p.get("content")
+                day_rows.append((room_id, ts_ms, n, kind, user, content, p.get("gift_name"), count, server_ts, extra))
+                if kind == "chat" and fts:
+                    # 同一个人会反复发言，昵称切词的结果缓存起来
+                    user_terms = user_cache.get(user)
+                    if user_terms is None:
+                        if len(user_cache) > 100_000:
+                            user_cache.clear()
+                        user_terms = user_cache[user] = chat_terms(user)
+                    day_chats.append((n, chat_terms(content), user_terms, room_id, ts_ms))
+                elif kind == "gift":
+                    total = day_gifts[(room_id, p.get("user") or "", p.get("gift_name") or "")]
+                    total[0] += count or 0
+                    total[1] += 1
+        for day, day_rows in rows.items():
+            try:
+                conn = self._conn(day)
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(_INSERT, day_rows)
+                    if chats[day]:
+                        conn.executemany(_INSERT_CHAT, [row[:4] for row in chats[day]])
+                        conn.executemany(_INSERT_CHAT_ROW, [(n, room_id, ts_ms) for n, _, _, room_id, ts_ms in chats[day]])
+                    conn.executemany(_UPSERT_GIFT, [(room_id, user, gift, n, m)
+                                                    for (room_id, user, gift), (n, m) in gifts[day].items()])
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # 这一天的行回滚后计入丢弃，其他天照常写
+                print(f">>> 事件入库失败 ({day}): {e}")
+                with self.cond:
+                    self.dropped += len(day_rows)
+                continue
+            self.events += len(day_rows)
+            self.commits += 1
+
+    def take_stats(self):
+        with self.cond:
+            return {"events": self.events, "commits": self.commits, "dropped": self.dropped,
+                    "pending": self.pending_events, "busy": round(self.busy, 3)}
+
+    def close(self):
+        """写完队列里剩下的事件再关闭"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+
+
+# === 2. 查询 ===
+class StoreReader:
+    """只读查询；start/end 为秒级时间戳 (time.time())，None 表示不限"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.conns = {}
+        # day -> 库里有没有全文索引 (加索引之前建的库没有)
+        self.has_fts = {}
+
+    def days(self, start=None, end=None):
+        """时间范围覆盖到的库，按日期排序"""
+        first = day_of(start) if start is not None else ""
+        last = day_of(end) if end is not None else "99999999"
+        found = []
+        # 后端还没写过任何事件时目录可能还不存在
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        for name in sorted(names):
+            if name.startswith("events-") and name.endswith(".db"):
+                day = name[len("events-"):-len(".db")]
+                if first <= day <= last:
+                    found.append(day)
+        return found
+
+    def _conn(self, day):
+        conn = self.conns.get(day)
+        if conn is None:
+            path = os.path.join(self.directory, f"events-{day}.db")
+            conn = self.conns[day] = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _range(start, end):
+        return (int(start * 1000) if start is not None else 0,
+                int(end * 1000) if end is not None else 1 << 62)
+
+    @staticmethod
+    def _event(row):
+        event = {k: row[k] for k in ("room_id", "type", "user", "content", "gift_name", "count") if row[k] is not None}
+        event["ts"] = row["ts"] / 1000
+        if row["server_ts"] is not None:
+            event["time"] = str(row["server_ts"])
+        if row["extra"]:
+            event.update(json.loads(row["extra"]))
+        return event
+
+    def events(self, room_id, start=None, end=None, types=None, limit=1000):
+        """某房间 [start, end) 内的事件，按时间顺序，最多 limit 条"""
+        lo, hi = self._range(start, end)
+        sql = "SELECT * FROM events WHERE room_id = ? AND ts >= ? AND ts < ?"
+        params = [room_id, lo, hi]
+        if types:
+            sql += f" AND type IN ({','.join('?' * len(types))})"
+            params.extend(types)
+        sql += " ORDER BY ts, seq LIMIT ?"
+        out = []
+        for day in self.days(start, end):
+            rows = self._conn(day).execute(sql, params + [limit - len(out)]).fetchall()
+            out.extend(self._event(row) for row in rows)
+            if len(out) >= limit:
+                break
+        return out
+
+    def gift_totals(self, room_id=None, start=None, end=None, limit=50):
+        """[(用户, 礼物数, 礼物消息条数)]，按礼物数从多到少；取自按天汇总的表，start/end 按天取整"""
+        sql = "SELECT user, SUM(count), SUM(gifts) FROM gift_totals"
+        params = []
+        if room_id is not None:
+            sql += " WHERE room_id = ?"
+            params.append(room_id)
+        sql += " GROUP BY user"
+        totals = defaultdict(lambda: [0, 0])
+        for day in self.days(start, end):
+            for user, count, gifts in self._conn(day).execute(sql, params):
+                totals[user][0] += count
+                totals[user][1] += gifts
+        ranked = sorted(totals.items(), key=lambda kv: -kv[1][0])[:limit]
+        return [(user, count, gifts) for user, (count, gifts) in ranked]
+
+    def search_chat(self, text="", room_id=None, start=None, end=None, limit=100, user=None):
+        """
+        内容包含 text (以及昵称包含 user) 的弹幕，新的在前。
+        text 的每个汉字串按子串匹配，字母数字按词的前缀匹配，多个部分之间是 AND。
+        只有标点符号的搜索词 ("!!"、"?") 分不出全文索引的词，这时每一天都按 LIKE 子串扫描，和没有全文索引的库一致。
+        """
+        query = match_query(text)
+        user_query = match_query(user)
+        fts = not (_symbols_only(text) or _symbols_only(user))
+        if fts and not query and not user_query:
+            return []
+        expr = []
+        if query:
+            expr.append(f"terms : ({query})")
+        if user_query:
+            expr.append(f"user_terms : ({user_query})")
+        sql = ("SELECT e.room_id, e.ts, e.user, e.content FROM chat_fts f "
+               "JOIN chat_rows k ON k.seq = f.rowid "
+               "JOIN events e ON e.room_id = k.room_id AND e.ts = k.ts AND e.seq = k.seq "
+               "WHERE chat_fts MATCH ?")
+        params = [" AND ".join(expr)]
+        if room_id is not None:
+            # 房间号单独绑定，k.room_id 精确比较；room 列上再加一个 MATCH (值加引号转义) 让全文索引直接按房间求交。
+            # 分词会把房间号里的标点当分隔符，只有标点的房间号分不出词，这时只靠精确比较
+            room_id = str(room_id)
+            if _WORD.search(room_id):
+                sql += " AND f.room MATCH ?"
+                params.append(_quote(room_id))
+            sql += " AND k.room_id = ?"
+            params.append(room_id)
+        if start is not None or end is not None:
+            sql += " AND k.ts >= ? AND k.ts < ?"
+            params.extend(self._range(start, end))
+        sql += " ORDER BY f.rowid DESC LIMIT ?"
+        out = []
+        for day in reversed(self.days(start, end)):
+            if fts and self._has_fts(day):
+                rows = self._conn(day).execute(sql, params + [limit - len(out)]).fetchall()
+            else:
+                rows = self._scan_chat(day, text, user, room_id, start, end, limit - len(out))
+            out.extend({"room_id": row["room_id"], "type": "chat", "user": row["user"], "content": row["content"],
+                        "ts": row["ts"] / 1000} for row in rows)
+            if len(out) >= limit:
+                break
+        return out
+
+    def _has_fts(self, day):
+        found = self.has_fts.get(day)
+        if found is None:
+            found = self.has_fts[day] = self._conn(day).execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_fts'").fetchone() is not None
+        return found
+
+    def _scan_chat(self, day, text, user, room_id, start, end, limit):
+        lo, hi = self._range(start, end)
+        sql = "SELECT room_id, ts, user, content FROM events WHERE type = 'chat' AND ts >= ? AND ts < ?"
+        params = [lo, hi]
+        for column, value in (("content", text), ("user", user)):
+            if value:
+                sql += f" AND {column} LIKE ? ESCAPE '\\'"
+                params.append("%" + value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if room_id is not None:
+            sql += " AND room_id = ?"
+            params.append(room_id)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        return self._conn(day).execute(sql, params + [limit]).fetchall()
+
+    def close(self):
+        for conn in self.conns.values():
+            conn.close()
+        self.conns.clear()
+        self.has_fts.clear()
+
+
+# === 3. 命令行 ===
+def _parse_time(text):
+    if text is None:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            pass
+    return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("command", choices=("events", "gifts", "search"))
+    parser.add_argument("arg", nargs="?", help="events: room_id / gifts: room_id (可省略) / search: 关键词")
+    parser.add_argument("--room", default=None, help="search 时限定房间")
+    parser.add_argument("--user", default=None, help="search 时按昵称搜 (可以不给关键词)")
+    parser.add_argument("--since", default=None, help="开始时间，如 2026-10-18 20:00")
+    parser.add_argument("--until", default=None)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    reader = StoreReader(args.directory)
+    start, end = _parse_time(args.since), _parse_time(args.until)
+    t0 = time.perf_counter()
+    if args.command == "events":
+        if not args.arg:
+            parser.error("events 需要 room_id")
+        for e in reader.events(args.arg, start, end, limit=args.limit):
+            print(time.strftime("%H:%M:%S", time.localtime(e["ts"])), e["type"], e.get("user", ""),
+                  e.get("content") or e.get("gift_name") or "")
+    elif args.command == "gifts":
+        for user, count, gifts in reader.gift_totals(args.arg, start, end, limit=args.limit):
+            print(f"{count:>8} ({gifts} 条)  {user}")
+    else:
+        if not args.arg and not args.user:
+            parser.error("search 需要关键词或 --user")
+        for e in reader.search_chat(args.arg or "", args.room, start, end, limit=args.limit, user=args.user):
+            print(time.strftime("%m-%d %H:%M:%S", time.localtime(e["ts"])), e["room_id"], e.get("user", ""),
+                  e.get("content", ""))
+    print(f"({(time.perf_counter() - t0) * 1e3:.1f} ms)")
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+界面表格的数据模型 (Qt Model/View)
+
+QTableWidget 每插一行都要新建 QTableWidgetItem、整体挪动行并重新布局，事件一多界面就卡。
+这里的模型只在 Python 里存数据，视图只取可见的那几行；新数据先攒着，由界面定时器
+每个 tick 统一通知视图一次。
+"""
+import time
+from array import array
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+
+class EventRingModel(QAbstractTableModel):
+    """
+    "实时抓取数据" 表：固定容量的环形缓冲区。
+
+    append() 只把行放进待插入列表，flush() 在界面 tick 里调用：
+    超出容量的旧行一次 beginRemoveRows 删掉，新行一次 beginInsertRows 插入。
+    """
+    HEADERS = ["房间ID", "用户", "类型", "内容", "时间"]
+    TIME_COLUMN = 4
+
+    def __init__(self, capacity=5000, parent=None):
+        super().__init__(parent)
+        self.capacity = max(1, capacity)
+        self.ring = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+        self.pending = []
+
+    # --- 写入 ---
+    def append(self, room_id, user, label, content, ts=None):
+        self.pending.append((room_id, user, label, content, ts if ts is not None else time.time()))
+
+    def flush(self):
+        """把攒下的行交给视图，返回这次插入的行数"""
+        pending = self.pending
+        if not pending:
+            return 0
+        self.pending = []
+        if len(pending) > self.capacity:
+            pending = pending[-self.capacity:]
+        n = len(pending)
+        cap = self.capacity
+
+        overflow = self.count + n - cap
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.start = (self.start + overflow) % cap
+            self.count -= overflow
+            self.endRemoveRows()
+
+        self.beginInsertRows(QModelIndex(), self.count, self.count + n - 1)
+        ring = self.ring
+        pos = (self.start + self.count) % cap
+        for row in pending:
+            ring[pos] = row
+            pos += 1
+            if pos == cap:
+                pos = 0
+        self.count += n
+        self.endInsertRows()
+        return n
+
+    def clear(self):
+        self.beginResetModel()
+        self.ring = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+        self.pending = []
+        self.endResetModel()
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row = self.ring[(self.start + index.row()) % self.capacity]
+        column = index.column()
+        if column == self.TIME_COLUMN:
+            # 只有可见的行才会格式化时间
+            return time.strftime('%H:%M:%S', time.localtime(row[column]))
+        return row[column]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+
+class RoomRecord:
+    """直播间列表里的一项。rid 在整个运行期间唯一且不变，按钮回调和各个索引都用它，不用行号"""
+    __slots__ = ("rid", "url", "web_rid", "room_id", "name", "title", "live", "status", "status_color",
+                 "monitor", "external", "proc", "slot", "button", "refresh_button")
+
+    def __init__(self, rid, url="", web_rid="", name="待连接", title="", external=False):
+        self.rid = rid
+        self.url = url
+        # 直播间链接里的 web_rid，后端从 enter_room 里带回来，用来确定房间是哪个浏览器打开的
+        self.web_rid = web_rid
+        self.room_id = None
+        self.name = name
+        self.title = title
+        self.live = "🕒"
+        self.status = "未运行"
+        self.status_color = None
+        self.monitor = True
+        self.external = external
+        self.proc = None
+        self.slot = -1
+        self.button = None
+        self.refresh_button = None
+
+
+class RoomTableModel(QAbstractTableModel):
+    """
+    直播间列表：RoomRecord 按添加顺序排成行，序号列由行号直接算出。
+
+    by_id / by_room / by_pid / by_web_rid 几个索引让添加、删除和事件路由都不用扫描整张表；
+    已启动浏览器但还没对应上房间的记录按启动顺序放在 pending 里。
+    消息数按 slot 存在数组里只做加法，refresh() 定时把变化了的格子通知给视图。
+    后端发来 room_stats (见 analytics.py) 之后这一列改为显示最近 1 分钟的弹幕/礼物速率，悬停显示 1/5/60 分钟的明细。
+    """
+    HEADERS = ["序号", "主播/房间", "标题/ID", "消息数", "开播", "监控", "状态", "操作", "工具"]
+    NAME, TITLE, COUNT, MONITOR, STATUS = 1, 2, 3, 5, 6
+    RATES_HEADER = "弹幕/礼物 每分钟"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self.by_id = {}
+        self.by_room = {}
+        self.by_pid = {}
+        self.by_web_rid = {}
+        self.pending = OrderedDict()
+        self.next_rid = 1
+        self.counts = array('q')
+        self.painted = array('q')
+        self.free_slots = []
+        self.dirty = set()
+        self.renamed = set()
+        # rid -> (单元格文字, 悬停提示)，收到过 room_stats 的房间才有
+        self.rates = {}
+        self.rerated = set()
+        # rid -> 行号，删除中间的行之后失效，下次用到时重建 (一批删除只重建一次)
+        self.rows = {}
+        self.rows_valid = True
+
+    # --- 记录的增删 ---
+    def add(self, **fields):
+        rec = RoomRecord(self.next_rid, **fields)
+        self.next_rid += 1
+        if self.free_slots:
+            rec.slot = self.free_slots.pop()
+            self.counts[rec.slot] = 0
+            self.painted[rec.slot] = 0
+        else:
+            rec.slot = len(self.counts)
+            self.counts.append(0)
+            self.painted.append(0)
+        row = len(self.records)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.records.append(rec)
+        self.by_id[rec.rid] = rec
+        if rec.web_rid:
+            self.by_web_rid[rec.web_rid] = rec
+        if self.rows_valid:
+            self.rows[rec.rid] = row
+        self.endInsertRows()
+        return rec
+
+    def remove(self, rec):
+        self.remove_many((rec,))
+
+    def remove_many(self, recs):
+        """
+        一次删除多条记录：相邻的行合成一段，从下往上每段一次 beginRemoveRows，行号索引最后只重建一次。
+        (不用 beginResetModel：重置会把 setIndexWidget 放进表格的按钮全部销毁)
+        """
+        rows = set()
+        for rec in recs:
+            row = self.row_of(rec)
+            if row < 0 or row in rows:
+                continue
+            rows.add(row)
+            self.unbind_room(rec)
+            self.set_proc(rec, None)
+            del self.by_id[rec.rid]
+            if rec.web_rid and self.by_web_rid.get(rec.web_rid) is rec:
+                del self.by_web_rid[rec.web_rid]
+            self.free_slots.append(rec.slot)
+            self.dirty.discard(rec.rid)
+            self.renamed.discard(rec.rid)
+            self.rerated.discard(rec.rid)
+            self.rows.pop(rec.rid, None)
+        if not rows:
+            return
+        # 只删了末尾的行时其余行号不变，索引不用重建
+        tail = max(rows) == len(self.records) - 1 and len(rows) == len(self.records) - min(rows)
+        ordered = sorted(rows, reverse=True)
+        start = 0
+        while start < len(ordered):
+            last = first = ordered[start]
+            start += 1
+            while start < len(ordered) and ordered[start] == first - 1:
+                first = ordered[start]
+                start += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.records[first:last + 1]
+            self.endRemoveRows()
+        if not tail:
+            self.rows_valid = False
+
+    def clear(self):
+        self.beginResetModel()
+        self.records = []
+        self.by_id.clear()
+        self.by_room.clear()
+        self.by_pid.clear()
+        self.by_web_rid.clear()
+        self.pending.clear()
+        self.counts = array('q')
+        self.painted = array('q')
+        self.free_slots = []
+        self.dirty.clear()
+        self.renamed.clear()
+        self.rates.clear()
+        self.rerated.clear()
+        self.rows = {}
+        self.rows_valid = True
+        self.endResetModel()
+
+    def row_of(self, rec):
+        if not self.rows_valid:
+            self.rows = {r.rid: i for i, r in enumerate(self.records)}
+            self.rows_valid = True
+        return self.rows.get(rec.rid, -1)
+
+    # --- 索引：房间号、浏览器进程 ---
+    def bind_room(self, rec, room_id, count=0):
+        """记录对应上了一个直播间，消息数从 count 开始"""
+        self.unbind_room(rec)
+        rec.room_id = room_id
+        self.by_room[room_id] = rec
+        self.pending.pop(rec.rid, None)
+        self.counts[rec.slot] = count
+        self.dirty.add(rec.rid)
+
+    def unbind_room(self, rec):
+        if rec.room_id is not None and self.by_room.get(rec.room_id) is rec:
+            del self.by_room[rec.room_id]
+        rec.room_id = None
+        if self.rates.pop(rec.rid, None) is not None:
+            self.dirty.add(rec.rid)
+            self.rerated.add(rec.rid)
+
+    def set_proc(self, rec, proc):
+        """绑定/解绑浏览器进程；有进程但还没对应上房间的记录进入 pending"""
+        if rec.proc is not None:
+            self.by_pid.pop(rec.proc.pid, None)
+        rec.proc = proc
+        self.pending.pop(rec.rid, None)
+        if proc is not None:
+            self.by_pid[proc.pid] = rec
+            if rec.room_id is None:
+                self.pending[rec.rid] = rec
+
+    def claim_pending(self):
+        """
+        给不知道 web_rid 的新房间找浏览器：先按启动顺序认领链接里没有 web_rid 的记录；
+        有 web_rid 的记录等 enter_room 带回来的 web_rid 精确匹配，只有它是唯一待认领的浏览器时才直接认领。
+        """
+        for rid, rec in self.pending.items():
+            if not rec.web_rid:
+                del self.pending[rid]
+                return rec
+        if len(self.pending) == 1:
+            return self.pending.popitem()[1]
+        return None
+
+    def count_of(self, rec):
+        return self.counts[rec.slot]
+
+    # --- 更新 ---
+    def bump(self, rec):
+        self.counts[rec.slot] += 1
+        self.dirty.add(rec.rid)
+
+    def set_rates(self, rec, text, tooltip):
+        """room_stats 的摘要，refresh() 时和消息数一起通知视图"""
+        first = not self.rates
+        if self.rates.get(rec.rid) != (text, tooltip):
+            self.rates[rec.rid] = (text, tooltip)
+            self.dirty.add(rec.rid)
+            self.rerated.add(rec.rid)
+        if first:
+            self.headerDataChanged.emit(Qt.Orientation.Horizontal, self.COUNT, self.COUNT)
+
+    def set_name(self, rec, name):
+        if rec.name != name:
+            rec.name = name
+            self.dirty.add(rec.rid)
+            self.renamed.add(rec.rid)
+
+    def update(self, rec, **fields):
+        """低频字段 (状态、标题等) 直接通知视图整行刷新"""
+        for key, value in fields.items():
+            setattr(rec, key, value)
+        row = self.row_of(rec)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def refresh(self):
+        """定时调用：把消息数和主播名有变化的格子通知给视图，没变的不动"""
+        if not self.dirty:
+            return
+        counts, painted = self.counts, self.painted
+        for rid in self.dirty:
+            rec = self.by_id.get(rid)
+            if rec is None:
+                continue
+            row = self.row_of(rec)
+            slot = rec.slot
+            if counts[slot] != painted[slot] or rid in self.rerated:
+                painted[slot] = counts[slot]
+                index = self.index(row, self.COUNT)
+                self.dataChanged.emit(index, index)
+            if rid in self.renamed:
+                index = self.index(row, self.NAME)
+                self.dataChanged.emit(index, index)
+        self.dirty.clear()
+        self.renamed.clear()
+        self.rerated.clear()
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        rec = self.records[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(row + 1)
+            if column == self.NAME:
+                return rec.name
+            if column == self.TITLE:
+                return rec.title
+            if column == self.COUNT:
+                rates = self.rates.get(rec.rid)
+                return rates[0] if rates else str(self.counts[rec.slot])
+            if column == 4:
+                return rec.live
+            if column == self.STATUS:
+                return rec.status
+        elif role == Qt.ItemDataRole.ToolTipRole and column == self.COUNT:
+            rates = self.rates.get(rec.rid)
+            return rates[1] if rates else None
+        elif role == Qt.ItemDataRole.CheckStateRole and column == self.MONITOR:
+            return Qt.CheckState.Checked if rec.monitor else Qt.CheckState.Unchecked
+        elif role == Qt.ItemDataRole.ForegroundRole and column == self.STATUS and rec.status_color:
+            return QColor(rec.status_color)
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column == self.MONITOR:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role == Qt.ItemDataRole.CheckStateRole and index.column() == self.MONITOR:
+            self.records[index.row()].monitor = Qt.CheckState(value) == Qt.CheckState.Checked
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == self.MONITOR:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            if section == self.COUNT and self.rates:
+                return self.RATES_HEADER
+            return self.HEADERS[section]
+        return None
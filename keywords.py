@@ -0,0 +1,199 @@
+"""
+关键词告警：几千个关键词 (品牌名、违禁词...) 编译成一个 Aho-Corasick 自动机，每条弹幕只从头到尾扫一遍
+
+逐个关键词做 `kw in content` 的开销和词数成正比，几千个词时每条弹幕要几百微秒；
+自动机的匹配时间只和弹幕长度 (加上命中数) 有关，和词数无关。
+
+  词表 : UTF-8 文本，每行一个词，# 开头的行和空行忽略；行内 TAB 后面是可选的分类 (如 "违禁" / "品牌")。
+         匹配按子串、不区分大小写 (两边都做 casefold)。
+  实现 : 纯 Python。每个状态的转移是一个 dict，词表里没有的字符直接回到根状态。没有用 pyahocorasick：
+         它的节点用数组线性查找子节点，上万个中文词时根节点有几千个分支，实测每条弹幕反而要 100 微秒以上。
+  重载 : KeywordAlerts 每 reload_s 秒看一次词表文件的修改时间，变了就在后台线程里重新编译，编译好后整体替换；
+         自动机编译后只读，解码线程里正在用旧自动机的匹配不受影响，词表写到一半或格式有误时继续用旧的。
+"""
+import os
+import threading
+import time
+
+# 扫描这些类型的事件的 content
+SCAN_TYPES = frozenset(("chat",))
+# 词数不超过这个值时逐个 `in` 比建自动机快 (C 实现的子串查找，每个词约 0.2 微秒)
+LOOP_MAX = 48
+
+
+def read_keywords(path):
+    """读词表文件，返回 [(词, 分类)]，分类没写时为空串"""
+    words = []
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            word, _, category = line.partition("\t")
+            word = word.strip()
+            if word:
+                words.append((word, category.strip()))
+    return words
+
+
+class Automaton:
+    """Aho-Corasick 自动机：goto 是每个状态一个 {字符: 状态} 的字典，out 已经并上了 fail 链上的输出"""
+
+    def __init__(self, keys):
+        goto = [{}]
+        out = [()]
+        for i, key in enumerate(keys):
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (i,)
+        # 按层 (BFS) 求失败指针：子状态的 fail = 从父状态的 fail 出发沿同一个字符能走到的最长后缀
+        fail = [0] * len(goto)
+        layer = list(goto[0].values())
+        while layer:
+            nxt_layer = []
+            for state in layer:
+                for ch, child in goto[state].items():
+                    f = fail[state]
+                    while f and ch not in goto[f]:
+                        f = fail[f]
+                    fail[child] = target = goto[f].get(ch, 0)
+                    if out[target]:
+                        out[child] += out[target]
+                    nxt_layer.append(child)
+            layer = nxt_layer
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+        # 词表里根本没有的字符直接回到根状态，省掉沿 fail 链的回退
+        self.alphabet = frozenset(goto[0]).union(*goto)
+
+    def iter(self, text):
+        """依次给出命中的词的序号 (同一个词出现几次给几次)"""
+        goto, fail, out, alphabet = self.goto, self.fail, self.out, self.alphabet
+        state = 0
+        for ch in text:
+            if ch not in alphabet:
+                state = 0
+                continue
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if out[state]:
+                yield from out[state]
+
+
+class KeywordMatcher:
+    """编译好的关键词表，只读，多个线程可以同时调用 match()"""
+
+    def __init__(self, words=()):
+        # 同一个词 (casefold 后) 只留第一次出现的那条
+        entries = {}
+        for item in words:
+            word, category = (item, "") if isinstance(item, str) else item
+            entries.setdefault(word.casefold(), (word, category))
+        self.words = list(entries.values())
+        keys = list(entries)
+        self.keys = keys
+        self.automaton = Automaton(keys) if len(keys) > LOOP_MAX else None
+
+    def __len__(self):
+        return len(self.words)
+
+    def match(self, text):
+        """text 里出现的词 (不重复)，没有命中返回空列表"""
+        if not text or not self.keys:
+            return []
+        words = self.words
+        text = text.casefold()
+        if self.automaton is None:
+            return [words[i] for i, key in enumerate(self.keys) if key in text]
+        return [words[i] for i in dict.fromkeys(self.automaton.iter(text))]
+
+
+class KeywordAlerts:
+    """
+    解码路径上的关键词告警：scan(packs) 给一批事件里命中关键词的弹幕生成 alert 事件。
+    scan() 会在解码池的多个回调线程里同时调用，匹配只读当前的 matcher 引用；重新加载只替换这个引用。
+    """
+
+    def __init__(self, path, reload_s=5, log=print):
+        self.path = path
+        self.reload_s = reload_s
+        self.log = log
+        self.matcher = KeywordMatcher()
+        self.mtime = None
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+        self.loading = False
+        self.alerts = 0
+        self.reload(wait=True)
+
+    def reload(self, path=None, wait=False):
+        """重新读词表 (可以换一个文件)；默认在后台线程里编译，已经在编译时不重复启动"""
+        with self.lock:
+            if path:
+                self.path = path
+            if self.loading:
+                return
+            self.loading = True
+        if wait:
+            self._load()
+        else:
+            threading.Thread(target=self._load, name="dy-keywords", daemon=True).start()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            t = time.perf_counter()
+            matcher = KeywordMatcher(read_keywords(self.path))
+            self.matcher = matcher
+            self.mtime = mtime
+            self.log(f">>> 关键词表已加载: {len(matcher)} 个词 ({(time.perf_counter() - t) * 1000:.0f} ms) {self.path}")
+        except (OSError, UnicodeDecodeError) as e:
+            self.log(f">>> 关键词表加载失败，继续使用原来的 {len(self.matcher)} 个词: {e}")
+        finally:
+            with self.lock:
+                self.loading = False
+
+    def check_reload(self):
+        """距上次检查超过 reload_s 秒时看一眼文件的修改时间"""
+        now = time.monotonic()
+        if self.reload_s <= 0 or now < self.next_check:
+            return
+        self.next_check = now + self.reload_s
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self.mtime:
+            self.reload()
+
+    def scan(self, packs):
+        """返回这批事件产生的 alert 事件 (通常是空列表)"""
+        self.check_reload()
+        matcher = self.matcher
+        if not len(matcher):
+            return []
+        alerts = []
+        for p in packs:
+            if p.get("type") not in SCAN_TYPES:
+                continue
+            hits = matcher.match(p.get("content"))
+            if hits:
+                alerts.append({"type": "alert", "room_id": p.get("room_id"), "user": p.get("user"),
+                               "content": p.get("content"), "source": p["type"], "time": p.get("time"),
+                               "terms": [word for word, _ in hits],
+                               "categories": sorted({c for _, c in hits if c})})
+        self.alerts += len(alerts)
+        return alerts
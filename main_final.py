@@ -1,34 +1,106 @@
 import sys
 import multiprocessing  # 1. 确保导入了这个库
+import itertools
 import json
 import subprocess
-import datetime
 import os
-import winreg  # 操作注册表
-import ctypes  # 调用系统API刷新设置
+import queue
+import threading
+import time
 import atexit  # 退出时清理
+from urllib.parse import parse_qs, urlparse
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QGridLayout, QTableWidget, QTableWidgetItem,
+                             QHBoxLayout, QGridLayout,
                              QPushButton, QGroupBox, QCheckBox, QTextEdit, QLabel,
-                             QHeaderView, QLineEdit, QMessageBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QColor, QFont
+                             QHeaderView, QLineEdit, QMessageBox, QTableView, QComboBox)
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont
+
+import browser_pool
+import event_store
+import transport
+from gui_models import EventRingModel, RoomTableModel
+
+# 后端事件通道：binary (长度前缀 msgpack 帧，默认) / text (DY_DATA:: 行)
+EVENT_TRANSPORT = os.environ.get("DY_TRANSPORT", "binary")
+# 代理运行方式：subprocess = 独立的后端进程 (默认，崩溃不影响界面) / inprocess = 本进程里的线程
+PROXY_MODE = os.environ.get("DY_PROXY_MODE", "subprocess")
+# 同进程模式下界面还没取走的事件批上限；满了以后后端的写出线程等待，积压留在后端的背压队列里按策略丢弃
+INPROCESS_QUEUE_BATCHES = 256
+
+# "抓取条件" 里由后端负责过滤的开关 (其余如 sys 只影响界面日志)
+CAPTURE_SWITCHES = ('enter', 'gift', 'chat', 'follow', 'like', 'seq')
+# 实时数据表里显示的事件类型
+DETAIL_LABELS = {'chat': "弹幕", 'gift': "礼物", 'member': "进入", 'like': "点赞", 'social': "关注", 'alert': "告警"}
+# 系统日志里统计摘要显示的阶段 (后端 DY_METRICS=1 时才有)
+STAGE_LABELS = (('decompress', "解压"), ('response_parse', "解析"), ('message', "消息"),
+                ('pool', "解码池"), ('encode', "编码"), ('write', "写出"), ('keywords', "关键词"),
+                ('analytics', "统计"))
+# room_stats 事件 (见 analytics.py) 在主播信息卡片里显示的窗口和指标
+ROOM_STATS_WINDOWS = (('1m', "1 分钟"), ('5m', "5 分钟"), ('60m', "60 分钟"))
+ROOM_STATS_FIELDS = (('chat_pm', "弹幕/分"), ('gift_pm', "礼物/分"), ('chatters', "发言人数"))
+# 后端的事件库目录 (DY_STORE，见 event_store.py)，设置了才能在界面里搜索弹幕
+STORE_DIR = os.environ.get("DY_STORE", "")
+# 搜索结果最多显示的条数；搜索范围 (界面下拉框) -> 往前推的天数，None 为全部
+SEARCH_LIMIT = 500
+SEARCH_RANGES = (("今天", 0), ("近 7 天", 6), ("全部", None))
+# 实时数据表最多保留的行数 (环形缓冲区，超出后覆盖最旧的)
+try:
+    DETAIL_ROWS = int(os.environ.get("DY_DETAIL_ROWS", 5000))
+except ValueError:
+    DETAIL_ROWS = 5000
+# 界面刷新间隔：这段时间内到达的事件合并成一次表格更新
+UI_TICK_MS = 50
+# 直播间列表 (消息数、主播名) 的重绘间隔，计数平时只在内存里累加
+ROOM_REFRESH_MS = 250
+# 打开直播间的方式：pool = 少量浏览器进程里开标签页 (默认)，process = 每个房间一个浏览器进程
+BROWSER_MODE = os.environ.get("DY_BROWSER_MODE", "pool")
+try:
+    BROWSER_PROCESSES = int(os.environ.get("DY_BROWSER_PROCESSES", 2))
+    ROOMS_PER_BROWSER = int(os.environ.get("DY_ROOMS_PER_BROWSER", 8))
+except ValueError:
+    BROWSER_PROCESSES, ROOMS_PER_BROWSER = 2, 8
+# 浏览器池的内存检查/标签页回收间隔
+BROWSER_CHECK_MS = 60_000
+
+
+def web_rid_of(url):
+    """直播间链接 live.douyin.com/<web_rid> 里的 web_rid，取不到返回空串"""
+    try:
+        parsed = urlparse(url if "://" in url else f"https://{url}")
+        web_rid = parse_qs(parsed.query).get('web_rid', [''])[0]
+        if not web_rid:
+            web_rid = parsed.path.strip('/').split('/')[0]
+        return web_rid if web_rid.isdigit() else ''
+    except ValueError:
+        return ''
 
 
 # ==========================================
 # 0. 系统代理管理器
 # ==========================================
 class SystemProxy:
-    INTERNET_SETTINGS = winreg.OpenKey(winreg.HKEY_CURRENT_USER,
-                                       r'Software\Microsoft\Windows\CurrentVersion\Internet Settings',
-                                       0, winreg.KEY_ALL_ACCESS)
+    """
+    Windows 的系统代理 (注册表 Internet Settings)。winreg/ctypes 只在真正设置代理时才导入，
+    注册表项也在第一次用到时才打开，其他平台上导入本模块 (或 collector.py 这类无界面入口) 不受影响。
+    """
+    KEY_PATH = r'Software\Microsoft\Windows\CurrentVersion\Internet Settings'
+    _settings = None
+
+    @classmethod
+    def settings(cls):
+        import winreg
+        if cls._settings is None:
+            cls._settings = winreg.OpenKey(winreg.HKEY_CURRENT_USER, cls.KEY_PATH, 0, winreg.KEY_ALL_ACCESS)
+        return cls._settings
 
     def set_proxy(self, ip, port):
         """开启系统代理"""
         try:
+            import winreg
             proxy_addr = f"{ip}:{port}"
-            winreg.SetValueEx(self.INTERNET_SETTINGS, 'ProxyEnable', 0, winreg.REG_DWORD, 1)
-            winreg.SetValueEx(self.INTERNET_SETTINGS, 'ProxyServer', 0, winreg.REG_SZ, proxy_addr)
+            winreg.SetValueEx(self.settings(), 'ProxyEnable', 0, winreg.REG_DWORD, 1)
+            winreg.SetValueEx(self.settings(), 'ProxyServer', 0, winreg.REG_SZ, proxy_addr)
             self.refresh_system()
             print(f">>> 系统代理已自动开启: {proxy_addr}")
         except Exception as e:
@@ -37,13 +109,15 @@ class SystemProxy:
     def unset_proxy(self):
         """关闭系统代理"""
         try:
-            winreg.SetValueEx(self.INTERNET_SETTINGS, 'ProxyEnable', 0, winreg.REG_DWORD, 0)
+            import winreg
+            winreg.SetValueEx(self.settings(), 'ProxyEnable', 0, winreg.REG_DWORD, 0)
             self.refresh_system()
             print(">>> 系统代理已自动关闭")
         except Exception as e:
             print(f"❌ 关闭代理失败: {e}")
 
     def refresh_system(self):
+        import ctypes
         INTERNET_OPTION_SETTINGS_CHANGED = 39
         INTERNET_OPTION_REFRESH = 37
         ctypes.windll.wininet.InternetSetOptionW(0, INTERNET_OPTION_SETTINGS_CHANGED, 0, 0)
@@ -57,10 +131,12 @@ class CaptureWorker(QThread):
     log_signal = pyqtSignal(str, str)
     data_signal = pyqtSignal(dict)
 
-    def __init__(self):
+    def __init__(self, switches=()):
         super().__init__()
         self.process = None
         self.is_running = True
+        self.switches = list(switches)
+        self.ctrl_lock = threading.Lock()
 
 
 
@@ -103,6 +179,19 @@ class CaptureWorker(QThread):
         # ---------------------------------------------------------
         # 2. 统一启动进程 (只启动一次，并挂载管道读取数据)
         # ---------------------------------------------------------
+        listener = None
+        env = dict(os.environ)
+        # 初始抓取条件走环境变量，运行中的修改走 stdin 控制通道
+        env["DY_FILTERS"] = ",".join(self.switches)
+        env[transport.ENV_CONTROL] = "stdin"
+        if EVENT_TRANSPORT == "binary" and transport.msgpack is not None:
+            try:
+                listener = transport.BinaryListener()
+                env.update(listener.child_env())
+            except OSError as e:
+                self.log_signal.emit('sys', f"⚠️ binary 事件通道不可用，改用文本通道: {e}")
+                listener = None
+
         try:
             # 这里的 creationflags 用来控制是否弹黑框
             # CREATE_NO_WINDOW = 0x08000000 (完全隐藏黑框)
@@ -114,39 +203,51 @@ class CaptureWorker(QThread):
 
             self.process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE,  # 控制通道 (DY_CTRL::)
                 stdout=subprocess.PIPE,  # 必须有，否则读不到 DY_DATA
                 stderr=subprocess.PIPE,
                 text=True,
                 encoding='utf-8',
                 bufsize=1,
-                creationflags=flags
+                creationflags=flags,
+                env=env
             )
             self.log_signal.emit('sys', '>>> 抓包服务已启动 (Port: 8081)...')
 
         except Exception as e:
             self.log_signal.emit('sys', f"❌ 启动失败: {str(e)}")
+            if listener: listener.close()
             return
 
         # ---------------------------------------------------------
-        # 3. 数据监听循环 (保持不变)
+        # 3. 数据监听循环
         # ---------------------------------------------------------
+        if not listener:
+            self.read_stdout()
+            return
+
+        # binary 模式：stdout 交给独立线程 (日志、报错，以及后端退回 text 模式时的事件行)
+        threading.Thread(target=self.read_stdout, daemon=True).start()
+        try:
+            self.read_binary(listener)
+        finally:
+            listener.close()
+
+    def read_stdout(self):
         while self.is_running:
-            if not self.process: break
+            process = self.process
+            if not process: break
             try:
-                line = self.process.stdout.readline()
-                if not line and self.process.poll() is not None: break
+                line = process.stdout.readline()
+                if not line and process.poll() is not None: break
 
                 if line:
                     line = line.strip()
                     # 监听数据标识
-                    if line.startswith("DY_DATA::"):
-                        json_str = line.replace("DY_DATA::", "")
-                        try:
-                            import json
-                            data = json.loads(json_str)
+                    if line.startswith(transport.TEXT_PREFIX):
+                        data = transport.parse_text_line(line)
+                        if data is not None:
                             self.data_signal.emit(data)
-                        except:
-                            pass
                     # 监听报错信息
                     elif "Error" in line:
                         self.log_signal.emit('sys', f"[后端报错] {line}")
@@ -155,6 +256,32 @@ class CaptureWorker(QThread):
 
             except Exception:
                 break
+
+    def read_binary(self, listener):
+        # 等后端连上来；后端如果退回了 text 模式就不会连，事件由 stdout 线程处理
+        while self.is_running and self.process and self.process.poll() is None:
+            if listener.accept(timeout=0.5):
+                break
+        else:
+            return
+        try:
+            for batch in listener.iter_batches():
+                if not self.is_running: break
+                for data in batch:
+                    self.data_signal.emit(data)
+        except Exception:
+            pass
+    def send_control(self, cmd, **kwargs):
+        """给后端发一条控制指令 (GUI 线程调用)"""
+        process = self.process
+        if not process or not process.stdin: return
+        with self.ctrl_lock:
+            try:
+                process.stdin.write(transport.encode_control(cmd, **kwargs) + "\n")
+                process.stdin.flush()
+            except (OSError, ValueError):
+                pass
+
     def stop0(self):
         self.is_running = False
         if self.process:
@@ -185,6 +312,193 @@ class CaptureWorker(QThread):
             finally:
                 self.process = None
 
+class InProcessWorker(QThread):
+    """
+    同进程模式：DouyinBackend 和 mitmproxy 在本进程的一个线程里用独立的事件循环运行，
+    事件批以 Python 对象放进 events 队列，由界面定时器直接取走，不经过 JSON/msgpack 和管道。
+    和 CaptureWorker 提供相同的 log_signal / send_control / stop。
+    """
+    log_signal = pyqtSignal(str, str)
+    data_signal = pyqtSignal(dict)
+
+    def __init__(self, switches=()):
+        super().__init__()
+        self.switches = list(switches)
+        self.events = queue.Queue(INPROCESS_QUEUE_BATCHES)
+        self.proxy = None
+        self.is_running = True
+
+    def run(self):
+        # mitmproxy 只在这个模式下才导入，放在后台线程里不卡界面
+        try:
+            import addon_backend
+        except Exception as e:
+            self.log_signal.emit('sys', f"❌ 加载抓包模块失败: {e}")
+            return
+        backend = addon_backend.DouyinBackend(writer=transport.QueueWriter(self.events),
+                                              filters=self.switches, control="")
+        proxy = addon_backend.ProxyThread(backend)
+        proxy.start()
+        proxy.ready.wait(30)
+        if proxy.error is not None or not proxy.is_alive():
+            self.log_signal.emit('sys', f"❌ 启动失败: {proxy.error}")
+            return
+        self.proxy = proxy
+        self.log_signal.emit('sys', f'>>> 抓包服务已启动 (同进程, Port: {addon_backend.LISTEN_PORT})...')
+
+    def drain(self):
+        """界面线程调用：取走目前到达的所有事件批"""
+        batches = []
+        events = self.events
+        while True:
+            try:
+                batches.append(events.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def send_control(self, cmd, **kwargs):
+        if self.proxy:
+            self.proxy.control({"cmd": cmd, **kwargs})
+
+    def stop(self):
+        self.is_running = False
+        self.wait(5000)
+        # 界面不再取事件了，先清空队列，免得后端的写出线程卡在 put 上拖慢退出
+        self.drain()
+        if self.proxy:
+            self.proxy.stop()
+            self.proxy = None
+
+
+class SearchWorker(QThread):
+    """
+    弹幕搜索：查询在这个线程里执行 (SQLite 连接只能在创建它的线程里用)，界面线程只投递查询、收结果。
+    连续提交多次时只执行最新的一次。
+    """
+    result_signal = pyqtSignal(int, list, float, str)
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self.requests = queue.Queue()
+
+    def search(self, request_id, text, user, since):
+        self.requests.put((request_id, text, user, since))
+
+    def run(self):
+        reader = event_store.StoreReader(self.directory)
+        while True:
+            request = self.requests.get()
+            # 排队期间又提交了新的查询就跳过旧的
+            while request is not None and not self.requests.empty():
+                request = self.requests.get()
+            if request is None:
+                break
+            request_id, text, user, since = request
+            t = time.perf_counter()
+            rows, error = [], ""
+            try:
+                rows = reader.search_chat(text, start=since, limit=SEARCH_LIMIT, user=user)
+            except Exception as e:
+                error = str(e)
+            self.result_signal.emit(request_id, rows, time.perf_counter() - t, error)
+        reader.close()
+
+    def stop(self):
+        self.requests.put(None)
+        self.wait(2000)
+
+
+class BrowserWorker(QThread):
+    """
+    浏览器的启动、关闭和定时回收：启动要等调试端口 (最多 15 秒)，打开/关闭标签页和回收都是阻塞的 DevTools HTTP 调用，
+    全部放在这个线程里按提交顺序执行，界面线程只投递请求、收结果。浏览器池只在这个线程里用，不用加锁。
+    """
+    # rid, 请求号, Tab / Popen (失败时为 None), 错误信息
+    opened_signal = pyqtSignal(int, int, object, str)
+    # 重开的标签页数, [(url, 错误)], pool.stats()
+    checked_signal = pyqtSignal(int, list, list)
+    log_signal = pyqtSignal(str, str)
+
+    def __init__(self):
+        super().__init__()
+        self.pool = None
+        self.requests = queue.Queue()
+
+    def open(self, rid, token, url):
+        self.requests.put(("open", rid, token, url))
+
+    def close(self, proc):
+        self.requests.put(("close", proc))
+
+    def check(self):
+        self.requests.put(("check",))
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            kind = request[0]
+            try:
+                if kind == "open":
+                    self.open_browser(*request[1:])
+                elif kind == "close":
+                    self.close_browser(request[1])
+                else:
+                    self.check_browsers()
+            except Exception as e:
+                self.log_signal.emit('sys', f"⚠️ 浏览器操作失败: {e}")
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def open_browser(self, rid, token, url):
+        """打开直播间：浏览器池模式下是共享浏览器里的一个标签页，process 模式下是独立的浏览器进程"""
+        proc, error = None, ""
+        try:
+            # 数据目录 (必须有这个才能获取数据)，生成在当前运行目录下
+            user_data_dir = os.path.join(os.getcwd(), "browser_profile_live")
+            if BROWSER_MODE == "pool":
+                if self.pool is None:
+                    self.pool = browser_pool.BrowserPool(
+                        user_data_dir, max_processes=BROWSER_PROCESSES, rooms_per_process=ROOMS_PER_BROWSER)
+                proc = self.pool.open(url)
+            else:
+                proc = browser_pool.launch_browser(url, user_data_dir)
+        except browser_pool.BrowserError as e:
+            error = str(e)
+        except Exception as e:
+            # 捕获所有启动错误，防止闪退
+            print(f"CRITICAL ERROR: {e}")
+            error = f"浏览器启动严重错误: {e}"
+        self.opened_signal.emit(rid, token, proc, error)
+
+    def close_browser(self, proc):
+        if isinstance(proc, browser_pool.Tab):
+            try:
+                proc.terminate()
+            except:
+                pass
+        else:
+            browser_pool.kill_process_tree(proc)
+
+    def check_browsers(self):
+        pool = self.pool
+        reopened, failed, stats = [], [], []
+        if pool is not None and pool.processes:
+            try:
+                reopened, failed = pool.recycle()
+                stats = pool.stats()
+            except Exception as e:
+                self.log_signal.emit('sys', f"⚠️ 浏览器池检查失败: {e}")
+        self.checked_signal.emit(len(reopened), [(tab.url, str(e)) for tab, e in failed], stats)
+
+    def stop(self):
+        """关掉所有浏览器后退出 (排在前面的关闭请求先执行完)"""
+        self.requests.put(None)
+        self.wait(15000)
+
+
 # ==========================================
 # 2. 自定义控件
 # ==========================================
@@ -217,8 +531,35 @@ class AnchorInfoCard(QGroupBox):
         stats_layout.addStretch()
         info_layout.addLayout(stats_layout)
         layout.addLayout(info_layout)
+
+        # 后端 room_stats 的滑动窗口统计：行是指标，列是窗口
+        window_layout = QGridLayout()
+        window_layout.setHorizontalSpacing(12)
+        self.window_labels = {}
+        for col, (key, title) in enumerate(ROOM_STATS_WINDOWS, start=1):
+            window_layout.addWidget(QLabel(title), 0, col)
+        for row, (field, title) in enumerate(ROOM_STATS_FIELDS, start=1):
+            window_layout.addWidget(QLabel(title), row, 0)
+            for col, (key, _) in enumerate(ROOM_STATS_WINDOWS, start=1):
+                label = self.window_labels[key, field] = QLabel("--")
+                label.setStyleSheet("color: #333;")
+                window_layout.addWidget(label, row, col)
+        self.lbl_top = QLabel("送礼榜: --")
+        self.lbl_top.setStyleSheet("color: #666;")
+        self.lbl_top.setWordWrap(True)
+        window_layout.addWidget(self.lbl_top, len(ROOM_STATS_FIELDS) + 1, 0, 1, len(ROOM_STATS_WINDOWS) + 1)
+        layout.addLayout(window_layout)
         self.setLayout(layout)
 
+    def show_stats(self, windows):
+        """windows 为 room_stats 事件里的 windows，None 表示清空"""
+        for (key, field), label in self.window_labels.items():
+            value = (windows or {}).get(key, {}).get(field)
+            label.setText("--" if value is None else f"{value:g}")
+        top = (windows or {}).get(ROOM_STATS_WINDOWS[-1][0], {}).get('top')
+        self.lbl_top.setText(f"送礼榜 ({ROOM_STATS_WINDOWS[-1][1]}): "
+                             + (" · ".join(f"{user} {value}" for user, value in top) if top else "--"))
+
 
 # ==========================================
 # 3. 主界面
@@ -235,7 +576,7 @@ class MainWindow(QMainWindow):
             QPushButton:hover { background-color: #4a755a; }
             QLineEdit { border: 1px solid #ccc; border-radius: 4px; padding: 6px; background: white; }
             QGroupBox { background: white; border: 1px solid #e0e0e0; border-radius: 6px; margin-top: 10px; }
-            QTableWidget { background-color: white; border: none; gridline-color: #f0f0f0; }
+            QTableView { background-color: white; border: none; gridline-color: #f0f0f0; }
             QHeaderView::section { background-color: #f8f9fa; border: none; padding: 6px; font-weight: bold; color: #555; }
         """)
 
@@ -250,9 +591,20 @@ class MainWindow(QMainWindow):
         self.text_log.setReadOnly(True)
         self.text_log.document().setMaximumBlockCount(500)
 
-        self.room_map = {}
-        self.pending_browsers = {}
+        # 直播间列表：记录、索引 (房间号/浏览器进程) 和计数都在模型里，表格行由模型导出
+        self.room_model = RoomTableModel(self)
+        # 浏览器在 BrowserWorker 里启动/关闭；rid -> (请求号, 成功后的状态文字)，启动中的才有
+        self.browser_worker = BrowserWorker()
+        self.opening = {}
+        self.open_tokens = itertools.count(1)
+        self.browser_check_pending = False
+        # 后端事件库 (DY_STORE) 累计丢弃的条数，增加时才提示
+        self.store_dropped = 0
+        self.dedup_dropped = 0
         self.blacklisted_rooms = set()
+        # room_id -> 最近一条 room_stats 的 windows；主播信息卡片显示的是 card_room 的
+        self.room_stats = {}
+        self.card_room = None
         self.filters = {'sys': True, 'gift': True, 'chat': True}
 
         # --- UI 构建 ---
@@ -276,14 +628,14 @@ class MainWindow(QMainWindow):
         input_layout.addWidget(self.btn_add)
         table_layout.addLayout(input_layout)
 
-        self.table_rooms = QTableWidget(0, 9)
-        cols = ["序号", "主播/房间", "标题/ID", "消息数", "开播", "监控", "状态", "操作", "工具"]
-        self.table_rooms.setHorizontalHeaderLabels(cols)
+        self.table_rooms = QTableView()
+        self.table_rooms.setModel(self.room_model)
         self.table_rooms.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table_rooms.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         self.table_rooms.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)
         self.table_rooms.verticalHeader().setVisible(False)
         self.table_rooms.setAlternatingRowColors(True)
+        self.table_rooms.clicked.connect(self.select_room)
         table_layout.addWidget(self.table_rooms)
         top_layout.addWidget(table_area, stretch=4)
 
@@ -294,6 +646,8 @@ class MainWindow(QMainWindow):
             btn = QPushButton(text)
             btn.setFixedHeight(35)
             btn_layout.addWidget(btn)
+            if text == "全部启动": btn.clicked.connect(self.start_all)
+            if text == "全部关闭": btn.clicked.connect(self.stop_all)
             if text == "清空直播间": btn.clicked.connect(self.clear_rooms)
             if text == "清空日志": btn.clicked.connect(lambda: self.text_log.clear())
         btn_layout.addStretch()
@@ -301,10 +655,40 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(top_container, stretch=3)
 
         group_data = QGroupBox("实时抓取数据");
+        self.group_data = group_data
         l_data = QVBoxLayout()
-        self.table_details = QTableWidget(0, 5)
-        self.table_details.setHorizontalHeaderLabels(["房间ID", "用户", "类型", "内容", "时间"])
+        # 弹幕搜索：结果换到同一张表里显示，清空搜索框回到实时数据
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索弹幕：关键词，或 @昵称 关键词 (回车搜索，清空返回实时数据)")
+        self.search_input.returnPressed.connect(self.run_search)
+        self.search_input.textChanged.connect(lambda text: text or self.show_live())
+        self.search_range = QComboBox()
+        self.search_range.addItems([label for label, _ in SEARCH_RANGES])
+        btn_search = QPushButton("搜索")
+        btn_search.setFixedWidth(70)
+        btn_search.clicked.connect(self.run_search)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.search_range)
+        search_layout.addWidget(btn_search)
+        l_data.addLayout(search_layout)
+        self.search_model = EventRingModel(SEARCH_LIMIT, self)
+        self.search_id = 0
+        self.search_worker = None
+        if STORE_DIR:
+            self.search_worker = SearchWorker(STORE_DIR)
+            self.search_worker.result_signal.connect(self.show_search_results)
+            self.search_worker.start()
+        else:
+            for w in (self.search_input, self.search_range, btn_search):
+                w.setEnabled(False)
+            self.search_input.setPlaceholderText("设置 DY_STORE (事件库目录) 后可以搜索弹幕")
+        self.detail_model = EventRingModel(DETAIL_ROWS, self)
+        self.table_details = QTableView()
+        self.table_details.setModel(self.detail_model)
         self.table_details.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # 固定行高，视图不用逐行测量内容
+        self.table_details.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.table_details.setAlternatingRowColors(True)
         l_data.addWidget(self.table_details)
         group_data.setLayout(l_data)
@@ -322,7 +706,7 @@ class MainWindow(QMainWindow):
         self.add_cb("弹幕", 'chat', 0, 2, gl);
         self.add_cb("关注", 'follow', 1, 0, gl)
         self.add_cb("点赞", 'like', 1, 1, gl);
-        self.add_cb("升级", 'up', 1, 2, gl)
+        self.add_cb("在线人数", 'seq', 1, 2, gl)
         group_cond.setLayout(gl);
         right_layout.addWidget(group_cond)
         group_log = QGroupBox("系统日志");
@@ -333,7 +717,25 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(left_widget, stretch=3);
         main_layout.addWidget(right_widget, stretch=1)
 
-        self.worker = CaptureWorker()
+        # 事件只进模型的待插入列表，由定时器统一刷到界面上
+        self.ui_timer = QTimer(self)
+        self.ui_timer.timeout.connect(self.ui_tick)
+        self.ui_timer.start(UI_TICK_MS)
+        self.room_timer = QTimer(self)
+        self.room_timer.timeout.connect(self.room_model.refresh)
+        self.room_timer.start(ROOM_REFRESH_MS)
+        self.browser_worker.opened_signal.connect(self.browser_opened)
+        self.browser_worker.checked_signal.connect(self.browsers_checked)
+        self.browser_worker.log_signal.connect(self.handle_log)
+        self.browser_worker.start()
+        self.browser_timer = QTimer(self)
+        self.browser_timer.timeout.connect(self.check_browsers)
+        self.browser_timer.start(BROWSER_CHECK_MS)
+
+        if PROXY_MODE == "inprocess":
+            self.worker = InProcessWorker(self.enabled_switches())
+        else:
+            self.worker = CaptureWorker(self.enabled_switches())
         self.worker.log_signal.connect(self.handle_log)
         self.worker.data_signal.connect(self.handle_data)
         self.worker.start()
@@ -341,78 +743,67 @@ class MainWindow(QMainWindow):
     def add_cb(self, text, key, r, c, layout):
         cb = QCheckBox(text)
         cb.setChecked(self.filters.get(key, False))
-        cb.stateChanged.connect(lambda s, k=key: self.filters.update({k: s == 2}))
+        cb.stateChanged.connect(lambda s, k=key: self.set_filter(k, s == 2))
         layout.addWidget(cb, r, c)
 
+    def enabled_switches(self):
+        return [k for k in CAPTURE_SWITCHES if self.filters.get(k)]
+
+    def set_filter(self, key, enabled):
+        self.filters[key] = enabled
+        # 抓取类开关下推到后端，未勾选的消息在后端解析 payload 之前就被跳过
+        if key in CAPTURE_SWITCHES and getattr(self, 'worker', None):
+            self.worker.send_control('filters', enabled=self.enabled_switches())
+
     # ======================================================
     #   核心修复区：启动浏览器
     # ======================================================
-    def open_headless_browser(self, url):
-        try:
-            # 1. 寻找浏览器
-            browser_path = None
-            candidates = [
-                r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
-                r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
-                r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe"
-            ]
-            for path in candidates:
-                if os.path.exists(path):
-                    browser_path = path
-                    break
-
-            if not browser_path:
-                self.log_signal.emit('sys', "❌ 未找到浏览器")
-                return None
-
-            # 2. 设置数据目录 (必须有这个才能获取数据)
-            # 使用 os.getcwd() 最稳妥，生成在当前运行目录下
-            current_dir = os.getcwd()
-            user_data_dir = os.path.join(current_dir, "browser_profile_live")
-            if not os.path.exists(user_data_dir):
-                try:
-                    os.makedirs(user_data_dir)
-                except:
-                    pass
-
-            user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-
-            cmd = [
-                browser_path,
-                "--proxy-server=http://127.0.0.1:8081",
-                f"--user-agent={user_agent}",
-                f"--user-data-dir={user_data_dir}",  # 关键点：记忆功能
-
-                "--disable-blink-features=AutomationControlled",
-                "--exclude-switches=enable-automation",
-                "--autoplay-policy=no-user-gesture-required",
-                "--disable-quic",
-                "--ignore-certificate-errors",
-                "--no-first-run",
-                "--no-sandbox",
-                "--enable-gpu-rasterization",
-                "--ignore-gpu-blocklist",
-                "--start-maximized",
-                url
-            ]
-
-            # 3. 启动进程
-            # 移除了 creationflags (因为您的环境不支持)
-            # 保留了 stdin=subprocess.PIPE (因为您测试有效)
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                stdin=subprocess.PIPE
-            )
-            return proc
+    def open_browser(self, rec, status, pending):
+        """在 BrowserWorker 里启动浏览器，界面不等；成功后状态改为 status，结果回到 browser_opened"""
+        token = next(self.open_tokens)
+        self.opening[rec.rid] = (token, status)
+        rec.button.setText("关闭")
+        rec.button.setStyleSheet("background-color: #d9534f;")
+        self.room_model.update(rec, status=pending, status_color=None)
+        self.browser_worker.open(rec.rid, token, rec.url)
+
+    def browser_opened(self, rid, token, proc, error):
+        rec = self.room_model.by_id.get(rid)
+        entry = self.opening.get(rid)
+        if rec is None or entry is None or entry[0] != token:
+            # 启动期间这一行被关闭、删除或者又重新启动了：打开的浏览器不再需要
+            if proc is not None:
+                self.browser_worker.close(proc)
+            return
+        del self.opening[rid]
+        if proc is None:
+            self.handle_log('sys', f"❌ {error}")
+            rec.button.setText("启动")
+            rec.button.setStyleSheet("background-color: #568668;")
+            self.room_model.update(rec, status="启动失败", status_color="red")
+            return
+        self.room_model.set_proc(rec, proc)
+        self.room_model.update(rec, status=entry[1], status_color="green" if entry[1] == "运行中" else None)
 
-        except Exception as e:
-            # 捕获所有启动错误，防止闪退
-            print(f"CRITICAL ERROR: {e}")
-            self.handle_log('sys', f"❌ 浏览器启动严重错误: {e}")
-            return None
+    def check_browsers(self):
+        """定时回收泄漏内存的标签页 (在 BrowserWorker 里)，上一次还没做完就跳过"""
+        if self.browser_check_pending:
+            return
+        self.browser_check_pending = True
+        self.browser_worker.check()
+
+    def browsers_checked(self, reopened, failed, stats):
+        """回收结果：在日志里报告重开/重开失败的直播页和每个房间占用的内存"""
+        self.browser_check_pending = False
+        if reopened:
+            self.handle_log('sys', f"♻️ 已重开 {reopened} 个内存过高/运行过久的直播页")
+        for url, error in failed:
+            self.handle_log('sys', f"⚠️ 直播页重开失败，保留原页面，下次检查再试: {url} ({error})")
+        rooms = sum(r[1] for r in stats)
+        total = sum(r[2] for r in stats)
+        if rooms:
+            self.handle_log('sys', f"🧮 浏览器池: {len(stats)} 个进程 / {rooms} 个房间, "
+                                   f"共 {total:.0f} MB, 平均 {total / rooms:.0f} MB/房间")
 
     def add_room_from_url(self):
         url = self.url_input.text().strip()
@@ -421,192 +812,281 @@ class MainWindow(QMainWindow):
         self.url_input.clear()
 
     def add_table_row(self, url="", user="待连接", room_id="", is_external=False):
-        row = self.table_rooms.rowCount()
-        self.table_rooms.insertRow(row)
-
-        self.table_rooms.setItem(row, 0, QTableWidgetItem(str(row + 1)))
-        self.table_rooms.setItem(row, 1, QTableWidgetItem(user))
         display_text = url if url else f"ID:{room_id}"
         if is_external: display_text = f"外部ID:{room_id}"
-        self.table_rooms.setItem(row, 2, QTableWidgetItem(display_text))
-        self.table_rooms.setItem(row, 3, QTableWidgetItem("0"))
-        self.table_rooms.setItem(row, 4, QTableWidgetItem("🕒"))
-
-        cb = QCheckBox();
-        cb.setChecked(True)
-        container = QWidget();
-        ly = QHBoxLayout(container);
-        ly.addWidget(cb);
-        ly.setAlignment(Qt.AlignmentFlag.AlignCenter);
-        ly.setContentsMargins(0, 0, 0, 0)
-        self.table_rooms.setCellWidget(row, 5, container)
-
-        self.table_rooms.setItem(row, 6, QTableWidgetItem("未运行"))
+        rec = self.room_model.add(url=url, web_rid=web_rid_of(url) if url else "", name=user,
+                                  title=display_text, external=is_external)
 
+        # 按钮回调里只记 rid，删掉其它行之后也不会指错
         btn = QPushButton("启动" if not is_external else "移除")
         btn.setStyleSheet(
             "background-color: #568668; font-size: 11px;" if not is_external else "background-color: #6c757d;")
         if not is_external:
-            btn.clicked.connect(lambda _, b=btn, u=url: self.toggle_browser(b, u))
+            btn.clicked.connect(lambda _, rid=rec.rid: self.toggle_browser(rid))
         else:
-            btn.clicked.connect(lambda _, b=btn: self.remove_room(b, room_id))
-        self.table_rooms.setCellWidget(row, 7, btn)
+            btn.clicked.connect(lambda _, rid=rec.rid: self.remove_room(rid))
+        rec.button = btn
 
         btn_refresh = QPushButton("刷新")
         btn_refresh.setStyleSheet("background-color: #17a2b8; font-size: 11px;")
         if is_external:
             btn_refresh.setEnabled(False)
         else:
-            btn_refresh.clicked.connect(lambda _, r=row: self.refresh_browser(r))
-        self.table_rooms.setCellWidget(row, 8, btn_refresh)
-
-    def toggle_browser(self, btn, url):
-        row = self.table_rooms.indexAt(btn.pos()).row()
-        if row == -1: return
-
-        if btn.text() == "启动":
-            proc = self.open_headless_browser(url)
-            if proc:
-                self.pending_browsers[row] = proc
-                btn.setText("关闭")
-                btn.setStyleSheet("background-color: #d9534f;")
-                self.table_rooms.setItem(row, 6, QTableWidgetItem("运行中"))
-                self.table_rooms.item(row, 6).setForeground(QColor("green"))
+            btn_refresh.clicked.connect(lambda _, rid=rec.rid: self.refresh_browser(rid))
+        rec.refresh_button = btn_refresh
+
+        row = self.room_model.row_of(rec)
+        self.table_rooms.setIndexWidget(self.room_model.index(row, 7), btn)
+        self.table_rooms.setIndexWidget(self.room_model.index(row, 8), btn_refresh)
+        return rec
+
+    def toggle_browser(self, rid):
+        rec = self.room_model.by_id.get(rid)
+        if rec is None: return
+
+        if rec.button.text() == "启动":
+            self.open_browser(rec, "运行中", "启动中...")
         else:
-            self.safe_kill(row)
-            btn.setText("启动")
-            btn.setStyleSheet("background-color: #568668;")
-            self.table_rooms.setItem(row, 6, QTableWidgetItem("已停止"))
-            self.table_rooms.item(row, 6).setForeground(QColor("black"))
-            self.table_rooms.setItem(row, 1, QTableWidgetItem("待连接"))
-
-    def safe_kill(self, row):
-        if row in self.pending_browsers:
-            try:
-                self.pending_browsers[row].terminate()
-                subprocess.call(['taskkill', '/F', '/T', '/PID', str(self.pending_browsers[row].pid)],
-                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            except:
-                pass
-            del self.pending_browsers[row]
-
-        target_id = None
-        for r_id, info in self.room_map.items():
-            if info['row'] == row:
-                target_id = r_id
-                if info.get('browser_proc'):
-                    try:
-                        info['browser_proc'].terminate()
-                        subprocess.call(['taskkill', '/F', '/T', '/PID', str(info['browser_proc'].pid)],
-                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    except:
-                        pass
-                break
-        if target_id: del self.room_map[target_id]
-
-    def remove_room(self, btn, room_id):
-        row = self.table_rooms.indexAt(btn.pos()).row()
-        if row == -1: return
-        if room_id: self.blacklisted_rooms.add(room_id)
-        self.safe_kill(row)
-        self.table_rooms.removeRow(row)
-        for r_id in self.room_map:
-            if self.room_map[r_id]['row'] > row: self.room_map[r_id]['row'] -= 1
-        new_pending = {}
-        for r, proc in self.pending_browsers.items():
-            if r > row:
-                new_pending[r - 1] = proc
-            elif r < row:
-                new_pending[r] = proc
-        self.pending_browsers = new_pending
-        for i in range(self.table_rooms.rowCount()):
-            self.table_rooms.setItem(i, 0, QTableWidgetItem(str(i + 1)))
+            self.safe_kill(rec)
+            rec.button.setText("启动")
+            rec.button.setStyleSheet("background-color: #568668;")
+            self.room_model.update(rec, status="已停止", status_color="black", name="待连接")
+
+    def start_all(self):
+        """同时启动所有未运行的直播间：房间按 web_rid 对应到浏览器，不需要一个一个等"""
+        for rec in list(self.room_model.records):
+            if not rec.external and rec.proc is None and rec.button.text() == "启动":
+                self.toggle_browser(rec.rid)
+
+    def stop_all(self):
+        for rec in list(self.room_model.records):
+            if not rec.external and rec.button.text() == "关闭":
+                self.toggle_browser(rec.rid)
+
+    def safe_kill(self, rec):
+        """关掉这一行的浏览器 (还在启动的，启动完成后关掉)，并解除它和直播间的对应关系"""
+        self.opening.pop(rec.rid, None)
+        if rec.proc is not None:
+            self.browser_worker.close(rec.proc)
+            self.room_model.set_proc(rec, None)
+        self.room_model.unbind_room(rec)
+
+    def remove_room(self, rid):
+        rec = self.room_model.by_id.get(rid)
+        if rec is None: return
+        if rec.room_id: self.blacklisted_rooms.add(rec.room_id)
+        self.safe_kill(rec)
+        self.room_model.remove(rec)
 
     def clear_rooms(self):
-        for proc in self.pending_browsers.values():
-            try:
-                subprocess.call(['taskkill', '/F', '/T', '/PID', str(proc.pid)])
-            except:
-                pass
-        for r_id, info in self.room_map.items():
-            if info.get('browser_proc'):
-                try:
-                    subprocess.call(['taskkill', '/F', '/T', '/PID', str(info['browser_proc'].pid)])
-                except:
-                    pass
-            self.blacklisted_rooms.add(r_id)
-        self.pending_browsers.clear()
-        self.room_map.clear()
-        self.table_rooms.setRowCount(0)
-
-    def refresh_browser(self, row):
-        url_item = self.table_rooms.item(row, 2)
-        if not url_item: return
-        url = url_item.text()
-        if "http" not in url: return
-        self.safe_kill(row)
-        proc = self.open_headless_browser(url)
-        if proc:
-            self.pending_browsers[row] = proc
-            self.table_rooms.setItem(row, 6, QTableWidgetItem("刷新中..."))
+        self.opening.clear()
+        for rec in self.room_model.records:
+            if rec.proc is not None:
+                self.browser_worker.close(rec.proc)
+            if rec.room_id:
+                self.blacklisted_rooms.add(rec.room_id)
+        self.room_model.clear()
+
+    def refresh_browser(self, rid):
+        rec = self.room_model.by_id.get(rid)
+        if rec is None or "http" not in rec.url: return
+        self.safe_kill(rec)
+        self.open_browser(rec, "刷新中...", "刷新中...")
+
+    def ui_tick(self):
+        # 同进程模式的事件在这里从队列里取出来
+        if isinstance(self.worker, InProcessWorker):
+            for batch in self.worker.drain():
+                for data in batch:
+                    self.handle_data(data)
+        if self.table_details.model() is not self.detail_model:
+            # 正在看搜索结果，实时数据照常进模型，回到实时数据时再显示
+            self.detail_model.flush()
+            return
+        scroll = self.table_details.verticalScrollBar()
+        at_bottom = scroll.value() >= scroll.maximum()
+        # 用户往上翻看时不强制滚回底部
+        if self.detail_model.flush() and at_bottom:
+            self.table_details.scrollToBottom()
+
+    def run_search(self):
+        text = self.search_input.text().strip()
+        if not text:
+            return self.show_live()
+        if self.search_worker is None:
+            return
+        # "@昵称 关键词"：第一个 @ 开头的词是昵称
+        user = None
+        words = text.split()
+        if words[0].startswith('@') and len(words[0]) > 1:
+            user, text = words[0][1:], " ".join(words[1:])
+        days = SEARCH_RANGES[self.search_range.currentIndex()][1]
+        since = None
+        if days is not None:
+            today = time.localtime()
+            since = time.mktime((today.tm_year, today.tm_mon, today.tm_mday - days, 0, 0, 0, 0, 0, -1))
+        self.search_id += 1
+        self.group_data.setTitle("实时抓取数据 - 搜索中...")
+        self.search_worker.search(self.search_id, text, user, since)
+
+    def show_search_results(self, request_id, rows, elapsed, error):
+        # 只显示最新一次查询的结果，清空搜索框之后回来的结果也丢掉
+        if request_id != self.search_id or not self.search_input.text().strip():
+            return
+        if error:
+            self.group_data.setTitle("实时抓取数据 - 搜索失败")
+            self.handle_log('sys', f"❌ 搜索失败: {error}")
+            return
+        model = self.search_model
+        model.clear()
+        # 结果是新的在前，表格里按时间顺序从上往下
+        for row in reversed(rows):
+            model.append(row['room_id'], row.get('user', ''), DETAIL_LABELS['chat'], row.get('content', ''), row['ts'])
+        model.flush()
+        self.table_details.setModel(model)
+        more = "+" if len(rows) >= SEARCH_LIMIT else ""
+        self.group_data.setTitle(f"搜索结果 - {len(rows)}{more} 条 ({elapsed * 1000:.0f} ms)")
+
+    def show_live(self):
+        self.search_id += 1
+        if self.table_details.model() is not self.detail_model:
+            self.table_details.setModel(self.detail_model)
+            self.table_details.scrollToBottom()
+        self.group_data.setTitle("实时抓取数据")
 
     def handle_log(self, type, text):
         if self.filters.get(type, True): self.text_log.append(text)
 
+    def handle_stats(self, data):
+        # 后端开启了 DY_METRICS 时带有分阶段统计，每个周期一行摘要
+        summary = data.get('metrics')
+        if summary:
+            stages = summary.get('stages', {})
+            timing = " ".join(f"{label} {stages[key]['p99_us'] / 1000:.2f}"
+                              for key, label in STAGE_LABELS if key in stages)
+            errors = summary.get('errors', {})
+            line = (f"📊 {summary.get('fps', 0):.1f} 帧/s {summary.get('mps', 0):.0f} 条/s"
+                    f" | p99(ms) {timing or '-'} | 错误 {sum(errors.values())}")
+            if errors:
+                top = sorted(errors.items(), key=lambda kv: -kv[1])[:3]
+                line += " (" + ", ".join(f"{k} {v}" for k, v in top) + ")"
+            self.handle_log('sys', line)
+        store = data.get('store')
+        if store and store.get('dropped', 0) > self.store_dropped:
+            self.handle_log('sys', f"⚠️ 磁盘写入跟不上，事件库已丢弃 {store['dropped'] - self.store_dropped} 条")
+            self.store_dropped = store['dropped']
+        # 后端按 msgId 去掉的重复消息 (标签页重连、同一直播间开了多个标签页)，累计值
+        dedup = data.get('dedup_dropped', 0)
+        if dedup > self.dedup_dropped:
+            self.handle_log('sys', f"🔁 已去掉 {dedup - self.dedup_dropped} 条重复推送的消息")
+            self.dedup_dropped = dedup
+        # 后端背压队列的丢弃计数，只在确实丢了数据时提示
+        dropped = data.get('dropped') or {}
+        if not dropped: return
+        labels = dict(DETAIL_LABELS, room_user_seq="在线人数")
+        detail = " / ".join(f"{labels.get(k, k)} {v}" for k, v in sorted(dropped.items(), key=lambda kv: -kv[1]))
+        self.handle_log('sys', f"⚠️ 界面处理不过来，已丢弃 {detail} 条 "
+                               f"(队列峰值 {data.get('queue_peak', 0)}/{data.get('capacity', 0)})")
+
+    def handle_room_stats(self, data):
+        """后端每 DY_ROOM_STATS_MS 给每个活跃房间一条滑动窗口统计，代替界面自己数行"""
+        room_id = data.get('room_id')
+        windows = data.get('windows') or {}
+        rec = self.room_model.by_room.get(room_id)
+        if rec is None:
+            self.room_stats.pop(room_id, None)
+            return
+        self.room_stats[room_id] = windows
+        minute = windows.get('1m', {})
+        lines = []
+        for key, title in ROOM_STATS_WINDOWS:
+            w = windows.get(key, {})
+            lines.append(f"{title}: 弹幕 {w.get('chat_pm', 0):g}/分  礼物 {w.get('gift_pm', 0):g}/分  "
+                         f"发言 {w.get('chatters', 0)} 人")
+        top = windows.get(ROOM_STATS_WINDOWS[-1][0], {}).get('top')
+        if top:
+            lines.append("送礼榜: " + " · ".join(f"{user} {value}" for user, value in top))
+        if data.get('users_capped'):
+            lines.append("(发言人数超过上限，60 分钟的人数偏少)")
+        self.room_model.set_rates(rec, f"{minute.get('chat_pm', 0):g} / {minute.get('gift_pm', 0):g}", "\n".join(lines))
+        if room_id == self.card_room:
+            self.card_info.show_stats(windows)
+
+    def select_room(self, index):
+        """点选直播间列表里的一行：主播信息卡片切到这个房间"""
+        rec = self.room_model.records[index.row()]
+        if rec.room_id is None:
+            return
+        self.card_room = rec.room_id
+        self.card_info.lbl_name.setText(rec.name)
+        self.card_info.show_stats(self.room_stats.get(rec.room_id))
+
     def handle_data(self, data):
         room_id = data.get('room_id', 'UNKNOWN')
         msg_type = data.get('type')
+        if msg_type == 'stats': return self.handle_stats(data)
+        if msg_type == 'room_stats': return self.handle_room_stats(data)
         if room_id == 'UNKNOWN': return
         if room_id in self.blacklisted_rooms: return
 
-        if room_id not in self.room_map:
-            matched_row = -1
-            if self.pending_browsers:
-                matched_row = min(self.pending_browsers.keys())
-                proc = self.pending_browsers[matched_row]
-                del self.pending_browsers[matched_row]
-                self.room_map[room_id] = {'row': matched_row, 'browser_proc': proc}
-                self.table_rooms.setItem(matched_row, 2, QTableWidgetItem(f"ID:{room_id}"))
-                self.table_rooms.setItem(matched_row, 1, QTableWidgetItem(data.get('user', '获取中...')))
-                self.table_rooms.setItem(matched_row, 4, QTableWidgetItem("✅"))
+        model = self.room_model
+        rec = model.by_room.get(room_id)
+        web_rid = data.get('web_rid')
+        if web_rid:
+            owner = model.by_web_rid.get(web_rid)
+            if owner is not None and owner is not rec and owner.proc is not None:
+                # 这个房间就是 owner 的浏览器打开的；之前没对上而建的外部行并过来
+                count = 0
+                if rec is not None and rec.external:
+                    count = model.count_of(rec)
+                    model.remove(rec)
+                elif rec is not None:
+                    # 先前被别的浏览器认领错了：把它放回待认领
+                    model.unbind_room(rec)
+                    model.set_proc(rec, rec.proc)
+                    model.update(rec, title=rec.url, live="🕒", name="获取中...")
+                model.update(owner, title=f"ID:{room_id}", live="✅")
+                if "获取中" in owner.name or owner.name == "待连接":
+                    model.set_name(owner, data.get('user', '获取中...'))
+                model.bind_room(owner, room_id, count)
+                rec = owner
+        if rec is None:
+            name = data.get('user', '获取中...')
+            # 新出现的房间交给最早启动、还没对应上房间的浏览器；没有的话就是外部打开的
+            rec = model.claim_pending()
+            if rec is not None:
+                model.update(rec, title=f"ID:{room_id}", name=name, live="✅")
             else:
-                self.add_table_row(user=data.get('user', '获取中...'), room_id=room_id, is_external=True)
-                row = self.table_rooms.rowCount() - 1
-                self.room_map[room_id] = {'row': row, 'browser_proc': None}
-
-        if room_id in self.room_map:
-            row = self.room_map[room_id]['row']
-            if msg_type == 'anchor_info':
-                self.table_rooms.setItem(row, 1, QTableWidgetItem(data.get('user')))
-                douyin_id = data.get('douyin_id', '')
-                if douyin_id: self.table_rooms.setItem(row, 2, QTableWidgetItem(f"{douyin_id}"))
-                self.card_info.lbl_name.setText(data.get('user'))
-                self.card_info.lbl_id.setText(f"抖音号: {douyin_id}")
-            elif "获取中" in self.table_rooms.item(row, 1).text() and data.get('user'):
-                self.table_rooms.setItem(row, 1, QTableWidgetItem(f"<{data.get('user')}>"))
-
-            container = self.table_rooms.cellWidget(row, 5)
-            if container:
-                cb = container.findChild(QCheckBox)
-                if cb and not cb.isChecked(): return
-
-            if msg_type in ['chat', 'gift']:
-                cnt_item = self.table_rooms.item(row, 3)
-                if cnt_item: self.table_rooms.setItem(row, 3, QTableWidgetItem(str(int(cnt_item.text()) + 1)))
-
-        if msg_type not in ['discovery', 'anchor_info', 'heartbeat']:
+                rec = self.add_table_row(user=name, room_id=room_id, is_external=True)
+            model.bind_room(rec, room_id)
+
+        if msg_type == 'anchor_info':
+            model.set_name(rec, data.get('user'))
+            douyin_id = data.get('douyin_id', '')
+            if douyin_id: model.update(rec, title=f"{douyin_id}")
+            self.card_info.lbl_name.setText(data.get('user'))
+            self.card_info.lbl_id.setText(f"抖音号: {douyin_id}")
+            self.card_room = room_id
+            self.card_info.show_stats(self.room_stats.get(room_id))
+        elif "获取中" in rec.name and data.get('user'):
+            model.set_name(rec, f"<{data.get('user')}>")
+
+        if not rec.monitor: return
+
+        if msg_type in ['chat', 'gift']:
+            model.bump(rec)
+
+        if msg_type == 'alert':
+            # 后端关键词告警 (DY_KEYWORDS)：原弹幕照常显示，这里再加一行带命中词的，并写进系统日志
+            terms = "/".join(data.get('terms', ()))
+            self.handle_log('sys', f"🚨 [{rec.name}] {data.get('user', '')}: {data.get('content', '')} (命中 {terms})")
+            data = dict(data, content=f"[{terms}] {data.get('content', '')}")
+
+        if msg_type in DETAIL_LABELS:
             user = data.get('user', '')
             content = data.get('content',
-                               '') if msg_type == 'chat' else f"送 {data.get('gift_name')} x{data.get('count')}"
-            d_row = self.table_details.rowCount()
-            self.table_details.insertRow(d_row)
-            self.table_details.setItem(d_row, 0, QTableWidgetItem(str(room_id)))
-            self.table_details.setItem(d_row, 1, QTableWidgetItem(user))
-            self.table_details.setItem(d_row, 2, QTableWidgetItem("弹幕" if msg_type == 'chat' else "礼物"))
-            self.table_details.setItem(d_row, 3, QTableWidgetItem(content))
-            self.table_details.setItem(d_row, 4, QTableWidgetItem(datetime.datetime.now().strftime('%H:%M:%S')))
-            if d_row > 200: self.table_details.removeRow(0)
-            self.table_details.scrollToBottom()
+                               '') if msg_type != 'gift' else f"送 {data.get('gift_name')} x{data.get('count')}"
+            self.detail_model.append(str(room_id), user, DETAIL_LABELS[msg_type], content)
 
     def closeEvent(self, event):
         try:
@@ -614,12 +1094,17 @@ class MainWindow(QMainWindow):
         except:
             pass
         self.clear_rooms()
+        self.browser_worker.stop()
         if self.worker:
             self.worker.stop()
+        if self.search_worker:
+            self.search_worker.stop()
         event.accept()
 
 
 def emergency_restore():
+    if sys.platform != 'win32':
+        return
     try:
         pm = SystemProxy()
         pm.unset_proxy()
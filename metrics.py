@@ -0,0 +1,248 @@
+"""
+后端的分阶段耗时/吞吐统计 (DY_METRICS=1 时开启，默认关闭，关闭时各处只多一次 None 判断)
+
+  阶段耗时 : 按 2 的幂 (微秒) 分桶的直方图，记录一次只是一次 bit_length 和一次加法
+             frame_parse / decompress / response_parse / message (单条业务消息) /
+             pool (交给解码池到结果回来) / encode (JSON/msgpack 编码一批事件) /
+             write (编码 + 写出一批事件，含 encode) / enqueue (放进背压队列) /
+             keywords (关键词告警扫描一帧的事件) / analytics (房间统计计数一帧的事件)
+  计数     : 每种 method 的消息数、每个 阶段:异常类型 的错误数 (原来 except: pass 吞掉的)、每个房间的帧数
+
+stats_summary() 给出上次调用以来的增量 (帧/秒、各阶段 p50/p99、错误数)，随 stats 事件发给界面；
+DY_METRICS_PORT 非 0 时在 127.0.0.1 上开一个 HTTP 端口：/metrics 为 Prometheus 文本格式，/ 为 JSON。
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 直方图桶：第 i 个桶是 [2^(i-1), 2^i) 微秒，最后一个桶收下所有更大的值 (约 67 秒以上)
+BUCKETS = 27
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        i = us.bit_length()
+        self.counts[i if i < BUCKETS else BUCKETS - 1] += 1
+        self.total += seconds
+        self.count += 1
+
+    def copy(self):
+        h = Histogram()
+        h.counts = list(self.counts)
+        h.total = self.total
+        h.count = self.count
+        return h
+
+    def minus(self, other):
+        """两次快照之间的增量"""
+        h = Histogram()
+        h.counts = [a - b for a, b in zip(self.counts, other.counts)]
+        h.total = self.total - other.total
+        h.count = self.count - other.count
+        return h
+
+    def quantile(self, q):
+        """分位数的估计值 (秒)：落在哪个桶就取该桶的上界"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return (1 << i) / 1e6
+        return (1 << (BUCKETS - 1)) / 1e6
+
+
+class Samples:
+    """
+    进程池 worker 里用的记录器：接口和 Metrics 一样，只是把记录攒成列表，
+    随解码结果一起传回主进程，由 Metrics.merge() 合并。
+    """
+    __slots__ = ("stages", "methods", "errors")
+
+    def __init__(self):
+        self.stages = []
+        self.methods = []
+        self.errors = []
+
+    def stage(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def method(self, name):
+        self.methods.append(name)
+
+    def error(self, stage, exc):
+        self.errors.append(f"{stage}:{type(exc).__name__}")
+
+
+class Metrics:
+    """线程安全：解码池的各线程、事件循环和写出线程都会往里记"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.methods = Counter()
+        self.errors = Counter()
+        self.room_frames = Counter()
+        self.frames = 0
+        self.started = time.monotonic()
+        # stats_summary() 上次调用时的快照
+        self.last = None
+        self.last_ts = self.started
+        self.server = None
+
+    # --- 记录 ---
+    def stage(self, name, seconds):
+        with self.lock:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = Histogram()
+            hist.record(seconds)
+
+    def method(self, name):
+        with self.lock:
+            self.methods[name] += 1
+
+    def error(self, stage, exc):
+        with self.lock:
+            self.errors[f"{stage}:{type(exc).__name__}"] += 1
+
+    def frame(self, room_id):
+        with self.lock:
+            self.room_frames[room_id] += 1
+            self.frames += 1
+
+    def merge(self, samples):
+        with self.lock:
+            for name, seconds in samples.stages:
+                hist = self.stages.get(name)
+                if hist is None:
+                    hist = self.stages[name] = Histogram()
+                hist.record(seconds)
+            self.methods.update(samples.methods)
+            self.errors.update(samples.errors)
+
+    def retain_rooms(self, room_ids):
+        """只保留仍在直播间表里的房间的计数，避免已淘汰的房间无限累积"""
+        with self.lock:
+            for room_id in [r for r in self.room_frames if r not in room_ids]:
+                del self.room_frames[room_id]
+
+    # --- 读取 ---
+    def snapshot(self):
+        with self.lock:
+            return {
+                "stages": {name: h.copy() for name, h in self.stages.items()},
+                "methods": Counter(self.methods),
+                "errors": Counter(self.errors),
+                "room_frames": Counter(self.room_frames),
+                "frames": self.frames,
+            }
+
+    def stats_summary(self, top_rooms=5):
+        """上次调用以来的增量，放进 stats 事件的 metrics 字段 (结构紧凑，只含数字)"""
+        now = time.monotonic()
+        snap = self.snapshot()
+        last = self.last
+        elapsed = max(1e-9, now - self.last_ts)
+        self.last, self.last_ts = snap, now
+
+        stages = {}
+        for name, hist in snap["stages"].items():
+            if last and name in last["stages"]:
+                hist = hist.minus(last["stages"][name])
+            if hist.count:
+                stages[name] = {"n": hist.count, "mean_us": round(hist.total / hist.count * 1e6, 1),
+                                "p50_us": round(hist.quantile(0.5) * 1e6), "p99_us": round(hist.quantile(0.99) * 1e6)}
+        methods = snap["methods"] - last["methods"] if last else snap["methods"]
+        errors = snap["errors"] - last["errors"] if last else snap["errors"]
+        rooms = snap["room_frames"] - last["room_frames"] if last else snap["room_frames"]
+        frames = snap["frames"] - (last["frames"] if last else 0)
+        return {
+            "interval": round(elapsed, 2),
+            "fps": round(frames / elapsed, 1),
+            "mps": round(sum(methods.values()) / elapsed, 1),
+            "stages": stages,
+            "methods": dict(methods),
+            "errors": dict(errors),
+            "rooms_fps": {room_id: round(n / elapsed, 1) for room_id, n in rooms.most_common(top_rooms)},
+        }
+
+    def prometheus(self):
+        snap = self.snapshot()
+        lines = ["# TYPE dy_stage_seconds histogram"]
+        for name, hist in sorted(snap["stages"].items()):
+            cumulative = 0
+            for i, n in enumerate(hist.counts[:-1]):
+                cumulative += n
+                lines.append(f'dy_stage_seconds_bucket{{stage="{name}",le="{(1 << i) / 1e6:g}"}} {cumulative}')
+            lines.append(f'dy_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {hist.count}')
+            lines.append(f'dy_stage_seconds_sum{{stage="{name}"}} {hist.total:.6f}')
+            lines.append(f'dy_stage_seconds_count{{stage="{name}"}} {hist.count}')
+        lines.append("# TYPE dy_messages_total counter")
+        for method, n in sorted(snap["methods"].items()):
+            lines.append(f'dy_messages_total{{method="{method}"}} {n}')
+        lines.append("# TYPE dy_errors_total counter")
+        for key, n in sorted(snap["errors"].items()):
+            stage, _, error = key.partition(":")
+            lines.append(f'dy_errors_total{{stage="{stage}",error="{error}"}} {n}')
+        lines.append("# TYPE dy_frames_total counter")
+        lines.append(f"dy_frames_total {snap['frames']}")
+        for room_id, n in snap["room_frames"].most_common(50):
+            lines.append(f'dy_room_frames_total{{room_id="{room_id}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def as_json(self):
+        snap = self.snapshot()
+        return {
+            "uptime": round(time.monotonic() - self.started, 1),
+            "frames": snap["frames"],
+            "stages": {name: {"count": h.count, "sum": h.total, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                       for name, h in snap["stages"].items()},
+            "methods": dict(snap["methods"]),
+            "errors": dict(snap["errors"]),
+            "room_frames": dict(snap["room_frames"].most_common(50)),
+        }
+
+    # --- HTTP ---
+    def serve(self, port, host="127.0.0.1"):
+        """在后台线程里开 HTTP 端口，返回实际端口 (port=0 时随机)"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body, ctype = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    body = json.dumps(metrics.as_json(), ensure_ascii=False).encode("utf-8")
+                    ctype = "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="dy-metrics-http", daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
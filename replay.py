@@ -0,0 +1,148 @@
+"""
+离线回放 .dycap 抓包文件 (DY_CAPTURE 录下的原始 PushFrame)
+
+不需要网络和直播间：按记录里的接收时间把帧依次交给 DouyinBackend.websocket_message，
+走和线上完全相同的解码池/去重/攒批/背压路径，最后报告吞吐和各类事件数。
+
+    python replay.py captures/                 # 按原速回放
+    python replay.py captures/ --speed 10      # 10 倍速
+    python replay.py captures/ --speed 0       # 尽快回放 (吞吐测试)
+    python replay.py captures/ --speed 0 --loops 5 --workers 4 --pool process
+
+默认只统计事件数；--emit 时把事件按 DY_DATA:: 文本行输出到 stdout。
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import addon_backend
+import capture
+import transport
+
+
+class CountingWriter:
+    """只按类型计数，不输出"""
+    kind = "count"
+
+    def __init__(self):
+        self.types = Counter()
+
+    def write_batch(self, packs):
+        types = self.types
+        for p in packs:
+            types[p.get("type")] += 1
+
+    def close(self):
+        pass
+
+
+class TeeWriter(CountingWriter):
+    """计数的同时写给另一个 writer"""
+
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def write_batch(self, packs):
+        super().write_batch(packs)
+        self.writer.write_batch(packs)
+
+    def close(self):
+        self.writer.close()
+
+
+def replay_flow(room_id):
+    """回放用的 flow，只有 DouyinBackend 会访问到的属性"""
+    query = f"?room_id={room_id}" if room_id != "UNKNOWN" else ""
+    return SimpleNamespace(
+        id=f"replay-{room_id}",
+        request=SimpleNamespace(url=f"wss://webcast-replay/webcast/im/push/v2/{query}"),
+        websocket=SimpleNamespace(messages=[]),
+    )
+
+
+async def replay(backend, path, speed=1.0, loops=1):
+    """
+    把抓包文件里的帧按 speed 倍速交给 backend (speed <= 0 表示不等待)。
+    返回 (帧数, 字节数, 最大落后于时间表的秒数)。
+    """
+    backend.running()
+    flows = {}
+    frames = size = 0
+    behind = 0.0
+    for _ in range(loops):
+        start_ts = start = None
+        for ts, room_id, frame in capture.iter_capture(path):
+            if speed > 0:
+                if start_ts is None:
+                    start_ts, start = ts, time.perf_counter()
+                delay = (ts - start_ts) / speed - (time.perf_counter() - start)
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+                elif -delay > behind:
+                    behind = -delay
+            elif frames % 64 == 0:
+                # 尽快回放时也要定期让出事件循环，解码池的结果和攒批定时器才能执行
+                await asyncio.sleep(0)
+            flow = flows.get(room_id)
+            if flow is None:
+                flow = flows[room_id] = replay_flow(room_id)
+            flow.websocket.messages.append(SimpleNamespace(from_client=False, content=frame, dropped=False))
+            backend.websocket_message(flow)
+            frames += 1
+            size += len(frame)
+    if backend.decode_pool:
+        # 趁事件循环还在跑等解码池处理完：deliver 用 call_soon_threadsafe 切回 loop 的结果不会随 loop 关闭丢掉
+        await asyncio.get_running_loop().run_in_executor(None, backend.decode_pool.close)
+    return frames, size, behind
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help=".dycap 文件或抓包目录")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示尽快")
+    parser.add_argument("--loops", type=int, default=1, help="重复回放次数 (重复时 msgId 会被去重，可配合 --dedup off)")
+    parser.add_argument("--workers", type=int, default=addon_backend.DECODE_WORKERS, help="解码池分片数")
+    parser.add_argument("--pool", default=addon_backend.DECODE_POOL, choices=("thread", "process"))
+    parser.add_argument("--filters", default=",".join(addon_backend.FILTERS), help="抓取开关，逗号分隔")
+    parser.add_argument("--dedup", default=addon_backend.DEDUP, choices=("exact", "bloom", "off"))
+    parser.add_argument("--shed-policy", default=addon_backend.SHED_POLICY, choices=("sample", "drop_oldest", "block"))
+    parser.add_argument("--emit", action="store_true", help="把事件以 DY_DATA:: 行输出到 stdout")
+    args = parser.parse_args()
+
+    writer = TeeWriter(transport.TextWriter()) if args.emit else CountingWriter()
+    # 构造时的提示信息不混进 --emit 的输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend = addon_backend.DouyinBackend(writer=writer, decode_workers=args.workers, decode_pool=args.pool,
+                                              filters=args.filters.split(","), control="", dedup=args.dedup,
+                                              shed_policy=args.shed_policy, capture_dir="",
+                                              # 回放的帧不进事件库、不触发关键词告警和房间统计
+                                              store_dir="", keywords="", room_stats_ms=0)
+    log = sys.stderr if args.emit else sys.stdout
+
+    t0 = time.perf_counter()
+    try:
+        frames, size, behind = asyncio.run(replay(backend, args.path, args.speed, args.loops))
+    finally:
+        # 解码池已在 replay() 里排空，这里等背压队列写完再计时
+        backend.done()
+    elapsed = time.perf_counter() - t0
+
+    events = sum(n for kind, n in writer.types.items() if kind != "stats")
+    print(f"frames={frames} ({size / 1e6:.1f} MB) events={events} elapsed={elapsed:.2f}s "
+          f"speed={'max' if args.speed <= 0 else args.speed}", file=log)
+    print(f"{frames / elapsed:,.0f} frames/s  {events / elapsed:,.0f} events/s  {size / 1e6 / elapsed:.1f} MB/s", file=log)
+    if args.speed > 0:
+        print(f"最大落后于原始时间表: {behind * 1e3:.1f} ms", file=log)
+    print("  ".join(f"{kind}={n}" for kind, n in writer.types.most_common()), file=log)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,97 @@
+"""
+后端的直播间表：带 TTL 和 LRU 容量上限
+
+取代原来每 600 秒整体 clear() 一次的 discovered_rooms 集合：
+条目按最近活跃时间排序，只淘汰超过 ttl 没有新帧的房间 (每次最多检查几个，增量进行)，
+超出容量时淘汰最久未活跃的房间。活跃房间不会因为定时清空而重复上报 discovery。
+"""
+import time
+from collections import OrderedDict
+
+
+class RoomState:
+    __slots__ = ("room_id", "first_seen", "last_seen", "frames", "bytes", "anchor")
+
+    def __init__(self, room_id, now):
+        self.room_id = room_id
+        self.first_seen = now
+        self.last_seen = now
+        self.frames = 0
+        self.bytes = 0
+        # enter_room 拿到的主播信息 (user / douyin_id)
+        self.anchor = None
+
+
+class RoomRegistry:
+    def __init__(self, ttl=600, capacity=1000, clock=time.monotonic, on_remove=None):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.clock = clock
+        # 房间因过期或超出容量被淘汰时以 room_id 调用 (比如清掉去重窗口)
+        self.on_remove = on_remove
+        # room_id -> RoomState，越靠后越活跃
+        self.rooms = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def __contains__(self, room_id):
+        return room_id in self.rooms
+
+    def get(self, room_id):
+        return self.rooms.get(room_id)
+
+    def touch(self, room_id, nbytes=0):
+        """记录一帧，返回 (RoomState, 是否是这个房间在表里的第一帧)"""
+        now = self.clock()
+        state = self.rooms.get(room_id)
+        if state is None:
+            state = self._add(room_id, now)
+        else:
+            self.rooms.move_to_end(room_id)
+        is_new = state.frames == 0
+        state.last_seen = now
+        state.frames += 1
+        state.bytes += nbytes
+        self.expire(now)
+        return state, is_new
+
+    def set_anchor(self, room_id, anchor):
+        """enter_room 通常早于 WebSocket 建立，这时先建条目 (不计入帧数)"""
+        now = self.clock()
+        state = self.rooms.get(room_id)
+        if state is None:
+            state = self._add(room_id, now)
+        else:
+            self.rooms.move_to_end(room_id)
+        state.last_seen = now
+        state.anchor = anchor
+        return state
+
+    def _add(self, room_id, now):
+        state = self.rooms[room_id] = RoomState(room_id, now)
+        while len(self.rooms) > self.capacity:
+            old, _ = self.rooms.popitem(last=False)
+            self.evicted += 1
+            if self.on_remove is not None:
+                self.on_remove(old)
+        return state
+
+    def expire(self, now=None, limit=8):
+        """从最旧的一端淘汰过期房间，每次最多 limit 个，均摊到每一帧上"""
+        if now is None:
+            now = self.clock()
+        deadline = now - self.ttl
+        rooms = self.rooms
+        for _ in range(limit):
+            if not rooms:
+                break
+            state = next(iter(rooms.values()))
+            if state.last_seen >= deadline:
+                break
+            rooms.popitem(last=False)
+            self.expired += 1
+            if self.on_remove is not None:
+                self.on_remove(state.room_id)
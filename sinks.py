@@ -0,0 +1,385 @@
+"""
+无界面采集 (collector.py) 的事件输出端
+
+每个 sink 和 transport 里的 writer 接口相同 (write_batch / close)，由后端背压队列的写出线程调用，
+一批事件只做一次编码和一次写入：
+
+  jsonl   : 按大小轮转的 JSON Lines 文件，每行一条事件
+  socket  : 本机 TCP 端口或 Unix socket，下游程序连上来后收到 JSON 行 (或 msgpack 长度前缀帧)，
+            没有订阅者时事件直接丢掉；某个订阅者读得太慢 (发送超时) 就把它断开，不拖住其他 sink
+  store   : SQLite 事件库 (event_store.EventStore)，可以按房间/时间/关键词查询
+  parquet : 列式文件 (需要 pyarrow)，常用字段各占一列，其余字段合成 JSON 放进 extra 列；
+            攒够 row_group 行或 flush_interval 秒写一个行组，每 file_seconds 秒换一个文件
+            (Parquet 的文件尾在关闭时才写，进程被强杀时只丢当前这个文件)
+
+用 open_sink("jsonl:events/") 这样的描述串创建，见 open_sink 的说明。
+SinkSet 把一批事件依次交给所有 sink，分别统计事件数、耗时和错误，供采集进程定期报告每个 sink 的事件/秒。
+有缓冲的 sink (jsonl / parquet) 另有 tick()：采集进程每秒调用一次 SinkSet.tick()，
+房间没有新事件时缓冲里的数据也会在 flush_interval 秒内写出去。
+"""
+import json
+import os
+import socket
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+import transport
+from event_store import EventStore
+
+
+# === 1. JSON Lines ===
+class JsonlSink:
+    """在 directory 下按 events-<启动时间>-<序号>.jsonl 顺序写，写满 max_bytes 换文件，最多保留 keep 个 (0 = 不删)"""
+    kind = "jsonl"
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, keep=0, flush_interval=1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self.prefix = time.strftime("events-%Y%m%d-%H%M%S")
+        self.index = 0
+        self.files = []
+        self.file = None
+        self.size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.index += 1
+        path = os.path.join(self.directory, f"{self.prefix}-{self.index:03d}.jsonl")
+        self.file = open(path, "wb", buffering=1024 * 1024)
+        self.size = 0
+        self.files.append(path)
+        while self.keep > 0 and len(self.files) > self.keep:
+            try:
+                os.remove(self.files.pop(0))
+            except OSError:
+                pass
+
+    def write_batch(self, packs):
+        if not packs:
+            return
+        data = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in packs).encode("utf-8")
+        if self.size and self.size + len(data) > self.max_bytes:
+            self.file.close()
+            self._open()
+        self.file.write(data)
+        self.size += len(data)
+        self.tick()
+
+    def tick(self):
+        now = time.monotonic()
+        if self.file and now - self.last_flush >= self.flush_interval:
+            self.last_flush = now
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+# === 2. 本机 socket ===
+class SocketSink:
+    """
+    监听 address 等下游连接 (可以同时有多个)：("127.0.0.1", 9000) 为 TCP，字符串为 Unix socket 路径。
+    fmt = json (每行一条事件，nc 就能看) 或 msgpack (和 binary 事件通道相同的长度前缀帧，一帧一批)。
+    """
+    kind = "socket"
+
+    def __init__(self, address, fmt="json", send_timeout=2.0):
+        if fmt == "msgpack" and msgpack is None:
+            raise RuntimeError("未安装 msgpack")
+        self.fmt = fmt
+        self.send_timeout = send_timeout
+        self.clients = []
+        self.lock = threading.Lock()
+        self.dropped_clients = 0
+        self.unix = isinstance(address, str)
+        if self.unix:
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen(8)
+        self.address = self.server.getsockname()
+        self.closed = False
+        threading.Thread(target=self._accept, name="dy-sink-accept", daemon=True).start()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            conn.settimeout(self.send_timeout)
+            if not self.unix:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.clients.append(conn)
+
+    def write_batch(self, packs):
+        if not packs or not self.clients:
+            return
+        if self.fmt == "msgpack":
+            data = transport.encode_batch(packs)
+        else:
+            data = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in packs).encode("utf-8")
+        with self.lock:
+            clients = list(self.clients)
+        for conn in clients:
+            try:
+                conn.sendall(data)
+            except OSError:
+                # 断开或发送超时 (读得太慢)
+                self._drop(conn)
+
+    def _drop(self, conn):
+        with self.lock:
+            if conn in self.clients:
+                self.clients.remove(conn)
+                self.dropped_clients += 1
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def close(self):
+        self.closed = True
+        try:
+            self.server.close()
+        except OSError:
+            pass
+        for conn in list(self.clients):
+            self._drop(conn)
+        if self.unix:
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+
+
+# === 3. 列式文件 (Parquet) ===
+# 单独成列的字段；其他字段 (不同事件类型各不相同) 合成 JSON 放进 extra 列
+PARQUET_COLUMNS = (
+    ("type", "string"), ("room_id", "string"), ("user", "string"), ("content", "string"),
+    ("gift_name", "string"), ("count", "int64"), ("total", "int64"), ("online", "int64"),
+    ("total_user", "int64"), ("member_count", "int64"), ("time", "string"),
+)
+
+
+class ParquetSink:
+    """在 directory 下按 events-<启动时间>-<序号>.parquet 写，每 file_seconds 秒换一个文件"""
+    kind = "parquet"
+
+    def __init__(self, directory, row_group=50_000, flush_interval=5.0, file_seconds=300, compression="zstd"):
+        if pyarrow is None:
+            raise RuntimeError("未安装 pyarrow")
+        self.directory = directory
+        self.row_group = row_group
+        self.flush_interval = flush_interval
+        self.file_seconds = file_seconds
+        self.compression = compression
+        self.schema = pyarrow.schema([("ts", pyarrow.float64())]
+                                     + [(name, getattr(pyarrow, kind)()) for name, kind in PARQUET_COLUMNS]
+                                     + [("extra", pyarrow.string())])
+        self.known = frozenset(name for name, _ in PARQUET_COLUMNS)
+        self.prefix = time.strftime("events-%Y%m%d-%H%M%S")
+        self.index = 0
+        self.writer = None
+        self.opened_at = 0.0
+        self.rows = []
+        self.ts = []
+        self.first_ts = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def write_batch(self, packs):
+        if not packs:
+            return
+        now = time.time()
+        if not self.rows:
+            self.first_ts = time.monotonic()
+        self.rows.extend(packs)
+        self.ts.extend([now] * len(packs))
+        if len(self.rows) >= self.row_group:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self):
+        """最早的一行已经攒了 flush_interval 秒就写一个行组"""
+        if self.rows and time.monotonic() - self.first_ts >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        rows, ts = self.rows, self.ts
+        self.rows, self.ts = [], []
+        columns = [pyarrow.array(ts, pyarrow.float64())]
+        for name, kind in PARQUET_COLUMNS:
+            values = [p.get(name) for p in rows]
+            if kind == "string":
+                values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+            else:
+                values = [v if v is None or isinstance(v, int) else _to_int(v) for v in values]
+            columns.append(pyarrow.array(values, getattr(pyarrow, kind)()))
+        extras = []
+        for p in rows:
+            extra = {k: v for k, v in p.items() if k not in self.known}
+            extras.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        columns.append(pyarrow.array(extras, pyarrow.string()))
+        table = pyarrow.Table.from_arrays(columns, schema=self.schema)
+
+        now = time.monotonic()
+        if self.writer is not None and now - self.opened_at >= self.file_seconds:
+            self.writer.close()
+            self.writer = None
+        if self.writer is None:
+            self.index += 1
+            path = os.path.join(self.directory, f"{self.prefix}-{self.index:03d}.parquet")
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=self.compression)
+            self.opened_at = now
+        self.writer.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# === 4. 创建与汇总 ===
+def open_sink(spec, max_mb=256):
+    """
+    按描述串创建 sink：
+      jsonl:<目录>                  (单个文件写满 max_mb 后换新文件)
+      socket:<端口>                 socket:<主机>:<端口>     (JSON 行)
+      msgpack:<端口>                msgpack:<主机>:<端口>    (长度前缀 msgpack 帧)
+      unix:<路径>                   (Unix socket，JSON 行)
+      parquet:<目录>
+      store:<目录>                  (SQLite 事件库，见 event_store.py)
+    """
+    kind, _, arg = spec.partition(":")
+    if not arg:
+        raise ValueError(f"sink 缺少参数: {spec}")
+    if kind == "jsonl":
+        return JsonlSink(arg, max_bytes=max_mb * 1024 * 1024)
+    if kind in ("socket", "msgpack"):
+        host, _, port = arg.rpartition(":")
+        return SocketSink((host or "127.0.0.1", int(port)), fmt="json" if kind == "socket" else "msgpack")
+    if kind == "unix":
+        return SocketSink(arg)
+    if kind == "parquet":
+        return ParquetSink(arg)
+    if kind == "store":
+        return EventStore(arg)
+    raise ValueError(f"不认识的 sink: {spec}")
+
+
+class SinkStats:
+    __slots__ = ("events", "batches", "busy", "errors", "last_error")
+
+    def __init__(self):
+        self.events = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.errors = 0
+        self.last_error = ""
+
+
+class SinkSet:
+    """
+    把每批事件交给全部 sink (作为 DouyinBackend 的 writer)。
+    stats 事件不写进 sink，交给 on_stats 回调 (采集进程用来打日志)；
+    某个 sink 出错只记数，不影响其他 sink。
+    """
+    kind = "sinks"
+
+    def __init__(self, sinks, on_stats=None):
+        self.sinks = list(sinks)
+        self.on_stats = on_stats
+        self.stats = [SinkStats() for _ in self.sinks]
+        self.lock = threading.Lock()
+        self.last = None
+        self.last_ts = time.monotonic()
+
+    def write_batch(self, packs):
+        if not packs:
+            return
+        if any(p.get("type") == "stats" for p in packs):
+            if self.on_stats:
+                for p in packs:
+                    if p.get("type") == "stats":
+                        self.on_stats(p)
+            packs = [p for p in packs if p.get("type") != "stats"]
+            if not packs:
+                return
+        with self.lock:
+            for sink, st in zip(self.sinks, self.stats):
+                t = time.perf_counter()
+                try:
+                    sink.write_batch(packs)
+                    st.events += len(packs)
+                except Exception as e:
+                    st.errors += 1
+                    st.last_error = f"{type(e).__name__}: {e}"
+                st.batches += 1
+                st.busy += time.perf_counter() - t
+
+    def tick(self):
+        """定时调用：让有缓冲的 sink 把攒了太久的数据写出去 (和 write_batch 串行，出错同样只记数)"""
+        with self.lock:
+            for sink, st in zip(self.sinks, self.stats):
+                tick = getattr(sink, "tick", None)
+                if tick is None:
+                    continue
+                t = time.perf_counter()
+                try:
+                    tick()
+                except Exception as e:
+                    st.errors += 1
+                    st.last_error = f"{type(e).__name__}: {e}"
+                st.busy += time.perf_counter() - t
+
+    def report(self):
+        """上次调用以来每个 sink 的 [(名称, 事件/秒, 写入耗时占比, 累计错误数, 最近的错误)]"""
+        now = time.monotonic()
+        with self.lock:
+            snap = [(st.events, st.busy) for st in self.stats]
+        last = self.last or [(0, 0.0)] * len(snap)
+        elapsed = max(1e-9, now - self.last_ts)
+        self.last, self.last_ts = snap, now
+        return [(sink.kind, (events - last_events) / elapsed, (busy - last_busy) / elapsed, st.errors, st.last_error)
+                for sink, st, (events, busy), (last_events, last_busy) in zip(self.sinks, self.stats, snap, last)]
+
+    def close(self):
+        with self.lock:
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except Exception as e:
+                    print(f">>> 关闭 {sink.kind} 输出失败: {e}")
@@ -0,0 +1,138 @@
+"""
+wire_decode.FieldExtractor 和 dy_pb2 完整解析 (FullExtractor) 的一致性
+
+    python -m pytest tests
+    PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=python python -m pytest tests
+"""
+import random
+
+import pytest
+
+import decoder
+import dy_pb2 as dy
+import wire_decode
+
+# 未知字段 (varint / fixed64 / fixed32 / 长度前缀)
+UNKNOWN = b"\xf8\x06\x96\x01" + b"\xf9\x06" + b"\x00" * 8 + b"\xfd\x06" + b"\x00" * 4 + b"\xfa\x06\x03abc"
+
+
+def _user(rnd):
+    u = dy.User(id=rnd.getrandbits(63), nickName=f"用户{rnd.randrange(100000)}", level=rnd.randint(1, 60))
+    for img in (u.avatarThumb, u.avatarMedium, u.avatarLarge):
+        img.urlList.extend(f"https://p3.douyinpic.com/{i}.jpeg" for i in range(3))
+    return u
+
+
+def _random(rnd, method):
+    cls = decoder.DECODERS[method].full.message_class
+    m = cls()
+    m.common.createTime = rnd.getrandbits(rnd.choice((8, 32, 64)))
+    m.common.msgId = rnd.getrandbits(63)
+    if "user" in cls.DESCRIPTOR.fields_by_name and rnd.random() < 0.9:
+        m.user.CopyFrom(_user(rnd))
+    if cls is dy.ChatMessage:
+        m.content = "".join(chr(rnd.randint(0x4e00, 0x9fa5)) for _ in range(rnd.randint(0, 40)))
+    elif cls is dy.GiftMessage:
+        m.comboCount = rnd.getrandbits(rnd.choice((1, 16, 64)))
+        m.gift.name = "嘉年华"
+        m.toUser.nickName = "主播 (不应该被取到)"
+    elif cls is dy.MemberMessage:
+        m.memberCount = rnd.getrandbits(20)
+    elif cls is dy.LikeMessage:
+        m.count, m.total = rnd.randint(1, 20), rnd.getrandbits(40)
+    elif cls is dy.SocialMessage:
+        m.action = rnd.randint(1, 3)
+    elif cls is dy.RoomUserSeqMessage:
+        m.total, m.totalUser = rnd.getrandbits(20), rnd.getrandbits(30)
+    return m.SerializeToString()
+
+
+def _chat_edges():
+    full = dy.ChatMessage(content="🎉" * 50)
+    full.user.nickName = "😀 emoji ünïcödé 昵称"
+    full.common.createTime = 2 ** 64 - 1
+    first = dy.ChatMessage(content="第一条")
+    first.user.nickName = "先来的"
+    first.common.createTime = 1
+    second = dy.ChatMessage(content="第二条")
+    second.common.createTime = 2
+    nick_only = dy.ChatMessage()
+    nick_only.user.nickName = "后来的"
+    parts = [dy.ChatMessage(content="乱序"), dy.ChatMessage(), dy.ChatMessage()]
+    parts[1].user.nickName = "乱序用户"
+    parts[2].common.createTime = 42
+    return [
+        b"",
+        dy.ChatMessage(content="只有内容，没有用户和 common").SerializeToString(),
+        full.SerializeToString(),
+        UNKNOWN + full.SerializeToString() + UNKNOWN,
+        b"".join(p.SerializeToString() for p in parts),
+        # 同一字段出现两次：标量后者覆盖，子消息合并 (second 没有 user，first 的昵称要保留)
+        first.SerializeToString() + second.SerializeToString(),
+        first.SerializeToString() + nick_only.SerializeToString(),
+        second.SerializeToString() + UNKNOWN + first.SerializeToString(),
+    ]
+
+
+def _gift_edges():
+    g = dy.GiftMessage(comboCount=2 ** 63)
+    g.user.nickName = "大哥"
+    g.toUser.nickName = "主播 (不应该被取到)"
+    again = dy.GiftMessage(comboCount=0)
+    again.gift.name = "小心心"
+    return [b"", dy.GiftMessage(comboCount=0).SerializeToString(), g.SerializeToString(),
+            g.SerializeToString() + again.SerializeToString()]
+
+
+CASES = [(m, buf) for m in decoder.DECODERS for buf in (_random(random.Random(i), m) for i in range(50))]
+CASES += [("WebcastChatMessage", buf) for buf in _chat_edges()]
+CASES += [("WebcastGiftMessage", buf) for buf in _gift_edges()]
+
+
+def _extractors(method):
+    d = decoder.DECODERS[method]
+    return wire_decode.FieldExtractor(d.full.message_class, d.paths), d.full
+
+
+@pytest.mark.parametrize("method,buf", CASES)
+def test_field_extractor_matches_full_parse(method, buf):
+    wire, full = _extractors(method)
+    assert wire.extract(buf) == full.extract(buf)
+
+
+@pytest.mark.parametrize("method,buf", CASES)
+def test_truncated_input_raises_or_matches(method, buf):
+    wire, full = _extractors(method)
+    for cut in range(1, len(buf)):
+        try:
+            expected = full.extract(buf[:cut])
+        except Exception:
+            expected = None
+        try:
+            got = wire.extract(buf[:cut])
+        except Exception:
+            continue
+        # 完整解析也接受的前缀必须给出同样的结果；完整解析拒绝的前缀快速路径也不能接受
+        assert got == expected, cut
+
+
+def test_decoder_output_independent_of_backend_path():
+    for method, buf in CASES:
+        d = decoder.DECODERS[method]
+        assert d.decode(buf, "1") == d.build(d.full.extract(buf), "1")
+
+
+def test_make_extractor_only_for_pure_python_protobuf():
+    paths = decoder.DECODERS["WebcastChatMessage"].paths
+    extractor = wire_decode.make_extractor(dy.ChatMessage, paths)
+    if wire_decode.api_implementation.Type() == "python":
+        assert isinstance(extractor, wire_decode.FieldExtractor)
+    else:
+        assert extractor is None
+
+
+def test_unsupported_paths_rejected():
+    with pytest.raises(ValueError):
+        wire_decode.FieldExtractor(dy.ChatMessage, {"urls": "user.avatarThumb.urlList"})
+    with pytest.raises(ValueError):
+        wire_decode.FieldExtractor(dy.ChatMessage, {"user": "user"})
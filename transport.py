@@ -0,0 +1,318 @@
+"""
+后端 (addon_backend) -> 前端 (CaptureWorker) 的事件通道
+
+text   : 每条事件一行 DY_DATA::{json}，走 stdout。兼容旧版本，也方便直接看日志调试。
+binary : 本地 TCP 连接上的长度前缀帧，一帧 = 一批事件 (msgpack 数组)，
+         一次 sendall 发出整批，接收端一次解包整批，没有逐条的 JSON 往返。
+
+binary 需要 msgpack (mitmproxy 自带依赖)；缺失或连接失败时自动退回 text。
+queue  : 同进程模式，后端在 GUI 进程的线程里运行，事件以 Python 对象直接放进队列。
+Emitter 在 writer 前面再按时间窗口/条数攒批，减少 mitmproxy 事件循环上的写调用。
+
+反方向 (GUI -> 后端) 的控制指令量很小，统一走子进程 stdin 的 DY_CTRL::{json} 行。
+"""
+import asyncio
+import json
+import os
+import queue
+import secrets
+import socket
+import struct
+import sys
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TEXT_PREFIX = "DY_DATA::"
+CTRL_PREFIX = "DY_CTRL::"
+
+# 连接建立后后端先发 MAGIC + token，防止本机其他程序误连
+MAGIC = b"DYEV"
+TOKEN_LEN = 32
+_HEADER = struct.Struct("<I")
+MAX_FRAME = 64 * 1024 * 1024
+
+ENV_TRANSPORT = "DY_TRANSPORT"
+ENV_PORT = "DY_EVENT_PORT"
+ENV_TOKEN = "DY_EVENT_TOKEN"
+ENV_CONTROL = "DY_CONTROL"
+
+
+# === 1. 编解码 ===
+def encode_text_line(pack):
+    return f"{TEXT_PREFIX}{json.dumps(pack, ensure_ascii=False)}"
+
+
+def parse_text_line(line):
+    """解析一行 stdout，不是事件行或解析失败返回 None"""
+    if not line.startswith(TEXT_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(TEXT_PREFIX):])
+    except ValueError:
+        return None
+
+
+def encode_control(cmd, **kwargs):
+    return f"{CTRL_PREFIX}{json.dumps(dict(kwargs, cmd=cmd), ensure_ascii=False)}"
+
+
+def parse_control_line(line):
+    if not line.startswith(CTRL_PREFIX):
+        return None
+    try:
+        msg = json.loads(line[len(CTRL_PREFIX):])
+    except ValueError:
+        return None
+    return msg if isinstance(msg, dict) else None
+
+
+def encode_batch(packs):
+    body = msgpack.packb(packs, use_bin_type=True)
+    return _HEADER.pack(len(body)) + body
+
+
+def decode_batch(body):
+    return msgpack.unpackb(body, raw=False)
+
+
+# === 2. 发送端 (后端进程) ===
+class TextWriter:
+    """DY_DATA:: 文本行，一批事件只 write + flush 一次"""
+    kind = "text"
+    # 开启统计时由后端设置 (metrics.Metrics)，单独记录编码耗时，和写出分开
+    metrics = None
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write_batch(self, packs):
+        if not packs:
+            return
+        # 不在构造时绑定 sys.stdout，方便调用方中途重定向
+        stream = self.stream or sys.stdout
+        metrics = self.metrics
+        t = time.perf_counter() if metrics is not None else 0.0
+        text = "".join(encode_text_line(p) + "\n" for p in packs)
+        if metrics is not None:
+            metrics.stage("encode", time.perf_counter() - t)
+        stream.write(text)
+        stream.flush()
+
+    def close(self):
+        pass
+
+
+class BinaryWriter:
+    """长度前缀 msgpack 帧，一批事件一次 sendall"""
+    kind = "binary"
+    metrics = None
+
+    def __init__(self, host, port, token):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.sendall(MAGIC + token.encode("ascii"))
+
+    def write_batch(self, packs):
+        if not packs:
+            return
+        metrics = self.metrics
+        t = time.perf_counter() if metrics is not None else 0.0
+        frame = encode_batch(packs)
+        if metrics is not None:
+            metrics.stage("encode", time.perf_counter() - t)
+        self.sock.sendall(frame)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class QueueWriter:
+    """同进程模式 (后端跑在 GUI 进程的线程里)：整批事件原样放进线程安全队列，不做任何编码"""
+    kind = "queue"
+
+    def __init__(self, events=None):
+        self.queue = events if events is not None else queue.SimpleQueue()
+
+    def write_batch(self, packs):
+        if packs:
+            self.queue.put(packs)
+
+    def close(self):
+        pass
+
+
+class MultiWriter:
+    """同一批事件依次交给多个 writer (例如界面通道 + 事件库)"""
+    kind = "multi"
+
+    def __init__(self, *writers):
+        self.writers = writers
+
+    def write_batch(self, packs):
+        for writer in self.writers:
+            writer.write_batch(packs)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+def open_writer():
+    """按环境变量选择通道，binary 不可用时退回 text"""
+    mode = os.environ.get(ENV_TRANSPORT, "text")
+    if mode == "binary":
+        if msgpack is None:
+            print(">>> 未安装 msgpack，事件通道退回 text 模式")
+        else:
+            try:
+                return BinaryWriter("127.0.0.1", int(os.environ[ENV_PORT]), os.environ[ENV_TOKEN])
+            except (KeyError, ValueError, OSError) as e:
+                print(f">>> binary 事件通道连接失败 ({e})，退回 text 模式")
+    return TextWriter()
+
+
+class Emitter:
+    """
+    攒批输出：距本批第一条超过 flush_interval 秒，或攒满 max_batch 条就写一次。
+    在 mitmproxy 事件循环里用 call_later 定时刷新；没有事件循环时 (压测/回放)
+    只按条数刷新，调用方结束时需要显式 flush()/close()。
+    flush_interval <= 0 表示不攒批，每次 emit 直接写出。
+    """
+
+    def __init__(self, writer, flush_interval=0.02, max_batch=500, metrics=None, stage="write"):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # 开启统计时记录每次写给 writer 的耗时 (直接写出为 write，交给背压队列为 enqueue)
+        self.metrics = metrics
+        self.stage = stage
+        self.pending = []
+        self.first_ts = 0.0
+        self.timer = None
+
+    def emit(self, packs):
+        if not packs:
+            return
+        now = time.monotonic()
+        if not self.pending:
+            self.first_ts = now
+        self.pending.extend(packs)
+        if (len(self.pending) >= self.max_batch or self.flush_interval <= 0
+                or now - self.first_ts >= self.flush_interval):
+            self.flush()
+        elif self.timer is None:
+            self._schedule()
+
+    def _schedule(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.timer = loop.call_later(self.flush_interval, self._on_timer)
+
+    def _on_timer(self):
+        self.timer = None
+        self.flush()
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        packs, self.pending = self.pending, []
+        metrics = self.metrics
+        t = time.perf_counter() if metrics is not None else 0.0
+        try:
+            self.writer.write_batch(packs)
+        except Exception as e:
+            if metrics is not None: metrics.error(self.stage, e)
+        if metrics is not None:
+            metrics.stage(self.stage, time.perf_counter() - t)
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+# === 3. 接收端 (GUI 进程) ===
+class BinaryListener:
+    """在本机随机端口等待后端连接，通过 child_env() 把端口和 token 交给子进程"""
+
+    def __init__(self):
+        self.token = secrets.token_hex(TOKEN_LEN // 2)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.conn = None
+
+    def child_env(self):
+        return {ENV_TRANSPORT: "binary", ENV_PORT: str(self.port), ENV_TOKEN: self.token}
+
+    def accept(self, timeout):
+        """等待一次连接；超时返回 False，token 不对的连接直接断开"""
+        self.server.settimeout(timeout)
+        try:
+            conn, _ = self.server.accept()
+        except socket.timeout:
+            return False
+        conn.settimeout(timeout)
+        try:
+            hello = _recv_exact(conn, len(MAGIC) + TOKEN_LEN)
+        except (OSError, EOFError):
+            hello = b""
+        if hello != MAGIC + self.token.encode("ascii"):
+            conn.close()
+            return False
+        conn.settimeout(None)
+        self.conn = conn
+        return True
+
+    def iter_batches(self):
+        """逐批产出事件列表，连接关闭时结束"""
+        buf = bytearray()
+        need = _HEADER.size
+        size = None
+        while True:
+            chunk = self.conn.recv(256 * 1024)
+            if not chunk:
+                return
+            buf += chunk
+            while len(buf) >= need:
+                if size is None:
+                    size = _HEADER.unpack_from(buf)[0]
+                    if size > MAX_FRAME:
+                        raise ValueError(f"事件帧过大: {size}")
+                    need = _HEADER.size + size
+                    continue
+                body = bytes(buf[_HEADER.size:need])
+                del buf[:need]
+                size, need = None, _HEADER.size
+                yield decode_batch(body)
+
+    def close(self):
+        for s in (self.conn, self.server):
+            if s:
+                try:
+                    s.close()
+                except OSError:
+                    pass
+
+
+def _recv_exact(conn, n):
+    data = b""
+    while len(data) < n:
+        chunk = conn.recv(n - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
@@ -0,0 +1,193 @@
+"""
+弹幕/礼物的按需字段提取 (快速解码路径)
+
+dy_pb2 解析 ChatMessage/GiftMessage 时会把 User 里的三组头像、PublicAreaCommon、
+TextEffect 等嵌套结构全部展开，而我们实际只输出其中三四个字段。
+
+FieldExtractor : 纯 Python 直接扫描线格式，只进入需要的子消息，其余字段按长度整段跳过，
+                 不创建任何中间对象。字段号和类型从 dy_pb2 的描述符里读出，和 dy.proto 一致。
+                 同一字段重复出现时和 protobuf 一样处理：标量以最后一次为准，子消息逐字段合并。
+FullExtractor  : dy_pb2 完整解析后按同样的字段路径取值 (回退路径)。
+
+upb (protobuf 的 C 实现，默认后端) 的完整解析比纯 Python 扫描快约 3 倍，只声明目标字段的
+精简结构也测不出收益，所以只有在纯 Python 版 protobuf 下才有快速路径 (见 make_extractor)。
+FieldExtractor 的结果和 dy_pb2 完整解析一致 (tests/test_wire_decode.py)；解析失败时调用方应退回 dy_pb2。
+"""
+from operator import attrgetter
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.internal import api_implementation
+
+
+_WT_VARINT, _WT_FIXED64, _WT_LEN, _WT_FIXED32 = 0, 1, 2, 5
+
+_STRING, _BYTES, _UINT, _SINT64, _SINT32, _BOOL = range(6)
+_KIND_BY_TYPE = {
+    FieldDescriptor.TYPE_STRING: _STRING,
+    FieldDescriptor.TYPE_BYTES: _BYTES,
+    FieldDescriptor.TYPE_UINT64: _UINT,
+    FieldDescriptor.TYPE_UINT32: _UINT,
+    FieldDescriptor.TYPE_INT64: _SINT64,
+    FieldDescriptor.TYPE_INT32: _SINT32,
+    FieldDescriptor.TYPE_BOOL: _BOOL,
+}
+_DEFAULTS = {_STRING: "", _BYTES: b"", _UINT: 0, _SINT64: 0, _SINT32: 0, _BOOL: False}
+
+
+class WireError(ValueError):
+    pass
+
+
+def _varint(buf, pos):
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise WireError("varint too long")
+
+
+def _skip(buf, pos, wire_type):
+    if wire_type == _WT_VARINT:
+        while buf[pos] & 0x80:
+            pos += 1
+        return pos + 1
+    if wire_type == _WT_LEN:
+        n, pos = _varint(buf, pos)
+        return pos + n
+    if wire_type == _WT_FIXED64:
+        return pos + 8
+    if wire_type == _WT_FIXED32:
+        return pos + 4
+    raise WireError(f"unsupported wire type {wire_type}")
+
+
+class FieldExtractor:
+    """
+    按字段路径提取：
+
+        FieldExtractor(dy.ChatMessage, {"user": "user.nickName", "content": "content"})
+        .extract(payload) -> {"user": "...", "content": "..."}
+
+    缺失的字段返回和 dy_pb2 一致的默认值 ("" / 0 / False)。
+    """
+
+    def __init__(self, message_class, paths):
+        self.names = list(paths)
+        self.defaults = {}
+        self.tree = {}
+        for name, path in paths.items():
+            self._add(self.tree, message_class.DESCRIPTOR, name, path.split("."))
+
+    def _add(self, node, descriptor, name, parts):
+        field = descriptor.fields_by_name[parts[0]]
+        if _is_repeated(field):
+            raise ValueError(f"{descriptor.name}.{field.name}: repeated fields are not supported")
+        if len(parts) > 1:
+            if field.type != FieldDescriptor.TYPE_MESSAGE:
+                raise ValueError(f"{descriptor.name}.{field.name} is not a message")
+            child = node.setdefault(field.number, {})
+            if not isinstance(child, dict):
+                raise ValueError(f"{descriptor.name}.{field.name} requested both as leaf and message")
+            self._add(child, field.message_type, name, parts[1:])
+        else:
+            kind = _KIND_BY_TYPE.get(field.type)
+            if kind is None:
+                raise ValueError(f"{descriptor.name}.{field.name}: unsupported field type {field.type}")
+            node[field.number] = (name, kind)
+            self.defaults[name] = _DEFAULTS[kind]
+
+    def extract(self, buf):
+        out = dict(self.defaults)
+        self._scan(buf, 0, len(buf), self.tree, out)
+        return out
+
+    def _scan(self, buf, pos, end, node, out):
+        # 要的字段拿到以后也要扫到结尾：同一字段可能再出现 (后者覆盖/合并)
+        while pos < end:
+            key, pos = _varint(buf, pos)
+            number, wire_type = key >> 3, key & 7
+            target = node.get(number)
+            if target is None:
+                pos = _skip(buf, pos, wire_type)
+                continue
+            if isinstance(target, dict):
+                if wire_type != _WT_LEN:
+                    raise WireError(f"field {number}: expected length-delimited")
+                n, pos = _varint(buf, pos)
+                if pos + n > end:
+                    raise WireError("truncated sub-message")
+                self._scan(buf, pos, pos + n, target, out)
+                pos += n
+            else:
+                name, kind = target
+                if kind <= _BYTES:
+                    if wire_type != _WT_LEN:
+                        raise WireError(f"field {number}: expected length-delimited")
+                    n, pos = _varint(buf, pos)
+                    if pos + n > end:
+                        raise WireError("truncated field")
+                    raw = buf[pos:pos + n]
+                    out[name] = raw.decode("utf-8") if kind == _STRING else bytes(raw)
+                    pos += n
+                else:
+                    if wire_type != _WT_VARINT:
+                        raise WireError(f"field {number}: expected varint")
+                    value, pos = _varint(buf, pos)
+                    if kind == _SINT64:
+                        value = _signed(value, 64)
+                    elif kind == _SINT32:
+                        value = _signed(value & 0xFFFFFFFF, 32)
+                    elif kind == _BOOL:
+                        value = value != 0
+                    else:
+                        value &= 0xFFFFFFFFFFFFFFFF
+                    out[name] = value
+        if pos > end:
+            raise WireError("truncated message")
+
+
+def _is_repeated(field):
+    # 新版 protobuf 去掉了 FieldDescriptor.label
+    repeated = getattr(field, "is_repeated", None)
+    if repeated is not None:
+        return repeated
+    return field.label == FieldDescriptor.LABEL_REPEATED
+
+
+def _signed(value, bits):
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+class FullExtractor:
+    """dy_pb2 完整解析，再按同样的字段路径取值"""
+
+    def __init__(self, message_class, paths):
+        self.message_class = message_class
+        self.getters = [(name, attrgetter(path)) for name, path in paths.items()]
+
+    def extract(self, buf):
+        msg = self.message_class()
+        msg.ParseFromString(buf)
+        return {name: get(msg) for name, get in self.getters}
+
+
+def make_extractor(message_class, paths):
+    """
+    快速路径的提取器；upb 等 C 实现下返回 None (直接完整解析最快)。
+    字段路径总是先对照完整结构校验一遍。
+    """
+    wire = FieldExtractor(message_class, paths)
+    if api_implementation.Type() == "python":
+        return wire
+    return None